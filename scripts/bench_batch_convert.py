@@ -0,0 +1,50 @@
+"""Масштабирование пакетной конвертации NL → batchCards по числу процессов.
+
+Запуск: python scripts/bench_batch_convert.py [--queries 50000] [--max-workers N] [--chunksize 64]
+
+Корпус — запросы tests/data/batchcards_golden.json, повторённые до --queries.
+Для каждого числа процессов 1..N печатается пропускная способность и ускорение
+относительно одного процесса; результат сверяется с последовательным прогоном.
+"""
+import argparse
+import json
+import os
+import time
+
+from msp_llm_filters.batch_convert import iter_convert
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=50000)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunksize", type=int, default=64)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        base = [case["query"] for case in json.load(f)]
+    queries = (base * (args.queries // len(base) + 1))[: args.queries]
+
+    reference = None
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        t0 = time.perf_counter()
+        results = [r["result"] for r in iter_convert(queries, workers=workers, chunksize=args.chunksize)]
+        dt = time.perf_counter() - t0
+        if reference is None:
+            reference = results
+        qps = len(queries) / dt
+        baseline = baseline or qps
+        print(json.dumps({
+            "workers": workers,
+            "chunksize": args.chunksize,
+            "queries_per_s": round(qps),
+            "speedup": round(qps / baseline, 2),
+            "mismatches": sum(a != b for a, b in zip(results, reference)),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Бенчмарк: карточки дел по одной в цикле vs api_get_cases с ограниченной параллельностью.
+
+Запуск: python scripts/bench_bulk_cases.py [--ids 150] [--latency 0.02] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer  # noqa: E402
+
+from msp_llm_filters import server  # noqa: E402
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+
+
+async def _handler(method: str, path: str, body: bytes):
+    case_num = json.loads(body)["case_num"]
+    return 200, {"data": [{"case_id": case_num, "first_number": case_num, "documents": [{"id": 1, "title": "Решение"}]}]}
+
+
+async def _run(url: str, ids, mode: str, concurrency: int) -> dict:
+    # Кэш выключен, чтобы оба режима реально ходили в upstream
+    settings = server.Settings(api_base_url=url, response_cache_max_bytes=0)
+    t0 = time.perf_counter()
+    if mode == "loop":
+        items = [await server.api_get_case(settings, cid) for cid in ids]
+        n = len(items)
+    else:
+        res = await server.api_get_cases(settings, ids, concurrency=concurrency)
+        n = len(res.items)
+    wall = time.perf_counter() - t0
+    await close_http_clients()
+    return {"mode": mode, "cases": n, "wall_s": round(wall, 3), "cases_per_s": round(n / wall, 1)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ids", type=int, default=150)
+    ap.add_argument("--latency", type=float, default=0.02, help="задержка ответа стенда, сек")
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+    ids = [f"А40-{i}/2024" for i in range(args.ids)]
+
+    with StubServer(_handler, latency=args.latency) as srv:
+        for mode in ("loop", "bulk"):
+            print(json.dumps(asyncio.run(_run(srv.url, ids, mode, args.concurrency)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Индекс классификаторов ОКВЭД2/ОКПД2: время открытия, память и стоимость операций.
+
+Запуск: python scripts/bench_classifiers.py [--index path.bin] [--seconds 1]
+
+Открытие — mmap файла и разбор заголовка; память — пик кучи Python при открытии (tracemalloc),
+коды и наименования остаются в отображённом файле. Операции: check (бисекция по кодам),
+expand (листья поддерева), search (по словам описания; первый вызов строит словарь основ).
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from msp_llm_filters.classifiers import DATA_PATH, open_classifiers
+
+
+def _per_call_us(fn, args, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for a in args:
+            fn(a)
+        done += len(args)
+    return (time.perf_counter() - t0) / done * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--index", default=DATA_PATH)
+    ap.add_argument("--seconds", type=float, default=1.0)
+    args = ap.parse_args()
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    sections = open_classifiers(args.index)
+    open_ms = (time.perf_counter() - t0) * 1e3
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "bytes": os.path.getsize(args.index),
+        "open_ms": round(open_ms, 3),
+        "heap_peak_kb": round(peak / 1024, 1),
+        **{name: len(ix) for name, ix in sections.items()},
+    }))
+
+    okved = sections["okved2"]
+    codes = [okved.code(i) for i in range(len(okved))]
+    probes = codes + [c + "9" for c in codes]  # половина — несуществующие подкоды
+    t0 = time.perf_counter()
+    okved.search("разработка ПО")
+    first_search_ms = (time.perf_counter() - t0) * 1e3
+    print(json.dumps({"op": "check", "us_per_call": round(_per_call_us(okved.check, probes, args.seconds), 2)}))
+    print(json.dumps({"op": "expand", "us_per_call": round(_per_call_us(okved.expand, codes, args.seconds), 2)}))
+    print(json.dumps({
+        "op": "search",
+        "first_call_ms": round(first_search_ms, 2),
+        "us_per_call": round(_per_call_us(okved.search, ["разработка ПО", "грузовые перевозки"], args.seconds), 2),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Общие утилиты для бенчмарков: локальный HTTP/1.1 стенд (keep-alive, chunked) и перцентили."""
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+# FastMCP включает INFO-логирование, а httpx пишет строку на каждый запрос
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# handler(method, path, body) -> (status, payload)
+# payload: bytes | dict/list (сериализуется в JSON) | async-итератор bytes (отдаётся chunked)
+Payload = Union[bytes, Dict[str, Any], List[Any], AsyncIterator[bytes]]
+Handler = Callable[[str, str, bytes], Awaitable[Tuple[int, Payload]]]
+
+
+class StubServer:
+    """Минимальный HTTP-сервер на asyncio в отдельном потоке.
+
+    Считает принятые TCP-соединения и запросы — по ним видно, переиспользует ли клиент пул.
+    """
+
+    def __init__(self, handler: Handler, latency: float = 0.0, host: str = "127.0.0.1") -> None:
+        self.handler = handler
+        self.latency = latency
+        self.host = host
+        self.port = 0
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    async def _shutdown(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._serve, self.host, 0, backlog=1024))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, payload = await self.handler(method, target, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # CancelledError — остановка стенда; глотаем, иначе asyncio шумит в колбэке стрима
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Payload) -> None:
+        if isinstance(payload, (dict, list)):
+            payload = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        if isinstance(payload, bytes):
+            head = f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+            writer.write(head.encode("latin-1") + payload)
+            self.bytes_sent += len(payload)
+            await writer.drain()
+            return
+        writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nTransfer-Encoding: chunked\r\n\r\n".encode("latin-1"))
+        try:
+            async for chunk in payload:
+                if not chunk:
+                    continue
+                writer.write(f"{len(chunk):x}\r\n".encode("latin-1") + chunk + b"\r\n")
+                self.bytes_sent += len(chunk)
+                await writer.drain()
+        finally:
+            aclose = getattr(payload, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 и среднее в миллисекундах."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        idx = min(len(ordered) - 1, max(0, int(round(p * (len(ordered) - 1)))))
+        return round(ordered[idx] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+async def timed(coro: Awaitable[Any]) -> Tuple[float, Any]:
+    t0 = time.perf_counter()
+    res = await coro
+    return time.perf_counter() - t0, res
@@ -0,0 +1,68 @@
+"""Бенчмарк memo конвертации NL → filters на потоке повторяющихся запросов.
+
+Запуск: python scripts/bench_conversion_memo.py [--requests 20000] [--seconds 2]
+
+Поток строится из запросов tests/data/batchcards_golden.json с тривиальными вариациями
+(регистр, пробелы, ё/е, завершающие знаки) и распределением Ципфа, как у UI и агентов.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from msp_llm_filters.conversion_memo import ConversionMemo, normalize_query
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+def _variant(q: str, rng: random.Random) -> str:
+    choice = rng.randrange(5)
+    if choice == 0:
+        return q.upper()
+    if choice == 1:
+        return "  " + q.replace(" ", "  ") + " "
+    if choice == 2:
+        return q.replace("е", "ё")
+    if choice == 3:
+        return q + "?!"
+    return q
+
+
+def _throughput(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return done / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--seconds", type=float, default=2.0)
+    ap.add_argument("--max-entries", type=int, default=2048)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        base = [case["query"] for case in json.load(f)]
+    rng = random.Random(1)
+    weights = [1 / (i + 1) for i in range(len(base))]
+    stream = [_variant(q, rng) for q in rng.choices(base, weights=weights, k=args.requests)]
+
+    mismatches = sum(convert_nl_to_batchcards(normalize_query(q)) != convert_nl_to_batchcards(q) for q in base)
+    print(json.dumps({"queries": len(base), "stream": len(stream), "normalization_mismatches": mismatches}))
+
+    direct = _throughput(convert_nl_to_batchcards, stream, args.seconds)
+    memo = ConversionMemo(args.max_entries)
+    cached = _throughput(lambda q: memo.convert(q, "batchcards-rules", convert_nl_to_batchcards), stream, args.seconds)
+    print(json.dumps({"engine": "direct", "queries_per_s": round(direct)}))
+    print(json.dumps({"engine": "memo", "queries_per_s": round(cached), "speedup": round(cached / direct, 2), **memo.stats()}))
+
+
+if __name__ == "__main__":
+    main()
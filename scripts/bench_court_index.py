@@ -0,0 +1,90 @@
+"""Распознавание суда в тексте: индекс CourtIndex по справочнику list_courts vs прежние регэкспы конвертера.
+
+Запуск: python scripts/bench_court_index.py [--snapshot tests/data/courts_snapshot.json] [--seconds 2]
+
+Справочник — снимок list_courts (формат DictionaryCache: {"fetched_at", "items"}). Корпус строится
+из него же: полные названия, «АС …» вместо «Арбитражный суд …», «N ААС» для апелляционных судов,
+всё в нижнем регистре. Для каждого способа — доля упоминаний, сведённых к правильному суду, и мкс
+на упоминание; отдельно — время построения индекса.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from msp_llm_filters.court_index import CourtIndex
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "courts_snapshot.json")
+
+_REGION = r"([а-яё\s]+област[а-яё]|[а-яё\s]+кра[а-яё]|[а-яё\s]+республик[а-яё])"
+_LEGACY_FULL = re.compile(rf"арбитражн[а-яё]+\s+суд[а-яё]*\s+{_REGION}")
+_LEGACY_ABBR = re.compile(rf"\bас\s+{_REGION}\b")
+
+_ORDINALS = (
+    "первый", "второй", "третий", "четвертый", "пятый", "шестой", "седьмой", "восьмой", "девятый",
+    "десятый", "одиннадцатый", "двенадцатый", "тринадцатый", "четырнадцатый", "пятнадцатый",
+    "шестнадцатый", "семнадцатый", "восемнадцатый", "девятнадцатый", "двадцатый", "двадцать первый",
+)
+
+
+def _legacy(q: str):
+    m = _LEGACY_FULL.search(q) or _LEGACY_ABBR.search(q)
+    return f"Арбитражный суд {m.group(1).strip().title()}" if m else None
+
+
+def _mentions(items):
+    out = []
+    for it in items:
+        name = it["name"]
+        low = name.lower()
+        out.append((low, name))
+        if low.startswith("арбитражный суд "):
+            out.append(("ас " + low[len("арбитражный суд "):], name))
+        for n, ordinal in enumerate(_ORDINALS, 1):
+            if low == f"{ordinal} арбитражный апелляционный суд":
+                out.append((f"{n} аас", name))
+    return out
+
+
+def _per_query_us(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return (time.perf_counter() - t0) / done * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--snapshot", default=SNAPSHOT_PATH)
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with open(args.snapshot, encoding="utf-8") as f:
+        items = json.load(f)["items"]
+    t0 = time.perf_counter()
+    index = CourtIndex(items)
+    build_ms = (time.perf_counter() - t0) * 1e3
+    mentions = _mentions(items)
+    queries = [q for q, _ in mentions]
+    print(json.dumps({"courts": len(index), "mentions": len(mentions), "build_ms": round(build_ms, 2)}))
+
+    def _resolve(q):
+        m = index.resolve(q)
+        return m.name if m is not None else None
+
+    for engine, fn in (("regex", _legacy), ("court_index", _resolve)):
+        correct = sum(fn(q) == name for q, name in mentions)
+        print(json.dumps({
+            "engine": engine,
+            "resolved_correctly": round(correct / len(mentions), 4),
+            "us_per_mention": round(_per_query_us(fn, queries, args.seconds), 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Бенчмарк: новый httpx.AsyncClient на каждый запрос vs общий пул соединений.
+
+Запуск: python scripts/bench_http_pool.py [--requests 300] [--concurrency 10] [--latency 0.002]
+
+Против локального стенда разница — это стоимость TCP-handshake и создания клиента;
+на реальном batchCardsByFilters по HTTPS добавляется ещё TLS-handshake.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer, percentiles  # noqa: E402
+
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+from msp_llm_filters.server_batchcards import BatchCardsRequest, Settings, api_search_batchcards  # noqa: E402
+
+
+async def _handler(method: str, path: str, body: bytes):
+    return 200, {"data": [{"main_block": {"inn": "7707083893", "name": "ООО Ромашка"}}], "total": 1}
+
+
+async def _run_mode(url: str, mode: str, n: int, concurrency: int) -> dict:
+    # Кэш ответов выключен, фильтры уникальны — иначе замеряем кэш и схлопывание, а не пул
+    settings = Settings(api_base_url=url, response_cache_max_bytes=0)
+    sem = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            if mode == "per-request":
+                # Поведение до общего клиента
+                async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
+                    r = await client.post(url, params={"limit": "20", "offset": "0"}, json={"inn": str(i)})
+                    r.raise_for_status()
+                    r.json()
+            else:
+                await api_search_batchcards(settings, BatchCardsRequest(filters={"inn": str(i)}))
+            samples.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t0
+    await close_http_clients()
+    return {"mode": mode, "wall_s": round(wall, 3), "rps": round(n / wall, 1), **percentiles(samples)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=300)
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--latency", type=float, default=0.002, help="задержка ответа стенда, сек")
+    args = ap.parse_args()
+
+    for mode in ("per-request", "shared-pool"):
+        with StubServer(_handler, latency=args.latency) as srv:
+            res = asyncio.run(_run_mode(srv.url, mode, args.requests, args.concurrency))
+            res["tcp_connections"] = srv.connections
+            print(json.dumps(res, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
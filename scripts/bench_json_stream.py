@@ -0,0 +1,110 @@
+"""Бенчмарк памяти: r.json() на всё тело vs потоковый разбор ItemStreamDecoder.
+
+Запуск: python scripts/bench_json_stream.py [--cases 200] [--docs 80] [--chunk 65536]
+
+Тело ответа генерируется по datanewton-api-v1-batchCases-response-schema.json (с документами).
+Пиковая память меряется tracemalloc поверх уже загруженного тела: у r.json() в пик попадают
+текст ответа и всё дерево объектов, у потокового разбора — текущий чанк, одно дело и результат.
+keep_documents=true — документы остаются в CaseSummary (search_cases с need_document),
+false — сводка без документов, как у карточек после маппинга/проекции.
+"""
+import argparse
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from msp_llm_filters.json_stream import ItemStreamDecoder
+from msp_llm_filters.server import case_summary_from_raw
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "datanewton-api-v1-batchCases-response-schema.json")
+
+_WORDS = ["ООО", "Ромашка", "решение", "суд", "определение", "иск", "взыскание", "долга", "Москва", "договор"]
+
+
+def _fake_string(key: str, rng: random.Random) -> str:
+    if key == "value":
+        # Текст судебного акта — основная масса тела
+        return " ".join(rng.choice(_WORDS) for _ in range(300))
+    if key in ("inn", "inn_src"):
+        return str(rng.randrange(10**9, 10**10))
+    if key in ("ogrn", "ogrn_src"):
+        return str(rng.randrange(10**12, 10**13))
+    if "date" in key or key == "updated_at":
+        return f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+
+
+def fake_from_schema(schema: Dict[str, Any], rng: random.Random, key: str = "", docs: int = 80) -> Any:
+    """Значение по JSON-схеме; documents — docs штук, прочие массивы — 1–3 элемента."""
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    t = schema.get("type")
+    if t == "object":
+        return {k: fake_from_schema(v, rng, k, docs) for k, v in schema.get("properties", {}).items()}
+    if t == "array":
+        n = docs if key == "documents" else rng.randint(1, 3)
+        return [fake_from_schema(schema.get("items", {}), rng, key, docs) for _ in range(n)]
+    if t == "integer":
+        return rng.randint(0, 10)
+    if t == "number":
+        return round(rng.uniform(1000, 10**7), 2)
+    if t == "boolean":
+        return rng.random() < 0.5
+    return _fake_string(key, rng)
+
+
+def make_payload(cases: int, docs: int, seed: int = 1) -> bytes:
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        schema = json.load(f)
+    rng = random.Random(seed)
+    item_schema = schema["properties"]["data"]["items"]
+    data = [fake_from_schema(item_schema, rng, docs=docs) for _ in range(cases)]
+    return json.dumps({"data": data, "limit": cases, "offset": 0, "total": cases * 10}, ensure_ascii=False).encode("utf-8")
+
+
+def _full(payload: bytes, keep_documents: bool) -> int:
+    # Как раньше: r.text -> json.loads -> список сводок
+    data = json.loads(payload.decode("utf-8"))
+    items = [s for s in (case_summary_from_raw(it, keep_documents) for it in data.get("data") or []) if s is not None]
+    return len(items)
+
+
+def _streamed(payload: bytes, chunk: int, keep_documents: bool) -> int:
+    decoder = ItemStreamDecoder(keys=("data",), item_hook=lambda it: case_summary_from_raw(it, keep_documents))
+    view = memoryview(payload)
+    items = []
+    for i in range(0, len(view), chunk):
+        items.extend(decoder.feed(bytes(view[i:i + chunk])))
+    items.extend(decoder.close())
+    return len(items)
+
+
+def _measure(name: str, keep_documents: bool, fn) -> dict:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    n = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"mode": name, "keep_documents": keep_documents, "items": n, "peak_mb": round(peak / 2**20, 2), "time_s": round(elapsed, 3)}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=200)
+    ap.add_argument("--docs", type=int, default=80, help="документов на дело")
+    ap.add_argument("--chunk", type=int, default=65536, help="размер чанка сети, байт")
+    args = ap.parse_args()
+
+    payload = make_payload(args.cases, args.docs)
+    print(json.dumps({"payload_mb": round(len(payload) / 2**20, 2)}))
+    for keep in (True, False):
+        print(json.dumps(_measure("r.json()", keep, lambda: _full(payload, keep)), ensure_ascii=False))
+        print(json.dumps(_measure("streamed", keep, lambda: _streamed(payload, args.chunk, keep)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
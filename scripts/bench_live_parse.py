@@ -0,0 +1,55 @@
+"""Бенчмарк разбора по мере ввода (POST /api/parse веб‑UI BatchCards).
+
+Запуск: python scripts/bench_live_parse.py [--queries 100]
+
+Каждый запрос из tests/data/batchcards_golden.json «набирается» по буквам; на каждое
+нажатие — вызов /api/parse с prev_q. Печатаются перцентили времени разбора на сервере
+и полного ответа через ASGI (без сети).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import percentiles  # noqa: E402
+
+from msp_llm_filters.webapp_batchcards import app  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+async def _run(queries) -> None:
+    server, roundtrip = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://web.test") as web:
+        seq = 0
+        for q in queries:
+            prev = ""
+            for i in range(1, len(q) + 1):
+                seq += 1
+                t0 = time.perf_counter()
+                r = await web.post("/api/parse", json={"q": q[:i], "prev_q": prev, "seq": seq})
+                roundtrip.append(time.perf_counter() - t0)
+                server.append(r.json()["elapsed_ms"] / 1000)
+                prev = q[:i]
+    for name, samples in (("server", server), ("asgi_roundtrip", roundtrip)):
+        print(json.dumps({"metric": name, **percentiles(samples)}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=100)
+    args = ap.parse_args()
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        queries = [case["query"] for case in json.load(f)][: args.queries]
+    asyncio.run(_run(queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Очередь к общей Ollama: задержка запросов веб‑UI во время пакетного прогона без планировщика и с ним.
+
+Запуск: python scripts/bench_llm_scheduler.py [--batch 40] [--interactive 20] [--interval-ms 200] [--slots 4] [--gen-ms 500]
+
+Стенд вместо Ollama генерирует не больше --slots ответов одновременно (OLLAMA_NUM_PARALLEL),
+остальные ждут у него в очереди по порядку прихода, каждый ответ — --gen-ms. В момент 0 приходит
+пакет из --batch запросов (прогон msp-eval-parsers), затем каждые --interval-ms — запрос веб‑UI.
+
+- before — запросы идут в Ollama напрямую: запрос UI стоит за всем пакетом;
+- after — llm_scheduler: --slots генераций, UI раньше пакета, срок UI --deadline-s; запрос, который
+  не успеет к сроку, сразу получает разбор правилами (fallback).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer, percentiles  # noqa: E402
+
+from msp_llm_filters import llm_scheduler  # noqa: E402
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+from msp_llm_filters.llm_scheduler import PRIORITY_BATCH, LLMOverloaded, LLMScheduler  # noqa: E402
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards  # noqa: E402
+from msp_llm_filters.ollama import build_chat_payload, chat_async, chat_json_async, parse_chat_response  # noqa: E402
+
+ANSWER = {"message": {"role": "assistant", "content": json.dumps({"filters": {"region_codes": ["77"]}})}, "done": True}
+
+
+class FakeOllama:
+    def __init__(self, slots: int, gen_s: float) -> None:
+        self.slots = slots
+        self.gen_s = gen_s
+        self.sem = None
+
+    async def handler(self, method: str, path: str, body: bytes):
+        if self.sem is None:
+            self.sem = asyncio.Semaphore(self.slots)
+        async with self.sem:
+            await asyncio.sleep(self.gen_s)
+        return 200, ANSWER
+
+
+async def _scenario(mode: str, args) -> dict:
+    os.environ["OLLAMA_STREAM"] = "0"
+    os.environ["LLM_DEADLINE_INTERACTIVE_S"] = str(args.deadline_s)
+    scheduler = llm_scheduler._scheduler = LLMScheduler(args.slots, service_s=args.gen_ms / 1000)
+    fake = FakeOllama(args.slots, args.gen_ms / 1000)
+    ui, batch = [], []
+    fallbacks = 0
+
+    async def one(query: str, interactive: bool) -> None:
+        nonlocal fallbacks
+        payload = build_chat_payload("системный промпт", query)
+        t0 = time.perf_counter()
+        if mode == "before":
+            parse_chat_response(await chat_async(payload))
+        elif interactive:
+            try:
+                await chat_json_async(payload)
+            except LLMOverloaded:
+                fallbacks += 1
+                convert_nl_to_batchcards(query)
+        else:
+            await chat_json_async(payload, priority=PRIORITY_BATCH)
+        (ui if interactive else batch).append(time.perf_counter() - t0)
+
+    async def interactive() -> None:
+        tasks = []
+        for i in range(args.interactive):
+            await asyncio.sleep(args.interval_ms / 1000)
+            tasks.append(asyncio.create_task(one(f"ип в регионе {i:02d}", True)))
+        await asyncio.gather(*tasks)
+
+    with StubServer(fake.handler) as srv:
+        os.environ["OLLAMA_BASE_URL"] = srv.url
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(f"компании в регионе {i:02d}", False) for i in range(args.batch)), interactive())
+        wall = time.perf_counter() - t0
+        await close_http_clients()
+    out = {
+        "mode": mode,
+        "ui_latency": percentiles(ui),
+        "ui_fallbacks": fallbacks,
+        "batch_latency": percentiles(batch),
+        "wall_s": round(wall, 3),
+    }
+    if mode == "after":
+        stats = scheduler.stats()
+        out["scheduler"] = {k: stats[k] for k in ("max_queued", "rejected", "expired", "wait_ms", "queue_depth")}
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batch", type=int, default=40)
+    ap.add_argument("--interactive", type=int, default=20)
+    ap.add_argument("--interval-ms", type=float, default=200.0)
+    ap.add_argument("--slots", type=int, default=4)
+    ap.add_argument("--gen-ms", type=float, default=500.0)
+    ap.add_argument("--deadline-s", type=float, default=2.0)
+    args = ap.parse_args()
+    for mode in ("before", "after"):
+        print(json.dumps(asyncio.run(_scenario(mode, args)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""LLM-разбор потоком с обрывом после JSON против ожидания полного ответа: сквозная задержка и токены.
+
+Запуск: python scripts/bench_llm_stream.py [--requests 40] [--token-ms 25] [--prefill-ms 150] [--trailer-tokens 40]
+
+Стенд вместо Ollama генерирует ответ по токенам (~4 символа) с заданной скоростью после prefill:
+Markdown-ограда, JSON разбора (ответы golden-файла, с отступами — как их чаще печатает модель),
+закрывающая ограда и пояснение случайной длины (0…2·--trailer-tokens токенов). После разрыва
+соединения стенд перестаёт генерировать — как Ollama, когда клиент закрыл запрос.
+
+- full — stream: false, ответ целиком (как было), затем parse_chat_response;
+- stream — chat_json_stream_async: разбор по токенам, соединение закрывается на закрывающей скобке.
+Для stream отдельно — время до первых частичных filters.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer, percentiles  # noqa: E402
+
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+from msp_llm_filters.ollama import build_chat_payload, chat_async, chat_json_stream_async, parse_chat_response  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+TRAILER_WORDS = "Пояснение : регион указан по коду субъекта , выручка переведена в тысячи рублей , остальные поля не заданы .".split()
+
+
+class FakeOllama:
+    """Генерация по токенам; answers — ответ модели по тексту запроса."""
+
+    def __init__(self, answers, prefill_s: float, token_s: float) -> None:
+        self.answers = answers
+        self.prefill_s = prefill_s
+        self.token_s = token_s
+        self.tokens = 0
+
+    async def handler(self, method: str, path: str, body: bytes):
+        payload = json.loads(body)
+        text = self.answers[payload["messages"][-1]["content"]]
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+        await asyncio.sleep(self.prefill_s)
+        if not payload.get("stream"):
+            await asyncio.sleep(self.token_s * len(pieces))
+            self.tokens += len(pieces)
+            return 200, {"message": {"role": "assistant", "content": text}, "done": True}
+
+        async def stream():
+            for piece in pieces:
+                await asyncio.sleep(self.token_s)
+                self.tokens += 1
+                yield json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}, ensure_ascii=False).encode() + b"\n"
+            yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}).encode() + b"\n"
+
+        return 200, stream()
+
+
+def _answer(expected: dict, trailer_tokens: int, rnd: random.Random) -> str:
+    trailer = " ".join(rnd.choice(TRAILER_WORDS) for _ in range(rnd.randint(0, 2 * trailer_tokens)))
+    # Ограда без «json»: прежний parse_chat_response тег языка не вырезает
+    return "```\n" + json.dumps(expected, ensure_ascii=False, indent=2) + "\n```\n" + trailer
+
+
+async def _one(mode: str, query: str, first_filters: list) -> dict:
+    payload = build_chat_payload("системный промпт", query)
+    if mode == "full":
+        return parse_chat_response(await chat_async(payload))
+    t0 = time.perf_counter()
+    seen = []
+
+    def on_filters(filters: dict) -> None:
+        if not seen:
+            seen.append(time.perf_counter() - t0)
+
+    result = await chat_json_stream_async(payload, on_filters)
+    first_filters.extend(seen)
+    return result
+
+
+async def _scenario(mode: str, cases, args) -> dict:
+    rnd = random.Random(args.seed)
+    answers = {c["query"]: _answer(c["expected"], args.trailer_tokens, rnd) for c in cases}
+    fake = FakeOllama(answers, args.prefill_ms / 1000, args.token_ms / 1000)
+    samples, first_filters = [], []
+    wrong = 0
+    with StubServer(fake.handler) as srv:
+        os.environ["OLLAMA_BASE_URL"] = srv.url
+        for c in cases:
+            t0 = time.perf_counter()
+            result = await _one(mode, c["query"], first_filters)
+            samples.append(time.perf_counter() - t0)
+            wrong += result != c["expected"]
+        await close_http_clients()
+        await asyncio.sleep(0.05)  # стенд дописывает счётчик после разрыва
+    out = {"mode": mode, "requests": len(cases), "wrong": wrong, "tokens_generated": fake.tokens, "latency": percentiles(samples)}
+    if mode == "stream":
+        out["first_filters"] = percentiles(first_filters)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--token-ms", type=float, default=25.0, help="время на токен (~40 ток/с — 7B q4 на GPU)")
+    ap.add_argument("--prefill-ms", type=float, default=150.0)
+    ap.add_argument("--trailer-tokens", type=int, default=40, help="средняя длина пояснения после JSON, токенов")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        golden = [c for c in json.load(f) if c["query"].strip() and c["expected"]["filters"]]
+    cases = list({c["query"]: c for c in golden}.values())[: args.requests]
+    for mode in ("full", "stream"):
+        print(json.dumps(asyncio.run(_scenario(mode, cases, args)), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
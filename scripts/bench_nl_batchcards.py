@@ -0,0 +1,52 @@
+"""Бенчмарк rule-based конвертера NL → batchCards: прежний движок vs таблица правил.
+
+Запуск: python scripts/bench_nl_batchcards.py [--seconds 2]
+
+Корпус — запросы из tests/data/batchcards_golden.json; перед замером печатается число
+запросов, где движки расходятся. Расхождения после переноса — осознанные изменения правил
+(например, словарь субъектов РФ вместо Москвы/МО/СПб); эталон поведения — golden-файл.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from legacy_nl_converter_batchcards import convert_nl_to_batchcards as convert_legacy  # noqa: E402
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+def _throughput(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return done / (time.perf_counter() - t0)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        queries = [case["query"] for case in json.load(f)]
+    mismatches = [q for q in queries if convert_legacy(q) != convert_nl_to_batchcards(q)]
+    print(json.dumps({"queries": len(queries), "mismatches": len(mismatches)}))
+
+    base = _throughput(convert_legacy, queries, args.seconds)
+    new = _throughput(convert_nl_to_batchcards, queries, args.seconds)
+    print(json.dumps({"engine": "legacy", "queries_per_s": round(base)}))
+    print(json.dumps({"engine": "rule_table", "queries_per_s": round(new), "speedup": round(new / base, 2)}))
+
+
+if __name__ == "__main__":
+    main()
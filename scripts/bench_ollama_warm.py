@@ -0,0 +1,150 @@
+"""Время до первого токена (TTFT) LLM-разбора: до и после кэша промпта, keep_alive и прогрева модели.
+
+Запуск: python scripts/bench_ollama_warm.py [--requests 12] [--gap-minutes 7] [--minute 0.05]
+
+Стенд вместо Ollama повторяет то, что определяет TTFT у настоящего сервера: после простоя дольше
+keep_alive (по умолчанию у Ollama — 5 минут) модель выгружается и следующий запрос платит за
+загрузку; префикс промпта, совпадающий с прошлым запросом побайтно, не пересчитывается. Время
+стенда ускорено: одна «минута» простоя — --minute секунд.
+
+- before — как было: промпт читается с диска на каждый вызов, keep_alive не передаётся, без прогрева;
+- after — load_system_prompt (кэш по mtime), keep_alive из OLLAMA_KEEP_ALIVE (30m), прогрев на старте.
+Отдельно — мкс на получение системного промпта (чтение файла vs кэш).
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer, percentiles  # noqa: E402
+
+from msp_llm_filters import ollama  # noqa: E402
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+from msp_llm_filters.llm_client_batchcards import PROMPTS_PATH  # noqa: E402
+
+_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+def _keep_alive_seconds(value) -> float:
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    m = re.fullmatch(r"(-?\d+(?:\.\d+)?)([smh])", value)
+    return float(m.group(1)) * _UNITS[m.group(2)] if m else 300.0
+
+
+class FakeOllama:
+    """Загрузка модели, пересчёт несовпавшей части промпта и выгрузка после простоя."""
+
+    def __init__(self, minute: float, load_s: float, per_char_s: float, token_s: float) -> None:
+        self.scale = minute / 60.0  # реальных секунд на секунду стенда
+        self.load_s = load_s
+        self.per_char_s = per_char_s
+        self.token_s = token_s
+        self.loaded_until = 0.0
+        self.cached = ""
+        self.loads = 0
+
+    async def handler(self, method: str, path: str, body: bytes):
+        payload = json.loads(body)
+        if time.perf_counter() > self.loaded_until:
+            self.loads += 1
+            self.cached = ""
+            await asyncio.sleep(self.load_s)
+        prompt = "".join(f"<{m['role']}>{m['content']}" for m in payload["messages"])
+        common = len(os.path.commonprefix([self.cached, prompt]))
+        await asyncio.sleep(self.per_char_s * (len(prompt) - common) + self.token_s)
+        self.cached = prompt
+        keep = _keep_alive_seconds(payload.get("keep_alive")) * self.scale
+        if not payload.get("stream"):
+            self.loaded_until = time.perf_counter() + keep
+            return 200, {"message": {"role": "assistant", "content": "{}"}, "done": True}
+
+        async def stream():
+            yield json.dumps({"message": {"role": "assistant", "content": "{"}, "done": False}).encode() + b"\n"
+            await asyncio.sleep(self.token_s * 5)
+            self.loaded_until = time.perf_counter() + keep
+            yield json.dumps({"message": {"role": "assistant", "content": "}"}, "done": True}).encode() + b"\n"
+
+        return 200, stream()
+
+
+def _legacy_prompt() -> str:
+    # Прежний _load_system_prompt: файл читается на каждый вызов
+    with open(PROMPTS_PATH, "r", encoding="utf-8") as f:
+        return f.read() + ollama.OUTPUT_FORMAT_INSTRUCTIONS
+
+
+def _legacy_payload(system_prompt: str, query: str) -> dict:
+    payload = ollama.build_chat_payload(system_prompt, query)
+    payload.pop("keep_alive", None)
+    return payload
+
+
+async def _ttft(client: httpx.AsyncClient, url: str, payload: dict) -> float:
+    payload = dict(payload, stream=True)
+    first = None
+    t0 = time.perf_counter()
+    async with client.stream("POST", f"{url}/api/chat", json=payload) as r:
+        async for line in r.aiter_lines():
+            if line and first is None:
+                first = time.perf_counter() - t0
+    return first
+
+
+async def _scenario(mode: str, args) -> dict:
+    fake = FakeOllama(args.minute, args.load, args.per_char, args.token)
+    samples = []
+    with StubServer(fake.handler) as srv:
+        os.environ["OLLAMA_BASE_URL"] = srv.url
+        async with httpx.AsyncClient(timeout=60) as client:
+            if mode == "after":
+                await ollama.warm_up_async(ollama.load_system_prompt(PROMPTS_PATH))
+            for i in range(args.requests):
+                if i:
+                    await asyncio.sleep(args.gap_minutes * args.minute)
+                if mode == "before":
+                    payload = _legacy_payload(_legacy_prompt(), f"компании в регионе {i + 1:02d}")
+                else:
+                    payload = ollama.build_chat_payload(ollama.load_system_prompt(PROMPTS_PATH), f"компании в регионе {i + 1:02d}")
+                samples.append(await _ttft(client, srv.url, payload))
+        await close_http_clients()
+    return {"mode": mode, "model_loads": fake.loads, "ttft": percentiles(samples)}
+
+
+def _prompt_us(fn, n: int = 2000) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - t0) / n * 1e6, 2)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=12)
+    ap.add_argument("--gap-minutes", type=float, default=7.0, help="простой между запросами, минут стенда")
+    ap.add_argument("--minute", type=float, default=0.05, help="реальных секунд в минуте стенда")
+    ap.add_argument("--load", type=float, default=0.4, help="загрузка модели, с")
+    ap.add_argument("--per-char", type=float, default=2e-5, help="пересчёт промпта, с на символ")
+    ap.add_argument("--token", type=float, default=0.01, help="генерация токена, с")
+    args = ap.parse_args()
+
+    print(json.dumps({
+        "prompt_chars": len(_legacy_prompt()),
+        "prompt_read_us": _prompt_us(_legacy_prompt),
+        "prompt_cached_us": _prompt_us(lambda: ollama.load_system_prompt(PROMPTS_PATH)),
+    }))
+    for mode in ("before", "after"):
+        print(json.dumps(asyncio.run(_scenario(mode, args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Префильтр групп правил NL-конвертеров: доли пропусков по группам и пропускная способность.
+
+Запуск: python scripts/bench_prefilter.py [--seconds 2]
+
+Корпус batchCards — запросы из tests/data/batchcards_golden.json; для convert_nl_to_filters —
+короткий набор запросов по делам. Для сравнения замеряется прогон всех групп без префильтра
+(должен давать тот же результат).
+"""
+import argparse
+import json
+import os
+import time
+
+from msp_llm_filters import nl_converter, nl_converter_batchcards
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+CASES_QUERIES = [
+    "Покажи цены иска пяти дел от 20 марта 2024 года зарегистрированных в Арбитражном суде Челябинской области",
+    "Дела, где ответчик ИНН 7707083893, за декабрь 2024, документы включи",
+    "Выведи 50 дел по участнику ООО Ромашка, отсортируй по дате возрастанию",
+    "Дела АС Краснодарского края за 2024-03-05",
+    "Истец ИНН 500100732259",
+    "Три дела по банкротству",
+]
+
+
+def _throughput(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return done / (time.perf_counter() - t0)
+
+
+def _all_groups(query: str):
+    # Та же таблица правил без пропуска групп
+    ctx = nl_converter_batchcards.MatchContext(query)
+    filters = {}
+    m = ctx.search("page_size")
+    page_size = int(m.group(1)) if m else 50
+    for _, rules in nl_converter_batchcards.RULES:
+        for rule in rules:
+            rule(ctx, filters)
+    return {"filters": filters, "page": 1, "page_size": page_size}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        queries = [case["query"] for case in json.load(f)]
+
+    mismatches = sum(_all_groups(q) != nl_converter_batchcards.convert_nl_to_batchcards(q) for q in queries)
+    nl_converter_batchcards.PREFILTER.reset_stats()
+    for q in queries:
+        nl_converter_batchcards.convert_nl_to_batchcards(q)
+    print(json.dumps({"converter": "batchcards", "queries": len(queries), "mismatches": mismatches}))
+    for group, row in nl_converter_batchcards.prefilter_stats()["groups"].items():
+        print(json.dumps({"converter": "batchcards", "group": group, **row}))
+
+    nl_converter._PREFILTER.reset_stats()
+    for q in CASES_QUERIES:
+        nl_converter.convert_nl_to_filters(q)
+    for group, row in nl_converter.prefilter_stats()["groups"].items():
+        print(json.dumps({"converter": "cases", "group": group, **row}))
+
+    base = _throughput(_all_groups, queries, args.seconds)
+    gated = _throughput(nl_converter_batchcards.convert_nl_to_batchcards, queries, args.seconds)
+    print(json.dumps({"engine": "all_groups", "queries_per_s": round(base)}))
+    print(json.dumps({"engine": "prefilter", "queries_per_s": round(gated), "speedup": round(gated / base, 2)}))
+
+
+if __name__ == "__main__":
+    main()
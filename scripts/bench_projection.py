@@ -0,0 +1,83 @@
+"""Бенчмарк проекции карточек batchCards: карточка целиком vs пресеты card/finance/contacts.
+
+Запуск: python scripts/bench_projection.py [--items 100] [--rounds 20]
+
+Меряется путь ответа MCP: потоковый разбор тела страницы (с проекцией на лету),
+сериализация SearchResponseGeneric и размер итогового JSON.
+"""
+import argparse
+import json
+import random
+import time
+
+from msp_llm_filters.json_stream import ItemStreamDecoder, iter_json_items
+from msp_llm_filters.projection import resolve_projection
+from msp_llm_filters.server_batchcards import SearchResponseGeneric
+
+
+def _card(i: int, rng: random.Random) -> dict:
+    years = {str(y): rng.randint(10**5, 10**9) for y in range(2015, 2025)}
+    return {
+        "main_block": {
+            "inn": f"77{i:08d}",
+            "ogrn": f"10277{i:08d}",
+            "name": f"ООО Компания {i}",
+            "full_name": f"Общество с ограниченной ответственностью «Компания {i}»",
+            "status": {"status_egr": "Действующее", "status_rus_short": "Действует"},
+            "establishment_date": "2010-05-17",
+            "activity_kind": "62.01",
+            "activity_kind_dsc": "Разработка компьютерного программного обеспечения",
+            "okopf": {"code": "12300", "name": "Общества с ограниченной ответственностью"},
+            "okveds": [{"code": f"{rng.randint(1, 99)}.{rng.randint(1, 99)}", "name": "Вид деятельности"} for _ in range(30)],
+        },
+        "address_block": {"region_code": "77", "region": "Москва", "value": "г. Москва, ул. Тверская, д. 1", "fias": {"id": "x" * 36}},
+        "msp_block": {"msp": "Да", "category": "Малое предприятие", "history": [{"date": "2020-08-10"} for _ in range(10)]},
+        "finance_plain_block": {
+            "fin_data": [{"code": str(2100 + c), "name": "Строка отчётности", "sum_by_year_map": years} for c in range(60)]
+        },
+        "contacts_block": {
+            "phones": [{"value": f"+7 495 {rng.randint(100, 999)}-00-00", "src": "egr"} for _ in range(5)],
+            "emails": [{"value": f"info{i}@example.com", "src": "site"}],
+            "websites": [{"value": f"https://company{i}.example"}],
+        },
+        "managers_block": {"managers": [{"name": "Иванов Иван Иванович", "position": "Генеральный директор", "inn": "7700000000"}]},
+        "founders_block": {"founders": [{"name": f"Учредитель {k}", "share": 10} for k in range(10)]},
+    }
+
+
+def _run(raw: bytes, preset, rounds: int) -> dict:
+    projection = resolve_projection(preset=preset)
+    t_decode = t_dump = 0.0
+    out = b""
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        decoder = ItemStreamDecoder(item_hook=projection.apply if projection else None)
+        items = list(iter_json_items((raw[i:i + 65536] for i in range(0, len(raw), 65536)), decoder))
+        t1 = time.perf_counter()
+        out = SearchResponseGeneric(items=items, page=1, page_size=len(items), total=len(items)).model_dump_json().encode("utf-8")
+        t2 = time.perf_counter()
+        t_decode += t1 - t0
+        t_dump += t2 - t1
+    return {
+        "preset": preset or "full",
+        "response_kb": round(len(out) / 1024, 1),
+        "decode_ms": round(t_decode / rounds * 1000, 2),
+        "serialize_ms": round(t_dump / rounds * 1000, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = random.Random(1)
+    raw = json.dumps({"data": [_card(i, rng) for i in range(args.items)], "total": args.items}, ensure_ascii=False).encode("utf-8")
+    print(json.dumps({"upstream_kb": round(len(raw) / 1024, 1)}))
+    for preset in (None, "card", "finance", "contacts"):
+        print(json.dumps(_run(raw, preset, args.rounds), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
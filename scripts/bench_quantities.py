@@ -0,0 +1,86 @@
+"""Стоимость извлечения величин на запрос: один проход токенизатора vs регулярки по разделам.
+
+Запуск: python scripts/bench_quantities.py [--seconds 2]
+
+Корпус — запросы tests/data/batchcards_golden.json. «Регулярки по разделам» — прежний набор
+конвертера (диапазон/от/до/составляет для выручки, прибыль, рост, численность, зарплата, цена):
+каждая запускается по запросу отдельно. Токенизатор (quantities.tokenize_quantities) находит
+все числа с единицей, сравнением и ключевым словом за один проход.
+Замер отдельно по всему корпусу и по запросам, где величины есть; последней строкой — полный
+разбор convert_nl_to_batchcards на запрос для масштаба.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+from msp_llm_filters.quantities import tokenize_quantities
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+_FILLER = r"(?:[а-яё\s,:()–-]{0,40}?)"
+_INCOME_UNIT = r"\s*(тыс|млн|миллион|млрд|миллиард)?(?:\s*(?:руб(?:\.|лей|ля)?|р\.?|₽))?"
+_SALARY = r"(зарплат[аы]?|оклад|з\/?п|вознаграждени[ея])"
+_PRICE = r"(нмцк|начальн[а-яё\s]*цен[аы]|стоимост[ьи]|сумм[аы])"
+_PRICE_CURRENCY = r"(?:\s*(?:руб|руб\.|р\.?|₽))?"
+
+LEGACY = [re.compile(p) for p in (
+    rf"выручк\w*{_FILLER}от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+){_INCOME_UNIT}",
+    rf"выручк\w*{_FILLER}(?:>|больше|свыше|выше|не\s*менее|от)\s*([\d\s.,]+){_INCOME_UNIT}",
+    rf"выручк\w*{_FILLER}до\s*([\d\s.,]+){_INCOME_UNIT}",
+    rf"выручк\w*{_FILLER}(?:составля[ею]т|сост\.)\s*(?:>|больше|свыше|выше|не\s*менее|от)?\s*([\d\s.,]+){_INCOME_UNIT}",
+    r"прибыл\w*\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)",
+    r"(стабильн\w*\s+динамик\w*\s+роста|рост)\s*(?:более|>|не\s+менее|от)\s*([\d.,]+)\s*%",
+    r"(сотрудник|численност)[а-яё]*\s*от\s*(\d+)\s*до\s*(\d+)",
+    rf"{_SALARY}\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)",
+    rf"{_SALARY}\s*от\s*([\d\s.,]+)",
+    rf"{_SALARY}\s*до\s*([\d\s.,]+)",
+    rf"{_PRICE}\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+){_PRICE_CURRENCY}",
+    rf"{_PRICE}\s*до\s*([\d\s.,]+){_PRICE_CURRENCY}",
+    rf"{_PRICE}\s*от\s*([\d\s.,]+){_PRICE_CURRENCY}",
+)]
+
+
+def _legacy(q: str):
+    return [rx.search(q) for rx in LEGACY]
+
+
+def _per_query_us(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return (time.perf_counter() - t0) / done * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        raw = [case["query"] for case in json.load(f)]
+    queries = [q.lower() for q in raw]
+    with_quantities = [q for q in queries if tokenize_quantities(q)]
+    print(json.dumps({"queries": len(queries), "with_quantities": len(with_quantities), "legacy_patterns": len(LEGACY)}))
+    for corpus, qs in (("all", queries), ("with_quantities", with_quantities)):
+        legacy_us = _per_query_us(_legacy, qs, args.seconds)
+        token_us = _per_query_us(tokenize_quantities, qs, args.seconds)
+        print(json.dumps({"corpus": corpus, "engine": "regex_per_branch", "us_per_query": round(legacy_us, 2)}))
+        print(json.dumps({
+            "corpus": corpus,
+            "engine": "tokenizer",
+            "us_per_query": round(token_us, 2),
+            "speedup": round(legacy_us / token_us, 2),
+        }))
+    print(json.dumps({"corpus": "all", "engine": "convert_nl_to_batchcards", "us_per_query": round(
+        _per_query_us(convert_nl_to_batchcards, raw, args.seconds), 2)}))
+
+
+if __name__ == "__main__":
+    main()
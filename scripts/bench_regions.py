@@ -0,0 +1,67 @@
+"""Стоимость распознавания регионов на запрос: трай основ (RegionGazetteer) vs регэксп на каждый регион.
+
+Запуск: python scripts/bench_regions.py [--seconds 2]
+
+Корпус — запросы tests/data/batchcards_golden.json и те же запросы с названиями субъектов.
+Регэкспы строятся из того же словаря (основа + [а-я]* на слово), так что сравнение честное:
+результаты обоих способов сверяются перед замером.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from msp_llm_filters.regions import REGIONS, RegionGazetteer
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+def _regex_table():
+    table = []
+    for code, (_, variants) in REGIONS.items():
+        for variant in variants:
+            words = [re.escape(s[:-1]) + r"\b" if s.endswith("$") else re.escape(s) + r"[а-я0-9-]*" for s in variant]
+            table.append((code, re.compile(r"(?<![а-я0-9-])" + r"\s+".join(words))))
+    return table
+
+
+def _regex_codes(table, text: str):
+    text = text.lower().replace("ё", "е")
+    hits = sorted((m.start(), code) for code, rx in table for m in rx.finditer(text))
+    return list(dict.fromkeys(code for _, code in hits))
+
+
+def _per_query_us(fn, queries, seconds: float) -> float:
+    done = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for q in queries:
+            fn(q)
+        done += len(queries)
+    return (time.perf_counter() - t0) / done * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=2.0)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        queries = [case["query"] for case in json.load(f)]
+    names = [name for name, _ in REGIONS.values()]
+    queries += [f"{q}, {names[i % len(names)].lower()}" for i, q in enumerate(queries)]
+
+    gazetteer = RegionGazetteer()
+    table = _regex_table()
+    mismatches = sum(gazetteer.codes(q) != _regex_codes(table, q) for q in queries)
+    print(json.dumps({"queries": len(queries), "regions": len(REGIONS), "regex_patterns": len(table), "mismatches": mismatches}))
+    trie_us = _per_query_us(gazetteer.codes, queries, args.seconds)
+    regex_us = _per_query_us(lambda q: _regex_codes(table, q), queries, args.seconds)
+    print(json.dumps({"engine": "regex_per_region", "us_per_query": round(regex_us, 2)}))
+    print(json.dumps({"engine": "trie", "us_per_query": round(trie_us, 2), "speedup": round(regex_us / trie_us, 2)}))
+
+
+if __name__ == "__main__":
+    main()
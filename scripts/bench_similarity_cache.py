@@ -0,0 +1,104 @@
+"""Кэш похожих запросов перед LLM: доля попаданий, сэкономленное время LLM и доля неверных попаданий.
+
+Запуск: python scripts/bench_similarity_cache.py [--queries 2000] [--thresholds 0.4,0.5,0.65,0.8] [--llm-ms 2500]
+
+Поток запросов — перефразы запросов golden-файла: другие числа, регистр и пунктуация, синонимы
+(«ИТ» / «айти», «выручкой от» / «выручка больше»), лишние слова. Вместо LLM — правила
+(convert_nl_to_batchcards): ответ «LLM» на промах — их разбор, а время — --llm-ms. Попадание считается
+неверным, если отличается от разбора правилами нового запроса; флаги, которых правила в перефразе
+не видят («айти»), тоже идут в неверные — это оценка сверху. Точные повторы сюда не попадают:
+их забирает memo конвертации раньше.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import percentiles  # noqa: E402
+
+from msp_llm_filters.conversion_memo import memo_key  # noqa: E402
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards, explain_nl_to_batchcards  # noqa: E402
+from msp_llm_filters.similarity_cache import SimilarityCache  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+_SYNONYMS = (
+    ("ИТ-компании", "айти компании"),
+    ("ИТ‑компании", "айти компании"),
+    ("выручкой от", "выручка больше"),
+    ("выручка свыше", "выручка больше"),
+    ("компаний", "организаций"),
+    ("ищут", "нанимают"),
+    ("с сайтом", "у которых есть сайт"),
+)
+_FILLERS = ("покажи", "найди", "нужны", "пожалуйста")
+
+
+def _paraphrase(q: str, rnd: random.Random) -> str:
+    q = re.sub(r"\d+", lambda m: str(rnd.randint(1, 9)) + "0" * (len(m.group()) - 1) if rnd.random() < 0.5 else m.group(), q)
+    for a, b in _SYNONYMS:
+        if rnd.random() < 0.5:
+            q = q.replace(a, b) if a in q else q.replace(b, a)
+    if rnd.random() < 0.3:
+        q = f"{rnd.choice(_FILLERS)} {q}"
+    if rnd.random() < 0.3:
+        q = q.replace(",", "")
+    if rnd.random() < 0.3:
+        q = q.lower()
+    return q
+
+
+def _run(threshold: float, stream, llm_s: float) -> dict:
+    cache = SimilarityCache(convert_nl_to_batchcards, max_entries=1024, threshold=threshold, explain=explain_nl_to_batchcards)
+    seen = set()
+    wrong = 0
+    lookup = []
+    for q in stream:
+        key = memo_key(q, "batchcards-llm")
+        if key in seen:
+            continue
+        seen.add(key)
+        t0 = time.perf_counter()
+        hit = cache.lookup(q)
+        lookup.append(time.perf_counter() - t0)
+        if hit is None:
+            cache.add(q, convert_nl_to_batchcards(q), llm_s)
+        elif hit != convert_nl_to_batchcards(q):
+            wrong += 1
+    s = cache.stats()
+    total_llm = s["llm_seconds"] + s["saved_seconds"]
+    return {
+        "threshold": threshold,
+        "unique_queries": s["lookups"],
+        "hit_rate": s["hit_rate"],
+        "rejected_unsafe": s["rejected"],
+        "wrong_hits": round(wrong / s["hits"], 4) if s["hits"] else 0.0,
+        "llm_s_without_cache": round(total_llm, 1),
+        "llm_s_saved": s["saved_seconds"],
+        "lookup": percentiles(lookup),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--thresholds", default="0.4,0.5,0.65,0.8")
+    ap.add_argument("--llm-ms", type=float, default=2500.0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        base = [c["query"] for c in json.load(f) if c["query"].strip()]
+    rnd = random.Random(args.seed)
+    stream = [_paraphrase(rnd.choice(base), rnd) for _ in range(args.queries)]
+    for t in (float(x) for x in args.thresholds.split(",")):
+        print(json.dumps(_run(t, stream, args.llm_ms / 1000)))
+
+
+if __name__ == "__main__":
+    main()
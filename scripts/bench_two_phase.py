@@ -0,0 +1,110 @@
+"""Бенчмарк двухфазного поиска: список с документами vs лёгкий список + документы раскрытых дел.
+
+Запуск: python scripts/bench_two_phase.py [--cases 20] [--docs 60] [--expanded 3] [--latency 0.01]
+
+Стенд отдаёт документы только при need_document=true (или при запросе карточки по case_num);
+время ответа растёт с объёмом тела — как у реального batch-cases.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_common import StubServer  # noqa: E402
+
+from msp_llm_filters import server  # noqa: E402
+from msp_llm_filters.http_client import close_http_clients  # noqa: E402
+
+BYTES_PER_SECOND = 20 * 1024 * 1024  # условная пропускная способность upstream
+
+
+def _case(n: int, docs: int, with_docs: bool) -> dict:
+    case = {
+        "case_id": f"id-{n}",
+        "first_number": f"А40-{n}/2024",
+        "date_start": "2024-03-20",
+        "sum": 100000.0 + n,
+        "currency": "RUBLES",
+        "status": 1,
+        "plaintiffs": [{"name": "ООО Ромашка"}],
+        "respondents": [{"name": "АО Лютик"}],
+    }
+    if with_docs:
+        case["documents"] = [
+            {
+                "instance_name": "Арбитражный суд города Москвы",
+                "creation_date": "2024-03-20T10:00:00",
+                "document_type": "Решение",
+                "value": "Текст судебного акта " * 40,
+            }
+            for _ in range(docs)
+        ]
+    return case
+
+
+def _make_handler(cases: int, docs: int):
+    async def handler(method: str, path: str, body: bytes):
+        req = json.loads(body)
+        if "case_num" in req:
+            n = int(req["case_num"].split("-")[1].split("/")[0])
+            payload = json.dumps({"data": [_case(n, docs, True)]}, ensure_ascii=False).encode("utf-8")
+        else:
+            data = [_case(n, docs, bool(req.get("need_document"))) for n in range(cases)]
+            payload = json.dumps({"data": data, "total": cases}, ensure_ascii=False).encode("utf-8")
+        await asyncio.sleep(len(payload) / BYTES_PER_SECOND)
+        return 200, payload
+
+    return handler
+
+
+async def _one_phase(settings, cases: int) -> float:
+    t0 = time.perf_counter()
+    req = server.SearchRequest(filters=server.SearchFilters(need_document=True), page_size=cases)
+    await server.api_search(settings, req, use_cache=False)
+    elapsed = time.perf_counter() - t0
+    await close_http_clients()
+    return elapsed
+
+
+async def _two_phase(settings, cases: int, expanded: int):
+    t0 = time.perf_counter()
+    req = server.SearchRequest(filters=server.SearchFilters(need_document=False), page_size=cases)
+    res = await server.api_search(settings, req, use_cache=False)
+    first_result = time.perf_counter() - t0
+    await server.api_get_case_documents(settings, [it.title for it in res.items[:expanded]])
+    total = time.perf_counter() - t0
+    await close_http_clients()
+    return first_result, total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=20)
+    ap.add_argument("--docs", type=int, default=60, help="документов на дело")
+    ap.add_argument("--expanded", type=int, default=3, help="сколько карточек раскрывает пользователь")
+    ap.add_argument("--latency", type=float, default=0.01)
+    args = ap.parse_args()
+    handler = _make_handler(args.cases, args.docs)
+
+    with StubServer(handler, latency=args.latency) as srv:
+        settings = server.Settings(api_base_url=srv.url, response_cache_max_bytes=0)
+        t = asyncio.run(_one_phase(settings, args.cases))
+        print(json.dumps({"mode": "one-phase", "time_to_first_result_ms": round(t * 1000, 1), "bytes": srv.bytes_sent}))
+
+    with StubServer(handler, latency=args.latency) as srv:
+        settings = server.Settings(api_base_url=srv.url, response_cache_max_bytes=0)
+        first, total = asyncio.run(_two_phase(settings, args.cases, args.expanded))
+        print(json.dumps({
+            "mode": "two-phase",
+            "time_to_first_result_ms": round(first * 1000, 1),
+            "with_expanded_docs_ms": round(total * 1000, 1),
+            "bytes": srv.bytes_sent,
+        }))
+
+
+if __name__ == "__main__":
+    main()
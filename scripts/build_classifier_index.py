@@ -0,0 +1,29 @@
+"""Сборка бинарного индекса классификаторов ОКВЭД2/ОКПД2 из TSV-исходников.
+
+Запуск: python scripts/build_classifier_index.py [--okved2 path.tsv] [--okpd2 path.tsv] [-o path.bin]
+
+По умолчанию — исходники и файл индекса пакета (src/msp_llm_filters/data). Формат TSV:
+код<TAB>наименование[<TAB>*], «*» — у кода перечислены все потомки; строка «#!complete» —
+перечислены все коды верхнего уровня. Для полного классификатора выгрузите его в тот же формат
+и соберите индекс с флагом «*» у каждого класса.
+"""
+import argparse
+import json
+
+from msp_llm_filters.classifiers import DATA_PATH, SOURCES, build_classifier_file, open_classifiers
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--okved2", default=SOURCES["okved2"])
+    ap.add_argument("--okpd2", default=SOURCES["okpd2"])
+    ap.add_argument("-o", "--output", default=DATA_PATH)
+    args = ap.parse_args()
+
+    size = build_classifier_file({"okved2": args.okved2, "okpd2": args.okpd2}, args.output)
+    sections = open_classifiers(args.output)
+    print(json.dumps({"path": args.output, "bytes": size, **{name: len(ix) for name, ix in sections.items()}}))
+
+
+if __name__ == "__main__":
+    main()
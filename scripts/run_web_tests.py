@@ -2,7 +2,7 @@ import asyncio
 import os
 from typing import Any, Dict
 
-from mcp_llm_courts.llm_client import nl_to_filters_via_ollama
+from mcp_llm_courts.llm_client import nl_to_filters_via_ollama_async
 from mcp_llm_courts.server import api_search, Settings, SearchRequest, SearchFilters
 from mcp_llm_courts.nl_converter import convert_nl_to_filters
 
@@ -47,7 +47,7 @@ async def main() -> None:
         # LLM (если настроена)
         if os.getenv("OLLAMA_BASE_URL"):
             try:
-                llm = nl_to_filters_via_ollama(q)
+                llm = await nl_to_filters_via_ollama_async(q)
                 await run_case(f"llm: {q}", llm)
             except Exception as e:
                 print(f"[llm: {q}] ERROR: {e}")
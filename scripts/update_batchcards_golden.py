@@ -0,0 +1,34 @@
+"""Пересчитать эталонные ответы tests/data/batchcards_golden.json текущим конвертером.
+
+Запуск: python scripts/update_batchcards_golden.py [--add "новый запрос" ...]
+
+Нужен только при осознанном изменении поведения конвертера: diff файла показывает,
+какие запросы разбираются иначе.
+"""
+import argparse
+import json
+import os
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data", "batchcards_golden.json")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--add", action="append", default=[], help="добавить запрос в корпус")
+    args = ap.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        queries = [case["query"] for case in json.load(f)]
+    queries += [q for q in args.add if q not in queries]
+
+    cases = [{"query": q, "expected": convert_nl_to_batchcards(q)} for q in queries]
+    with open(GOLDEN_PATH, "w", encoding="utf-8") as f:
+        json.dump(cases, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    print(f"{len(cases)} cases written to {os.path.normpath(GOLDEN_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .nl_converter_batchcards import convert_nl_to_batchcards
+
+DEFAULT_CHUNKSIZE = 64
+
+Record = Dict[str, Any]
+
+
+def _convert_record(record: Record) -> Record:
+    out = dict(record)
+    try:
+        out["result"] = convert_nl_to_batchcards(str(record.get("query", "")))
+    except Exception as e:  # noqa: BLE001 — одна плохая строка не должна ронять весь прогон
+        out["error"] = f"{type(e).__name__}: {e}"
+    return out
+
+
+def _convert_chunk(chunk: List[Record]) -> List[Record]:
+    # Выполняется в процессе пула: на задачу — пачка запросов, а не один (меньше pickle/IPC)
+    return [_convert_record(r) for r in chunk]
+
+
+def _as_record(item: Any) -> Record:
+    return dict(item) if isinstance(item, dict) else {"query": str(item)}
+
+
+def _chunks(records: Iterable[Record], size: int) -> Iterator[List[Record]]:
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_convert(
+    queries: Iterable[Any],
+    workers: Optional[int] = None,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> Iterator[Record]:
+    """Пакетная конвертация NL → batchCards в пуле процессов; результаты — в порядке входа.
+
+    queries — строки или dict с ключом "query" (остальные поля, например id, переносятся в ответ).
+    Вход читается лениво: в работе не больше 2×workers пачек, так что файл на миллионы
+    строк не держится в памяти. workers=1 — без пула, в текущем процессе.
+    Каждая запись — {..., "query", "result"} либо {..., "query", "error"}.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks((_as_record(q) for q in queries), max(1, chunksize))
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _convert_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_convert_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def convert_batch(queries: Iterable[Any], workers: Optional[int] = None, chunksize: int = DEFAULT_CHUNKSIZE) -> List[Record]:
+    return list(iter_convert(queries, workers=workers, chunksize=chunksize))
+
+
+def read_jsonl_queries(f: TextIO) -> Iterator[Any]:
+    """Строки JSONL: объект {"query": ..., ...} или JSON-строка; не-JSON строка берётся как запрос."""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield line
+
+
+def write_ndjson(records: Iterable[Record], out: TextIO) -> int:
+    n = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write("\n")
+        n += 1
+    return n
+
+
+def main_entry(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        prog="msp-batch-convert",
+        description="Пакетная конвертация запросов (JSONL) в фильтры batchCards, вывод — NDJSON в порядке входа",
+    )
+    ap.add_argument("input", help="файл JSONL с запросами или - для stdin")
+    ap.add_argument("-o", "--output", default="-", help="файл NDJSON или - для stdout")
+    ap.add_argument("--workers", type=int, default=None, help="число процессов (по умолчанию — число ядер)")
+    ap.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="запросов на задачу пула")
+    args = ap.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        n = write_ndjson(iter_convert(read_jsonl_queries(src), workers=args.workers, chunksize=args.chunksize), dst)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"{n} queries converted", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main_entry()
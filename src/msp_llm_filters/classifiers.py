@@ -0,0 +1,287 @@
+import mmap
+import os
+import re
+import struct
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .text_utils import stem
+
+# Бинарный индекс классификаторов (ОКВЭД2, ОКПД2): один файл, отображается в память (mmap).
+# Раздел классификатора — отсортированный массив кодов фиксированной ширины (поиск — бисекция),
+# ссылки на наименования (смещение, длина) в общем блоке UTF-8 и флаг «поддерево полное» на код.
+# Собирается из TSV в data/ скриптом scripts/build_classifier_index.py.
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DATA_PATH = os.path.join(DATA_DIR, "classifiers.bin")
+SOURCES: Dict[str, str] = {
+    "okved2": os.path.join(DATA_DIR, "okved2.tsv"),
+    "okpd2": os.path.join(DATA_DIR, "okpd2.tsv"),
+}
+
+_MAGIC = b"MSPCLF1\n"
+_HEADER = struct.Struct("<8sI")  # магия, число разделов
+_SECTION = struct.Struct("<16sIIIIII")  # имя, число кодов, флаги, смещения: коды, ссылки, наименования, флаги кодов
+_NAME_REF = struct.Struct("<II")
+_KEY_WIDTH = 16
+_ROOT_COMPLETE = 1  # в разделе перечислены все коды верхнего уровня
+
+_CODE_RE = re.compile(r"^\d{2}(?:\.\d{1,3})*$")
+_WORD_RE = re.compile(r"[a-zа-яё0-9]+")
+
+# «разработка ПО», «IT-услуги»: сокращения в описании деятельности -> слова наименований
+_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "софт": ("программного", "обеспечения"),
+    "it": ("информационных", "технологий"),
+    "ит": ("информационных", "технологий"),
+}
+
+_PO_AFTER = ("разработ", "внедр", "сопровожд", "установ", "поставк", "продаж", "издани", "тестирован")
+_STOP = frozenset({"для", "через", "или", "при", "без", "кроме", "прочая", "прочие", "прочих", "прочего"})
+
+
+def normalize_code(code: Any) -> Optional[str]:
+    """«62,01», « 62.01. » -> «62.01»; None, если это не код классификатора."""
+    s = str(code or "").strip().replace(",", ".").rstrip(".")
+    return s if _CODE_RE.match(s) else None
+
+
+def _description_stems(text: str) -> List[str]:
+    words = _WORD_RE.findall(text.lower().replace("ё", "е"))
+    out: List[str] = []
+    for i, w in enumerate(words):
+        if w == "по" and i and (i == len(words) - 1 or words[i - 1].startswith(_PO_AFTER)):
+            # «разработка ПО», «… по» в конце фразы — программное обеспечение, а не предлог
+            out.extend(stem(x) for x in _SYNONYMS["софт"])
+        elif w in _SYNONYMS:
+            out.extend(stem(x) for x in _SYNONYMS[w])
+        elif len(w) >= 3 and w not in _STOP:
+            out.append(stem(w))
+    return out
+
+
+class ClassifierIndex:
+    """Раздел бинарного индекса: проверка и раскрытие кодов за O(log n) без загрузки в кучу.
+
+    Данные читаются прямо из отображённого файла; в памяти процесса — только смещения.
+    Словарь основ наименований для search() строится при первом вызове.
+    """
+
+    def __init__(self, buf: Any, name: str, count: int, flags: int, keys: int, refs: int, blob: int, subtree: int) -> None:
+        self._buf = buf
+        self.name = name
+        self._count = count
+        self.root_complete = bool(flags & _ROOT_COMPLETE)
+        self._keys = keys
+        self._refs = refs
+        self._blob = blob
+        self._subtree = subtree
+        self._stems: Optional[List[Tuple[str, FrozenSet[str]]]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _key(self, i: int) -> bytes:
+        off = self._keys + i * _KEY_WIDTH
+        return self._buf[off:off + _KEY_WIDTH].rstrip(b"\0")
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _position(self, code: str) -> int:
+        key = code.encode("ascii")
+        i = self._lower_bound(key)
+        return i if i < self._count and self._key(i) == key else -1
+
+    def code(self, i: int) -> str:
+        return self._key(i).decode("ascii")
+
+    def title(self, code: Any) -> Optional[str]:
+        """Наименование кода или None."""
+        code = normalize_code(code)
+        i = self._position(code) if code else -1
+        if i < 0:
+            return None
+        off, length = _NAME_REF.unpack_from(self._buf, self._refs + i * _NAME_REF.size)
+        return self._buf[self._blob + off:self._blob + off + length].decode("utf-8")
+
+    def __contains__(self, code: Any) -> bool:
+        code = normalize_code(code)
+        return code is not None and self._position(code) >= 0
+
+    def complete(self, code: str) -> bool:
+        """Перечислены ли в индексе все потомки кода."""
+        i = self._position(code)
+        return i >= 0 and self._buf[self._subtree + i] == 1
+
+    def check(self, code: Any) -> Optional[bool]:
+        """True — код есть; False — кода точно нет; None — неизвестно (поддерево в индексе неполное)."""
+        code = normalize_code(code)
+        if code is None:
+            return False
+        if self._position(code) >= 0:
+            return True
+        # Ближайший известный предок: «62.01.99» -> «62.01»; предок — префикс кода как строки
+        parent = code
+        while len(parent) > 2:
+            parent = parent[:-1].rstrip(".")
+            i = self._position(parent)
+            if i >= 0:
+                return False if self._buf[self._subtree + i] == 1 else None
+        return False if self.root_complete else None
+
+    def descendants(self, code: str) -> List[str]:
+        """Все коды поддерева (без самого кода) в порядке классификатора."""
+        # Потомок — код, начинающийся с кода предка как строка: «62.0» -> «62.01», «62.09»
+        key = code.encode("ascii")
+        lo = self._lower_bound(key)
+        hi = self._lower_bound(key + b"\x7f")
+        return [c for c in (self.code(i) for i in range(lo, hi)) if c != code]
+
+    def expand(self, code: Any) -> List[str]:
+        """Конечные коды поддерева, если оно в индексе полное; иначе — сам код."""
+        norm = normalize_code(code)
+        if norm is None or not self.complete(norm):
+            return [str(code)]
+        below = self.descendants(norm)
+        if not below:
+            return [norm]
+        # Код — лист, если следующий код не начинается с него
+        return [c for c, nxt in zip(below, below[1:] + [""]) if not nxt.startswith(c)]
+
+    def search(self, text: str, limit: int = 5) -> List[str]:
+        """Коды по словам описания деятельности («разработка ПО» -> 62.01).
+
+        В наименовании должно быть не меньше двух третей слов описания; выше — те, где слов
+        описания больше, затем те, где меньше лишних слов, затем код выше в иерархии.
+        """
+        query = set(_description_stems(text))
+        if not query:
+            return []
+        if self._stems is None:
+            self._stems = [(self.code(i), frozenset(_description_stems(self.title(self.code(i)) or ""))) for i in range(self._count)]
+        need = (2 * len(query) + 2) // 3
+        scored = []
+        for code, stems in self._stems:
+            hit = len(query & stems)
+            if hit >= need:
+                scored.append((-hit, len(stems), len(code), code))
+        scored.sort()
+        return [code for *_, code in scored[:limit]]
+
+
+def read_tsv(path: str) -> Tuple[List[Tuple[str, str, bool]], bool]:
+    """Строки исходника (код, наименование, поддерево полное) и флаг полного списка верхнего уровня."""
+    rows: List[Tuple[str, str, bool]] = []
+    root_complete = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#!complete"):
+                root_complete = True
+                continue
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split("\t")
+            code = normalize_code(parts[0])
+            if code is None or len(code) > _KEY_WIDTH:
+                raise ValueError(f"{path}: bad code {parts[0]!r}")
+            rows.append((code, parts[1].strip(), len(parts) > 2 and parts[2].strip() == "*"))
+    return rows, root_complete
+
+
+def build_classifier_file(sources: Dict[str, str], path: str) -> int:
+    """Собрать бинарный индекс из TSV-исходников; возвращает размер файла в байтах."""
+    sections = []
+    for name, src in sources.items():
+        rows, root_complete = read_tsv(src)
+        rows.sort(key=lambda r: r[0].encode("ascii"))
+        complete_roots = [code for code, _, full in rows if full]
+        keys = b"".join(code.encode("ascii").ljust(_KEY_WIDTH, b"\0") for code, _, _ in rows)
+        blob = bytearray()
+        refs = bytearray()
+        subtree = bytearray()
+        for code, title, _ in rows:
+            data = title.encode("utf-8")
+            refs += _NAME_REF.pack(len(blob), len(data))
+            blob += data
+            # Флаг наследуется: всё поддерево полного кода тоже полное
+            subtree.append(1 if any(code.startswith(r) for r in complete_roots) else 0)
+        sections.append((name, len(rows), _ROOT_COMPLETE if root_complete else 0, keys, bytes(refs), bytes(blob), bytes(subtree)))
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    table = bytearray()
+    body = bytearray()
+    for name, count, flags, keys, refs, blob, subtree in sections:
+        base = offset + len(body)
+        table += _SECTION.pack(
+            name.encode("ascii"), count, flags,
+            base, base + len(keys), base + len(keys) + len(refs), base + len(keys) + len(refs) + len(blob),
+        )
+        body += keys + refs + blob + subtree
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(sections)) + table + body)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def open_classifiers(path: str = DATA_PATH) -> Dict[str, ClassifierIndex]:
+    """Разделы индекса по имени; файл отображается в память только для чтения."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, n = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"{path}: not a classifier index")
+    out: Dict[str, ClassifierIndex] = {}
+    for k in range(n):
+        raw_name, count, flags, keys, refs, blob, subtree = _SECTION.unpack_from(buf, _HEADER.size + k * _SECTION.size)
+        name = raw_name.rstrip(b"\0").decode("ascii")
+        out[name] = ClassifierIndex(buf, name, count, flags, keys, refs, blob, subtree)
+    return out
+
+
+_classifiers: Optional[Dict[str, ClassifierIndex]] = None
+
+
+def get_classifier(name: str) -> Optional[ClassifierIndex]:
+    """Раздел встроенного индекса («okved2», «okpd2»); None, если файла индекса нет."""
+    global _classifiers
+    if _classifiers is None:
+        try:
+            _classifiers = open_classifiers()
+        except (OSError, ValueError):
+            _classifiers = {}
+    return _classifiers.get(name)
+
+
+def known_codes(index: Optional[ClassifierIndex], codes: Iterable[Any]) -> List[str]:
+    """Коды без повторов и без тех, которых в классификаторе точно нет; без индекса — как есть."""
+    out: List[str] = []
+    for code in codes:
+        norm = normalize_code(code) if index is not None else str(code)
+        if norm is None or norm in out:
+            continue
+        if index is None or index.check(norm) is not False:
+            out.append(norm)
+    return out
+
+
+def expand_codes(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Копия тела запроса, где коды-префиксы ОКВЭД/ОКПД2 заменены конечными кодами (для API, которому нужны листья)."""
+    out = dict(filters)
+    okved = get_classifier("okved2")
+    if okved is not None and isinstance(out.get("okveds"), list):
+        out["okveds"] = list(dict.fromkeys(c for code in out["okveds"] for c in okved.expand(code)))
+    contracts = out.get("contracts")
+    okpd2 = get_classifier("okpd2")
+    if okpd2 is not None and isinstance(contracts, dict) and isinstance(contracts.get("okpd2_codes"), list):
+        out["contracts"] = dict(contracts, okpd2_codes=list(dict.fromkeys(
+            c for code in contracts["okpd2_codes"] for c in okpd2.expand(code)
+        )))
+    return out
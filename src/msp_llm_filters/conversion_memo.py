@@ -0,0 +1,131 @@
+import json
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+_SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+([,;:!?)])")
+_REPEATED_PUNCT_RE = re.compile(r"([,;!?])\1+")
+_KEEP_TRAILING_DOT_RE = re.compile(r"(?:\bг|\d)\.+$")
+_FOLD = (("ё", "е"), ("Ё", "Е"), ("«", '"'), ("»", '"'), ("“", '"'), ("”", '"'))
+
+MemoKey = Tuple[str, str, str]
+
+
+def normalize_query(query: str) -> str:
+    """Каноническая форма запроса: ё→е, кавычки-«ёлочки» → ", схлопнутые пробелы и повторы знаков,
+    без завершающих «?!…» и точки. Регистр сохраняется: от него зависят правила (город берётся как написан).
+
+    Только для ключа memo: конвертер получает исходный текст. "г.", даты, дефисы и цифры не трогаем.
+    """
+    s = " ".join(query.split())
+    for old, new in _FOLD:
+        if old in s:
+            s = s.replace(old, new)
+    s = _SPACE_BEFORE_PUNCT_RE.sub(r"\1", s)
+    s = _REPEATED_PUNCT_RE.sub(r"\1", s).rstrip(" !?…")
+    if s.endswith(".") and not _KEEP_TRAILING_DOT_RE.search(s[-8:]):
+        s = s.rstrip(".").rstrip(" !?…")
+    return s
+
+
+def memo_key(query: str, parser: str, version: str = "", fold_case: bool = False) -> MemoKey:
+    """Ключ memo: нормализованный запрос, тип парсера и версия (модель/промпт).
+
+    fold_case — без учёта регистра; только для парсеров, результат которых от регистра не зависит,
+    иначе первый пришедший вариант написания решал бы результат для всех остальных.
+    """
+    text = normalize_query(query)
+    return (text.casefold() if fold_case else text), parser, version
+
+
+class ConversionMemo:
+    """Ограниченный LRU результатов конвертации NL → filters (rule-based и LLM).
+
+    Как и ResponseCache, храним JSON-строки: каждое попадание — новая глубокая копия,
+    вызывающий код может её менять.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[MemoKey, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: MemoKey) -> Optional[Dict[str, Any]]:
+        raw = self._entries.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return json.loads(raw)
+
+    def put(self, key: MemoKey, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Сохраняет результат и возвращает его независимую копию."""
+        raw = json.dumps(result, ensure_ascii=False)
+        if self.enabled:
+            self._entries[key] = raw
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return json.loads(raw)
+
+    def convert(
+        self, query: str, parser: str, fn: Callable[[str], Dict[str, Any]], version: str = "", fold_case: bool = False
+    ) -> Dict[str, Any]:
+        """Результат fn(query) из memo или с вычислением и сохранением.
+
+        Нормализованный запрос — только ключ: конвертер получает исходный текст и разбирает его так же,
+        как без memo (хвостовые захваты вроде «описание …$» видят завершающие знаки).
+        """
+        key = memo_key(query, parser, version, fold_case)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, fn(query))
+
+    async def convert_async(
+        self, query: str, parser: str, fn: Callable[[str], Awaitable[Dict[str, Any]]], version: str = ""
+    ) -> Dict[str, Any]:
+        """То же для асинхронного fn (LLM). Ошибки не кэшируются; отмена доходит до fn
+        (разрыв соединения с браузером по-прежнему закрывает запрос к Ollama)."""
+        key = memo_key(query, parser, version)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        return self.put(key, await fn(query))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_memo: Optional[ConversionMemo] = None
+
+
+def get_conversion_memo() -> ConversionMemo:
+    """Memo конвертации на процесс; размер — NL_MEMO_MAX_ENTRIES (0 — выключить)."""
+    global _memo
+    if _memo is None:
+        _memo = ConversionMemo(int(os.getenv("NL_MEMO_MAX_ENTRIES", "2048")))
+    return _memo
@@ -0,0 +1,286 @@
+import bisect
+import math
+import os
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .dictionary_cache import (
+    DictionaryIndex,
+    item_id,
+    item_name,
+    load_snapshot,
+    normalize_name,
+    snapshot_path,
+)
+from .text_utils import stem
+
+# Слова, не различающие суды: «суд по интеллектуальным правам», «суд города Москвы»
+_STOP: FrozenSet[str] = frozenset({"и", "по", "в", "во", "на", "г", "город"})
+
+# Сокращения в запросах -> полные слова (до выделения основ)
+_ABBREVIATIONS: Dict[str, Tuple[str, ...]] = {
+    "ас": ("арбитражный", "суд"),
+    "фас": ("арбитражный", "суд"),  # бывшие федеральные арбитражные суды округов
+    "аас": ("арбитражный", "апелляционный", "суд"),
+    "сип": ("суд", "по", "интеллектуальным", "правам"),
+    "обл": ("области",),
+    "респ": ("республики",),
+    "спб": ("санкт", "петербурга"),
+    "мск": ("москвы",),
+    "хмао": ("ханты", "мансийского", "автономного", "округа"),
+    "янао": ("ямало", "ненецкого", "автономного", "округа"),
+    "кбр": ("кабардино", "балкарской", "республики"),
+    "кчр": ("карачаево", "черкесской", "республики"),
+    "днр": ("донецкой", "народной", "республики"),
+    "лнр": ("луганской", "народной", "республики"),
+}
+
+# «9 ААС», «17 арбитражный апелляционный суд»: номер апелляционного суда -> порядковое числительное
+_ORDINALS: Tuple[str, ...] = (
+    "первый", "второй", "третий", "четвертый", "пятый", "шестой", "седьмой", "восьмой", "девятый",
+    "десятый", "одиннадцатый", "двенадцатый", "тринадцатый", "четырнадцатый", "пятнадцатый",
+    "шестнадцатый", "семнадцатый", "восемнадцатый", "девятнадцатый", "двадцатый",
+)
+_APPEAL_PREFIXES = ("аас", "апелляц")
+
+# Слова вокруг «суд», которые ещё относятся к названию: «Двадцать первый арбитражный апелляционный суд»,
+# «суд Ханты-Мансийского автономного округа — Югры»
+_WINDOW_BEFORE = 4
+_WINDOW_AFTER = 6
+
+MIN_SCORE = 0.5
+MIN_MARGIN = 0.05
+_PREFIX_WEIGHT = 0.9
+_MIN_PREFIX = 4
+_MIN_FUZZY = 5
+_MIN_DICE = 0.6
+
+
+def _ordinal(token: str) -> Tuple[str, ...]:
+    n = int(token)
+    if 1 <= n <= 20:
+        return (_ORDINALS[n - 1],)
+    if 21 <= n <= 29:
+        return ("двадцать", _ORDINALS[n - 21])
+    return (token,)
+
+
+def _words(text: str, expand: bool) -> List[str]:
+    raw = normalize_name(text).split()
+    if not expand:
+        return raw
+    out: List[str] = []
+    for i, w in enumerate(raw):
+        if w.isdigit() and any(x.startswith(_APPEAL_PREFIXES) for x in raw[i + 1:i + 3]):
+            out.extend(_ordinal(w))
+        else:
+            out.extend(_ABBREVIATIONS.get(w, (w,)))
+    return out
+
+
+def name_stems(text: str, expand: bool = False) -> List[str]:
+    """Основы слов названия без служебных; expand — раскрыть сокращения и номера (для запросов)."""
+    stems = (stem(w) for w in _words(text, expand))
+    return [s for s in stems if s not in _STOP]
+
+
+def _trigrams(s: str) -> Set[str]:
+    s = f" {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class CourtMatch(NamedTuple):
+    id: Optional[str]
+    name: str
+    score: float  # F-мера совпадения основ (с весами IDF) названия и текста, 0..1
+
+
+class CourtIndex:
+    """Нечёткий поиск судов по справочнику list_courts.
+
+    Название суда — набор основ слов; основа весит log(1 + N/df), так что «арбитражный суд»
+    почти ничего не решает, а «челябинск» или «девят» — решают. Основа текста сопоставляется
+    со словарём точно, затем как префикс («челяб»), затем по триграммам (опечатки).
+    Оценка суда — F-мера: сколько веса названия нашлось в тексте и сколько найденного относится к нему.
+    """
+
+    def __init__(self, items: Iterable[Dict[str, Any]], fetched_at: float = 0.0) -> None:
+        self.fetched_at = fetched_at
+        self.ids: List[Optional[str]] = []
+        self.names: List[str] = []
+        stems_of: List[FrozenSet[str]] = []
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            name = item_name(it)
+            if not name:
+                continue
+            self.ids.append(item_id(it))
+            self.names.append(name)
+            stems_of.append(frozenset(name_stems(name)))
+
+        # Инвертированный индекс: основа -> номера судов
+        self._postings: Dict[str, List[int]] = {}
+        for i, stems in enumerate(stems_of):
+            for s in stems:
+                self._postings.setdefault(s, []).append(i)
+        n = len(self.names)
+        self._idf: Dict[str, float] = {s: math.log(1.0 + n / len(p)) for s, p in self._postings.items()}
+        self._stems = stems_of
+        self._total: List[float] = [sum(self._idf[s] for s in stems) or 1.0 for stems in stems_of]
+        # «Общие» основы (арбитражн, суд, област) сами по себе суд не определяют
+        self._generic: FrozenSet[str] = frozenset(s for s, p in self._postings.items() if len(p) > 1 and len(p) * 4 > n)
+
+        self._vocab: List[str] = sorted(self._postings)
+        self._by_trigram: Dict[str, List[str]] = {}
+        for s in self._vocab:
+            if len(s) >= _MIN_FUZZY:
+                for t in _trigrams(s):
+                    self._by_trigram.setdefault(t, []).append(s)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def version(self) -> str:
+        return f"{len(self.names)}:{self.fetched_at}"
+
+    def _lookup(self, s: str) -> List[Tuple[str, float]]:
+        """Основы словаря, которым соответствует основа текста, с коэффициентом доверия."""
+        if s in self._postings:
+            return [(s, 1.0)]
+        if len(s) >= _MIN_PREFIX:
+            lo = bisect.bisect_left(self._vocab, s)
+            hits = []
+            for v in self._vocab[lo:]:
+                if not v.startswith(s):
+                    break
+                hits.append((v, _PREFIX_WEIGHT))
+            if hits:
+                return hits
+        if len(s) < _MIN_FUZZY:
+            return []
+        grams = _trigrams(s)
+        shared: Dict[str, int] = {}
+        for t in grams:
+            for v in self._by_trigram.get(t, ()):
+                shared[v] = shared.get(v, 0) + 1
+        out = []
+        for v, k in shared.items():
+            dice = 2.0 * k / (len(grams) + len(v) + 2)
+            if dice >= _MIN_DICE:
+                out.append((v, dice))
+        return out
+
+    def _query_stems(self, text: str, anchored: bool = False) -> List[str]:
+        stems = name_stems(text, expand=True)
+        anchors = [i for i, s in enumerate(stems) if s == "суд"]
+        if not anchors:
+            # anchored: без слова «суд» (или АС/ААС/ФАС/СИП) суда в тексте нет — «из Челябинской области»
+            return [] if anchored else stems
+        # В длинном запросе («пять дел от 20 марта в арбитражном суде …») название — только рядом с «суд»
+        keep: Set[int] = set()
+        for a in anchors:
+            keep.update(range(max(0, a - _WINDOW_BEFORE), a + _WINDOW_AFTER + 1))
+        return [s for i, s in enumerate(stems) if i in keep]
+
+    def _ranked(self, text: str, anchored: bool = False) -> Tuple[List[Tuple[float, int]], bool]:
+        """(оценка, номер суда) по убыванию и признак «совпала необщая основа»."""
+        matched: Dict[str, float] = {}
+        for s in self._query_stems(text, anchored):
+            for v, weight in self._lookup(s):
+                if weight > matched.get(v, 0.0):
+                    matched[v] = weight
+        if not matched:
+            return [], False
+        weights = [(v, self._idf[v] * weight) for v, weight in matched.items()]
+        found = sum(w for _, w in weights)
+        # Оцениваем только суды с совпавшей необщей основой; «арбитражн» и «суд» есть у сотни судов
+        candidates = {i for v, _ in weights if v not in self._generic for i in self._postings[v]}
+        specific = bool(candidates)
+        if not specific:
+            candidates = {i for v, _ in weights for i in self._postings[v]}
+        # F-мера: полнота — доля названия суда в тексте, точность — доля найденного в тексте, что
+        # относится к этому суду («21 ААС» — не «Первый» и не «Двадцатый»)
+        ranked = []
+        for i in candidates:
+            stems = self._stems[i]
+            w = sum(x for v, x in weights if v in stems)
+            recall = w / self._total[i]
+            precision = w / found
+            ranked.append((2 * recall * precision / (recall + precision), i))
+        ranked.sort(key=lambda r: (-r[0], r[1]))
+        return ranked, specific
+
+    def search(self, text: str, limit: int = 5) -> List[CourtMatch]:
+        """Лучшие кандидаты по убыванию оценки."""
+        ranked, _ = self._ranked(text)
+        return [CourtMatch(self.ids[i], self.names[i], round(score, 4)) for score, i in ranked[:limit]]
+
+    def resolve(self, text: str, anchored: bool = False) -> Optional[CourtMatch]:
+        """Суд, однозначно названный в тексте, иначе None.
+
+        Нужны: хотя бы одна совпавшая «необщая» основа (одно «арбитражный суд» — не суд),
+        оценка не ниже MIN_SCORE и отрыв от второго кандидата не меньше MIN_MARGIN.
+        anchored — для запросов, где суд лишь одно из условий: ищем только рядом со словом «суд»
+        (или АС/ААС/ФАС/СИП), без него — None.
+        """
+        ranked, specific = self._ranked(text, anchored)
+        if not specific:
+            return None
+        score, i = ranked[0]
+        if score < MIN_SCORE or (len(ranked) > 1 and score - ranked[1][0] < MIN_MARGIN):
+            return None
+        return CourtMatch(self.ids[i], self.names[i], round(score, 4))
+
+
+# ---- Индекс для конвертера: из снимка list_courts на диске (его пишет DictionaryCache MCP-сервера) ----
+_override: Optional[CourtIndex] = None
+_loaded: Optional[CourtIndex] = None
+_loaded_key: Optional[Tuple[str, float]] = None
+
+
+def _cache_dir() -> str:
+    # Только явно заданный каталог: иначе разбор зависел бы от того, что MCP-сервер когда-то записал в ~/.cache
+    return os.getenv("DICTIONARY_CACHE_DIR", "")
+
+
+def get_court_index() -> Optional[CourtIndex]:
+    """Индекс судов из снимка справочника в DICTIONARY_CACHE_DIR; перечитывается, когда снимок обновился.
+
+    None — каталог не задан или снимка нет.
+    """
+    global _loaded, _loaded_key
+    if _override is not None:
+        return _override
+    cache_dir = _cache_dir()
+    if not cache_dir:
+        return None
+    path = snapshot_path(cache_dir, "courts")
+    try:
+        key = (path, os.stat(path).st_mtime)
+    except OSError:
+        return None
+    if key != _loaded_key:
+        snap = load_snapshot(cache_dir, "courts")
+        _loaded = CourtIndex(snap["items"], float(snap.get("fetched_at") or 0.0)) if snap is not None else None
+        _loaded_key = key
+    return _loaded
+
+
+def set_court_index(index: Optional[CourtIndex]) -> None:
+    """Подменить индекс (тесты, встраивание); None — снова читать снимок."""
+    global _override
+    _override = index
+
+
+_for_dictionary: Optional[Tuple[DictionaryIndex, CourtIndex]] = None
+
+
+def court_index_for(dictionary: DictionaryIndex) -> CourtIndex:
+    """Индекс судов поверх загруженного справочника; строится заново только для новых данных."""
+    global _for_dictionary
+    cached = _for_dictionary
+    if cached is None or cached[0] is not dictionary:
+        cached = (dictionary, CourtIndex(dictionary.items, dictionary.fetched_at))
+        _for_dictionary = cached
+    return cached[1]
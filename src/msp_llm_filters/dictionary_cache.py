@@ -0,0 +1,213 @@
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "msp_llm_filters")
+
+_NON_WORD_RE = re.compile(r"[^0-9a-zа-я]+")
+
+
+def normalize_name(value: Any) -> str:
+    """Нормализация названия для индекса: регистр, ё→е, пунктуация и пробелы."""
+    s = str(value or "").lower().replace("ё", "е")
+    return _NON_WORD_RE.sub(" ", s).strip()
+
+
+def item_id(item: Dict[str, Any]) -> Optional[str]:
+    # Формат справочников не зафиксирован схемой — пробуем типичные ключи
+    for key in ("id", "code", "court_id", "value", "key"):
+        v = item.get(key)
+        if v is not None and v != "":
+            return str(v)
+    return None
+
+
+def item_name(item: Dict[str, Any]) -> Optional[str]:
+    for key in ("name", "title", "full_name", "short_name", "label", "description"):
+        v = item.get(key)
+        if isinstance(v, str) and v.strip():
+            return v
+    return None
+
+
+def snapshot_path(cache_dir: str, name: str) -> str:
+    return os.path.join(cache_dir, f"dictionary_{name}.json")
+
+
+def load_snapshot(cache_dir: str, name: str) -> Optional[Dict[str, Any]]:
+    """Снимок справочника с диска: {"fetched_at": float, "items": [...]} или None."""
+    if not cache_dir:
+        return None
+    try:
+        with open(snapshot_path(cache_dir, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("items"), list):
+        return None
+    return data
+
+
+def save_snapshot(cache_dir: str, name: str, items: List[Dict[str, Any]], fetched_at: float) -> None:
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = snapshot_path(cache_dir, name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": fetched_at, "items": items}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+class DictionaryIndex:
+    """Справочник с индексами по id и по нормализованному названию."""
+
+    def __init__(self, items: List[Dict[str, Any]], fetched_at: float) -> None:
+        self.items = items
+        self.fetched_at = fetched_at
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, Dict[str, Any]] = {}
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            iid = item_id(it)
+            if iid is not None:
+                self.by_id.setdefault(iid, it)
+            name = item_name(it)
+            if name:
+                self.by_name.setdefault(normalize_name(name), it)
+
+    def get_by_id(self, value: Any) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(str(value))
+
+    def get_by_name(self, value: Any) -> Optional[Dict[str, Any]]:
+        return self.by_name.get(normalize_name(value))
+
+
+class DictionaryMetrics:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.refresh_seconds_total = 0.0
+        self.last_refresh_seconds: Optional[float] = None
+        self.snapshot_loads = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "last_refresh_ms": round(self.last_refresh_seconds * 1000, 3) if self.last_refresh_seconds is not None else None,
+            "avg_refresh_ms": round(self.refresh_seconds_total / self.refreshes * 1000, 3) if self.refreshes else None,
+            "snapshot_loads": self.snapshot_loads,
+        }
+
+
+class DictionaryCache:
+    """In-process кэш справочника: TTL + stale-while-revalidate + снимок на диске.
+
+    - свежие данные (возраст < ttl) отдаются сразу;
+    - устаревшие отдаются сразу, а обновление запускается в фоне (одно на кэш);
+    - при холодном старте данные берутся из снимка на диске, если он есть;
+    - без данных вообще — ждём загрузку.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        ttl_seconds: float,
+        cache_dir: str = "",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.name = name
+        self._fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._clock = clock
+        self._index: Optional[DictionaryIndex] = None
+        self._snapshot_checked = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.metrics = DictionaryMetrics()
+
+    @property
+    def index(self) -> Optional[DictionaryIndex]:
+        """Текущие данные с индексами (без обращения к сети; может быть None)."""
+        self._load_snapshot_once()
+        return self._index
+
+    def _load_snapshot_once(self) -> None:
+        if self._snapshot_checked or self._index is not None:
+            return
+        self._snapshot_checked = True
+        snap = load_snapshot(self.cache_dir, self.name)
+        if snap is not None:
+            self._index = DictionaryIndex(snap["items"], float(snap.get("fetched_at") or 0.0))
+            self.metrics.snapshot_loads += 1
+
+    def _is_fresh(self, index: DictionaryIndex) -> bool:
+        return (self._clock() - index.fetched_at) < self.ttl_seconds
+
+    async def get(self) -> List[Dict[str, Any]]:
+        return (await self.get_index()).items
+
+    async def get_index(self) -> DictionaryIndex:
+        self._load_snapshot_once()
+        index = self._index
+        if index is not None:
+            if self._is_fresh(index):
+                self.metrics.hits += 1
+            else:
+                self.metrics.stale_hits += 1
+                self._start_refresh()
+            return index
+        self.metrics.misses += 1
+        return await asyncio.shield(self._start_refresh())
+
+    async def refresh(self) -> DictionaryIndex:
+        """Принудительное обновление (ждёт уже идущее, если оно есть)."""
+        return await asyncio.shield(self._start_refresh())
+
+    def _start_refresh(self) -> "asyncio.Task[DictionaryIndex]":
+        task = self._refresh_task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._do_refresh())
+            # Ошибку фонового обновления учитываем в метриках, а не в "Task exception was never retrieved"
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._refresh_task = task
+        return task
+
+    async def _do_refresh(self) -> DictionaryIndex:
+        t0 = time.perf_counter()
+        try:
+            items = await self._fetch()
+        except Exception:
+            self.metrics.refresh_errors += 1
+            raise
+        elapsed = time.perf_counter() - t0
+        self.metrics.refreshes += 1
+        self.metrics.refresh_seconds_total += elapsed
+        self.metrics.last_refresh_seconds = elapsed
+
+        index = DictionaryIndex(items, self._clock())
+        self._index = index
+        try:
+            save_snapshot(self.cache_dir, self.name, items, index.fetched_at)
+        except OSError:
+            # Снимок — оптимизация холодного старта, его отсутствие не ошибка
+            pass
+        return index
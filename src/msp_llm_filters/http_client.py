@@ -0,0 +1,93 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import httpx
+from pydantic import BaseModel, Field
+
+
+def _env_bool(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+class HttpClientSettings(BaseModel):
+    # Лимиты пула соединений (общие для всех клиентов процесса)
+    max_connections: int = Field(default_factory=lambda: int(os.getenv("HTTP_MAX_CONNECTIONS", "100")))
+    max_keepalive_connections: int = Field(default_factory=lambda: int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")))
+    keepalive_expiry: float = Field(default_factory=lambda: float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30")))
+    # HTTP/2 включается только если установлен пакет h2 (pip install httpx[http2])
+    http2: bool = Field(default_factory=lambda: _env_bool("HTTP2"))
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Клиенты по имени ("api", "ollama", ...) вместе с циклом событий, в котором они созданы:
+# соединения пула привязаны к циклу, поэтому при смене цикла (тесты, asyncio.run) клиент пересоздаётся.
+_clients: Dict[str, Tuple[httpx.AsyncClient, Optional[asyncio.AbstractEventLoop]]] = {}
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def create_http_client(settings: Optional[HttpClientSettings] = None, **kwargs: Any) -> httpx.AsyncClient:
+    """Новый AsyncClient с настройками пула из окружения."""
+    settings = settings or HttpClientSettings()
+    kwargs.setdefault("limits", settings.limits())
+    kwargs.setdefault("http2", settings.http2 and _http2_available())
+    return httpx.AsyncClient(**kwargs)
+
+
+def get_http_client(name: str = "api") -> httpx.AsyncClient:
+    """Общий на процесс клиент с keep-alive. Таймауты передаются на уровне запроса."""
+    loop = _current_loop()
+    entry = _clients.get(name)
+    if entry is not None:
+        client, client_loop = entry
+        if not client.is_closed and client_loop is loop:
+            return client
+    client = create_http_client()
+    _clients[name] = (client, loop)
+    return client
+
+
+def set_http_client(client: httpx.AsyncClient, name: str = "api") -> None:
+    """Подменить общий клиент (тесты, кастомный transport)."""
+    _clients[name] = (client, _current_loop())
+
+
+async def close_http_clients() -> None:
+    loop = _current_loop()
+    entries = list(_clients.items())
+    _clients.clear()
+    for _, (client, client_loop) in entries:
+        # Клиент из чужого цикла закрыть корректно нельзя — просто отпускаем его
+        if client_loop is loop and not client.is_closed:
+            await client.aclose()
+
+
+@asynccontextmanager
+async def http_client_lifespan(app: Any = None) -> AsyncIterator[None]:
+    """Lifespan для Starlette и FastMCP: прогрев клиента на старте, закрытие пула на остановке."""
+    get_http_client()
+    try:
+        yield
+    finally:
+        await close_http_clients()
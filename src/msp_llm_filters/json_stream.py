@@ -0,0 +1,178 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+_WS_RE = re.compile(r"[ \t\n\r]*")
+_scan = json.JSONDecoder().raw_decode
+
+# Состояния разбора верхнеуровневого объекта
+_START, _KEY, _COLON, _VALUE, _ITEMS, _DONE = range(6)
+
+
+class IncompleteJSON(ValueError):
+    """Поток закончился раньше, чем закрылся верхнеуровневый объект."""
+
+
+class ItemStreamDecoder:
+    """Инкрементальный разбор ответа вида {"data": [...], "total": N, ...}.
+
+    Элементы массива под одним из ключей keys отдаются по одному, как только
+    элемент целиком пришёл; в памяти держится только текущий элемент и хвост чанка.
+    Каждый элемент декодируется C-сканером json (raw_decode); недочитанный элемент
+    повторно пробуем не раньше, чем буфер вырастет вдвое, — суммарная работа остаётся линейной.
+    Скалярные поля верхнего уровня (total, available_count, limit, offset) собираются в meta.
+
+    item_hook применяется к каждому элементу сразу после декодирования (маппинг, проекция);
+    если он вернул None, элемент отбрасывается.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str] = ("data", "items"),
+        item_hook: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        self.keys = frozenset(keys)
+        self.item_hook = item_hook
+        self.meta: Dict[str, Any] = {}
+        self.array_key: Optional[str] = None
+        self.items_decoded = 0
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._state = _START
+        self._key: Optional[str] = None
+        self._retry_at = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Добавить очередной кусок байт; вернуть элементы, завершённые в нём."""
+        out: List[Any] = []
+        self._buf += self._utf8.decode(chunk)
+        buf = self._buf
+        n = len(buf)
+        if n < self._retry_at:
+            return out
+        pos = 0
+        while True:
+            pos = _WS_RE.match(buf, pos).end()
+            if pos >= n:
+                break
+            c = buf[pos]
+            state = self._state
+            if state == _ITEMS:
+                if c == ",":
+                    pos += 1
+                    continue
+                if c == "]":
+                    self._state = _KEY
+                    pos += 1
+                    continue
+            elif state == _START:
+                if c != "{":
+                    raise ValueError(f"expected JSON object, got {c!r}")
+                self._state = _KEY
+                pos += 1
+                continue
+            elif state == _KEY:
+                if c == ",":
+                    pos += 1
+                    continue
+                if c == "}":
+                    self._state = _DONE
+                    pos += 1
+                    continue
+            elif state == _COLON:
+                if c != ":":
+                    raise ValueError(f"expected ':', got {c!r}")
+                self._state = _VALUE
+                pos += 1
+                continue
+            elif state == _VALUE:
+                if c == "[" and self._key in self.keys and self.array_key is None:
+                    self.array_key = self._key
+                    self._state = _ITEMS
+                    pos += 1
+                    continue
+            else:
+                # Хвост после закрытия объекта игнорируем
+                pos = n
+                break
+
+            try:
+                value, end = _scan(buf, pos)
+            except json.JSONDecodeError:
+                value, end = None, n
+            # Значение у самого конца буфера могло оборваться (число "12" из "123") — ждём ещё данных
+            if end >= n:
+                self._retry_at = n + max(n - pos, 1)
+                break
+            self._retry_at = 0
+            if state == _ITEMS:
+                self._emit(value, out)
+            elif state == _KEY:
+                self._key = value
+                self._state = _COLON
+            else:
+                if not isinstance(value, (dict, list)):
+                    self.meta[self._key] = value
+                self._key = None
+                self._state = _KEY
+            pos = end
+        self._buf = buf[pos:]
+        if self._retry_at:
+            self._retry_at -= pos
+        return out
+
+    def close(self) -> List[Any]:
+        """Конец потока: дожать отложенные элементы и проверить, что объект закрыт."""
+        self._buf += self._utf8.decode(b"", final=True)
+        self._retry_at = 0
+        out = self.feed(b"")
+        if self._state != _DONE:
+            raise IncompleteJSON("truncated JSON stream")
+        return out
+
+    def _emit(self, item: Any, out: List[Any]) -> None:
+        self.items_decoded += 1
+        if self.item_hook is not None:
+            item = self.item_hook(item)
+            if item is None:
+                return
+        out.append(item)
+
+
+async def aiter_json_items(
+    chunks: AsyncIterator[bytes],
+    decoder: ItemStreamDecoder,
+) -> AsyncIterator[Any]:
+    """Элементы из асинхронного потока байт (например, httpx Response.aiter_bytes())."""
+    async for chunk in chunks:
+        for item in decoder.feed(chunk):
+            yield item
+    for item in decoder.close():
+        yield item
+
+
+def iter_json_items(chunks: Iterable[bytes], decoder: ItemStreamDecoder) -> Iterable[Any]:
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+async def stream_items(
+    client: httpx.AsyncClient,
+    method: str,
+    url: str,
+    decoder: ItemStreamDecoder,
+    **kwargs: Any,
+) -> List[Any]:
+    """Запрос с потоковым разбором тела вместо r.json().
+
+    Ошибочный ответ дочитывается целиком и поднимается как HTTPStatusError — так же, как raise_for_status().
+    """
+    async with client.stream(method, url, **kwargs) as r:
+        if r.is_error:
+            await r.aread()
+            r.raise_for_status()
+        return [item async for item in aiter_json_items(r.aiter_bytes(), decoder)]
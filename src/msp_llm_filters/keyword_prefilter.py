@@ -0,0 +1,121 @@
+from collections import deque
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence
+
+_NOTHING: FrozenSet[str] = frozenset()
+
+
+class KeywordAutomaton:
+    """Aho–Corasick: все вхождения набора подстрок (в т.ч. перекрывающиеся) за один проход по тексту.
+
+    Переходы достроены до полного автомата, так что на символ — один поиск в словаре,
+    без откатов по суффиксным ссылкам.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords = tuple(dict.fromkeys(k for k in keywords if k))
+        goto: List[Dict[str, int]] = [{}]
+        out: List[set] = [set()]
+        for kw in self.keywords:
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add(kw)
+
+        fail = [0] * len(goto)
+        order: List[int] = []
+        queue = deque(goto[0].values())
+        while queue:
+            r = queue.popleft()
+            order.append(r)
+            for ch, s in goto[r].items():
+                queue.append(s)
+                f = fail[r]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[s] = goto[f].get(ch, 0)
+                out[s] |= out[fail[s]]
+
+        # В порядке BFS суффиксная ссылка всегда ведёт в уже достроенное состояние
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        for s in order:
+            row = dict(delta[fail[s]])
+            row.update(goto[s])
+            delta[s] = row
+
+        # Строка состояния: символ -> (строка следующего состояния, найденные в нём ключи)
+        outs = [frozenset(o) if o else _NOTHING for o in out]
+        rows: List[Dict[str, Any]] = [{} for _ in delta]
+        for s, transitions in enumerate(delta):
+            rows[s].update((ch, (rows[t], outs[t])) for ch, t in transitions.items())
+        self._root = (rows[0], _NOTHING)
+        self._states = len(rows)
+
+    def __len__(self) -> int:
+        return self._states
+
+    def find(self, text: str) -> FrozenSet[str]:
+        """Множество ключевых подстрок, встретившихся в text."""
+        root = self._root
+        row = root[0]
+        found: Optional[set] = None
+        for ch in text:
+            row, hit = row.get(ch, root)
+            if hit:
+                if found is None:
+                    found = set(hit)
+                else:
+                    found |= hit
+        return frozenset(found) if found else _NOTHING
+
+
+class RuleGroupPrefilter:
+    """Отбор групп правил конвертера по триггерным основам.
+
+    Один проход автомата по запросу даёт множество найденных основ; группа запускается,
+    только если в запросе есть хотя бы один её триггер (группа без триггеров — всегда).
+    Триггеры должны быть необходимым условием срабатывания группы, иначе вывод изменится.
+    Счётчики запусков/пропусков по группам — stats().
+    """
+
+    def __init__(self, groups: Mapping[str, Sequence[str]], extra_keywords: Iterable[str] = ()) -> None:
+        self.groups: Dict[str, FrozenSet[str]] = {name: frozenset(triggers) for name, triggers in groups.items()}
+        keywords = [t for triggers in groups.values() for t in triggers]
+        self.automaton = KeywordAutomaton(keywords + list(extra_keywords))
+        self.queries = 0
+        self.runs: Dict[str, int] = {name: 0 for name in groups}
+        self.skips: Dict[str, int] = {name: 0 for name in groups}
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        self.queries += 1
+        return self.automaton.find(text)
+
+    def should_run(self, group: str, found: FrozenSet[str]) -> bool:
+        triggers = self.groups[group]
+        if not triggers or not triggers.isdisjoint(found):
+            self.runs[group] += 1
+            return True
+        self.skips[group] += 1
+        return False
+
+    def reset_stats(self) -> None:
+        self.queries = 0
+        for name in self.groups:
+            self.runs[name] = 0
+            self.skips[name] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        groups = {}
+        for name in self.groups:
+            total = self.runs[name] + self.skips[name]
+            groups[name] = {
+                "runs": self.runs[name],
+                "skips": self.skips[name],
+                "skip_rate": round(self.skips[name] / total, 4) if total else 0.0,
+            }
+        return {"queries": self.queries, "groups": groups}
@@ -1,69 +1,33 @@
-import json
 import os
 from typing import Any, Dict
 
-import httpx
+from .conversion_memo import get_conversion_memo
+from .llm_scheduler import PRIORITY_INTERACTIVE
+from .ollama import build_chat_payload, chat_json_async, load_system_prompt, prompt_version, run_sync
 
 PROMPTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "prompts", "system_instructions.md")
 
 
 def _load_system_prompt() -> str:
-    try:
-        with open(PROMPTS_PATH, "r", encoding="utf-8") as f:
-            base = f.read()
-    except Exception:
-        base = ""
-    extra = (
-        "\n\nВажное требование по формату вывода:\n"
-        "Верни ТОЛЬКО JSON со структурой {\"filters\": object, \"page\": integer, \"page_size\": integer}."
-        " Без пояснений и текста вне JSON. Даты строго YYYY-MM-DD."
-    )
-    return base + extra
+    return load_system_prompt(PROMPTS_PATH)
 
 
-def nl_to_filters_via_ollama(query: str) -> Dict[str, Any]:
-    base_url = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
-    model = os.getenv("OLLAMA_MODEL", "qwen2.5:7b-instruct-q4_K_M")
+def nl_to_filters_via_ollama(query: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Синхронная версия для скриптов и CLI вне event loop: nl_to_filters_via_ollama_async через run_sync (та же очередь llm_scheduler)."""
+    return run_sync(lambda: nl_to_filters_via_ollama_async(query, priority=priority))
 
-    system_prompt = _load_system_prompt()
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": query},
-        ],
-        "options": {"temperature": 0.2},
-        "stream": False,
-    }
+async def nl_to_filters_via_ollama_async(query: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Неблокирующая версия для async-обработчиков (веб‑UI, MCP); ответ модели обрывается после JSON."""
+    payload = build_chat_payload(_load_system_prompt(), query)
+    return await chat_json_async(payload, priority=priority)
+
+
+async def nl_to_filters_via_ollama_cached_async(query: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """nl_to_filters_via_ollama_async через memo конвертации; смена промпта или модели меняет ключ."""
+    system_prompt = _load_system_prompt()
 
-    with httpx.Client(timeout=60) as client:
-        r = client.post(f"{base_url}/api/chat", json=payload)
-        r.raise_for_status()
-        data = r.json()
+    async def ask(text: str) -> Dict[str, Any]:
+        return await chat_json_async(build_chat_payload(system_prompt, text), priority=priority)
 
-    content = (
-        data.get("message", {}).get("content")
-        or data.get("choices", [{}])[0].get("message", {}).get("content")
-        or ""
-    )
-    # Попробуем выделить JSON
-    content_str = content.strip()
-    # Если LLM вернула Markdown-блоки с ```, попробуем вырезать
-    if content_str.startswith("```"):
-        # удалим обрамление
-        parts = content_str.split("```")
-        if len(parts) >= 3:
-            content_str = parts[1].strip()
-    # Парсим JSON
-    result = json.loads(content_str)
-    if not isinstance(result, dict):
-        raise ValueError("LLM output is not a JSON object")
-    # Базовая валидация
-    if "filters" not in result:
-        result["filters"] = {}
-    if "page" not in result:
-        result["page"] = 1
-    if "page_size" not in result:
-        result["page_size"] = 20
-    return result
+    return await get_conversion_memo().convert_async(query, "courts-llm", ask, prompt_version(system_prompt))
@@ -1,64 +1,60 @@
-import json
 import os
-from typing import Any, Dict
+import time
+from typing import Any, Callable, Dict, Optional
 
-import httpx
+from .conversion_memo import get_conversion_memo
+from .ollama import build_chat_payload, chat_json_async, load_system_prompt, prompt_version, run_sync
+from .llm_scheduler import PRIORITY_INTERACTIVE
+from .similarity_cache import get_similarity_cache
 
 PROMPTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "prompts", "system_instructions_batchcards.md")
 
 
 def _load_system_prompt() -> str:
-    try:
-        with open(PROMPTS_PATH, "r", encoding="utf-8") as f:
-            base = f.read()
-    except Exception:
-        base = ""
-    extra = (
-        "\n\nВажное требование по формату вывода:\n"
-        "Верни ТОЛЬКО JSON со структурой {\"filters\": object, \"page\": integer, \"page_size\": integer}."
-        " Без пояснений и текста вне JSON. Даты строго YYYY-MM-DD."
-    )
-    return base + extra
-
-
-def nl_to_batchcards_via_ollama(query: str) -> Dict[str, Any]:
-    base_url = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
-    model = os.getenv("OLLAMA_MODEL", "qwen2.5:7b-instruct-q4_K_M")
+    return load_system_prompt(PROMPTS_PATH)
+
+
+def nl_to_batchcards_via_ollama(query: str, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Синхронная версия для скриптов и CLI вне event loop: nl_to_batchcards_via_ollama_async через run_sync (та же очередь llm_scheduler)."""
+    return run_sync(lambda: nl_to_batchcards_via_ollama_async(query, priority=priority))
+
+
+OnFilters = Optional[Callable[[Dict[str, Any]], Any]]
 
-    system_prompt = _load_system_prompt()
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": query},
-        ],
-        "options": {"temperature": 0.2},
-        "stream": False,
-    }
-
-    with httpx.Client(timeout=60) as client:
-        r = client.post(f"{base_url}/api/chat", json=payload)
-        r.raise_for_status()
-        data = r.json()
-
-    content = (
-        data.get("message", {}).get("content")
-        or data.get("choices", [{}])[0].get("message", {}).get("content")
-        or ""
-    )
-    content_str = content.strip()
-    if content_str.startswith("```"):
-        parts = content_str.split("```")
-        if len(parts) >= 3:
-            content_str = parts[1].strip()
-    result = json.loads(content_str)
-    if not isinstance(result, dict):
-        raise ValueError("LLM output is not a JSON object")
-    if "filters" not in result:
-        result["filters"] = {}
-    if "page" not in result:
-        result["page"] = 1
-    if "page_size" not in result:
-        result["page_size"] = 20
-    return result
\ No newline at end of file
+async def nl_to_batchcards_via_ollama_async(query: str, on_filters: OnFilters = None, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Неблокирующая версия для async-обработчиков (веб‑UI, MCP).
+
+    Ответ читается потоком и обрывается после JSON (OLLAMA_STREAM=0 — целиком); on_filters получает
+    частичные filters по мере генерации. priority — место в очереди к Ollama (llm_scheduler).
+    """
+    return await chat_json_async(build_chat_payload(_load_system_prompt(), query), on_filters, priority)
+
+
+async def nl_to_batchcards_via_ollama_cached_async(
+    query: str,
+    on_filters: OnFilters = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> Dict[str, Any]:
+    """nl_to_batchcards_via_ollama_async через memo конвертации; смена промпта или модели меняет ключ.
+
+    Промах memo сначала ищется в кэше похожих запросов (similarity_cache): разбор перефразированного
+    запроса с числами и сущностями, пересобранными правилами, вместо нового вызова LLM.
+    on_filters вызывается только при настоящем вызове LLM.
+    """
+    system_prompt = _load_system_prompt()
+    version = prompt_version(system_prompt)
+    similar = get_similarity_cache()
+
+    async def ask(text: str) -> Dict[str, Any]:
+        if similar is not None:
+            hit = similar.lookup(text, version)
+            if hit is not None:
+                return hit
+        t0 = time.perf_counter()
+        result = await chat_json_async(build_chat_payload(system_prompt, text), on_filters, priority)
+        if similar is not None:
+            similar.add(text, result, time.perf_counter() - t0, version)
+        return result
+
+    return await get_conversion_memo().convert_async(query, "batchcards-llm", ask, version)
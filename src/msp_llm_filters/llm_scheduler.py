@@ -0,0 +1,202 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# Очередь генераций перед общей Ollama: не больше max_concurrency одновременно, остальные ждут
+# по приоритету (веб‑UI раньше пакетных прогонов), а запрос, которому по оценке ждать дольше
+# его срока, сразу получает LLMOverloaded — веб‑UI в этом случае отвечает правилами.
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+DEFAULT_MAX_CONCURRENCY = 4  # как OLLAMA_NUM_PARALLEL по умолчанию у Ollama
+DEFAULT_INTERACTIVE_DEADLINE_S = 15.0
+# Оценка длительности генерации до первых замеров
+DEFAULT_SERVICE_S = 2.0
+SERVICE_EWMA_ALPHA = 0.2
+
+# Границы корзин гистограмм (верхние, включительно); последняя корзина — всё, что больше
+WAIT_BUCKETS_MS: Tuple[float, ...] = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+DEPTH_BUCKETS: Tuple[int, ...] = (0, 1, 2, 4, 8, 16, 32, 64)
+
+T = TypeVar("T")
+
+
+class LLMOverloaded(RuntimeError):
+    """Генерация не начнётся до срока запроса: очередь к Ollama слишком длинная."""
+
+
+class Histogram:
+    """Счётчики по корзинам с фиксированными верхними границами."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{b:g}" for b in self.bounds] + ["inf"]
+        return {"buckets": dict(zip(labels, self.counts)), "count": self.total, "sum": round(self.sum, 3)}
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "enqueued", "removed")
+
+    def __init__(self, future: "asyncio.Future[None]", priority: int) -> None:
+        self.future = future
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.removed = False
+
+
+class LLMScheduler:
+    """Ограничение одновременных генераций и очередь с приоритетами и сроками.
+
+    Освободившийся слот сразу передаётся первому в очереди (меньший priority раньше, при равном —
+    по порядку прихода). Оценка ожидания — сколько запросов впереди, делённое на число слотов,
+    умноженное на среднее (EWMA) время генерации. deadline — сколько секунд запрос готов ждать
+    начала генерации: если оценка больше, отказ сразу; если срок вышел в очереди — отказ тогда.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, service_s: float = DEFAULT_SERVICE_S) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.service_s = service_s
+        self.running = 0
+        self._heap: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._queued = 0
+        self.max_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_ms = Histogram(WAIT_BUCKETS_MS)
+        self.depth = Histogram(DEPTH_BUCKETS)
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _ahead(self, priority: int) -> int:
+        return sum(1 for p, _, w in self._heap if not w.removed and p <= priority)
+
+    def estimated_wait(self, priority: int = PRIORITY_INTERACTIVE) -> float:
+        """Оценка ожидания начала генерации для нового запроса с таким приоритетом, секунды."""
+        if self.running < self.max_concurrency and not self._queued:
+            return 0.0
+        return (self._ahead(priority) + 1) / self.max_concurrency * self.service_s
+
+    async def run(self, fn: Callable[[], Awaitable[T]], priority: int = PRIORITY_INTERACTIVE, deadline: Optional[float] = None) -> T:
+        """Выполнить fn() в слоте; deadline — секунды ожидания в очереди (None — без срока)."""
+        self.depth.observe(self._queued)
+        if self.running < self.max_concurrency and not self._queued:
+            self.running += 1
+            self.wait_ms.observe(0.0)
+        else:
+            estimate = self.estimated_wait(priority)
+            if deadline is not None and estimate > deadline:
+                self.rejected += 1
+                raise LLMOverloaded(f"estimated LLM queue wait {estimate:.1f}s exceeds deadline {deadline:.1f}s")
+            await self._wait(priority, deadline)
+        self.admitted += 1
+        t0 = time.perf_counter()
+        try:
+            result = await fn()
+        except BaseException:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            elapsed = time.perf_counter() - t0
+            self.service_s += SERVICE_EWMA_ALPHA * (elapsed - self.service_s)
+            return result
+        finally:
+            self._release()
+
+    async def _wait(self, priority: int, deadline: Optional[float]) -> None:
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority)
+        heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+        self._queued += 1
+        self.max_depth = max(self.max_depth, self._queued)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), deadline)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Слот уже передан этому запросу — вернуть его следующему
+                self._release()
+            else:
+                waiter.removed = True
+                self._queued -= 1
+                waiter.future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.expired += 1
+                raise LLMOverloaded(f"LLM queue wait exceeded deadline {deadline:.1f}s") from None
+            raise
+        self.wait_ms.observe((time.perf_counter() - waiter.enqueued) * 1000)
+
+    def _release(self) -> None:
+        while self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter.removed:
+                continue
+            self._queued -= 1
+            waiter.future.set_result(None)  # слот переходит к ожидающему, running не меняется
+            return
+        self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "queued": self._queued,
+            "max_queued": self.max_depth,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "completed": self.completed,
+            "failed": self.failed,
+            "service_s": round(self.service_s, 3),
+            "estimated_wait_s": round(self.estimated_wait(), 3),
+            "wait_ms": self.wait_ms.to_dict(),
+            "queue_depth": self.depth.to_dict(),
+        }
+
+
+def llm_deadline(priority: int) -> Optional[float]:
+    """Срок ожидания очереди: LLM_DEADLINE_INTERACTIVE_S (15 с) для веб‑UI, LLM_DEADLINE_BATCH_S (без срока) для пакетных.
+
+    Пустое значение или 0 — без срока.
+    """
+    if priority <= PRIORITY_INTERACTIVE:
+        raw = os.getenv("LLM_DEADLINE_INTERACTIVE_S", str(DEFAULT_INTERACTIVE_DEADLINE_S))
+    else:
+        raw = os.getenv("LLM_DEADLINE_BATCH_S", "")
+    value = float(raw) if raw.strip() else 0.0
+    return value if value > 0 else None
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Планировщик на процесс; LLM_MAX_CONCURRENCY — одновременных генераций (по умолчанию 4)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(int(os.getenv("LLM_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY))))
+    return _scheduler
+
+
+async def schedule_llm(fn: Callable[[], Awaitable[T]], priority: int = PRIORITY_INTERACTIVE) -> T:
+    """fn() через общий планировщик со сроком по приоритету."""
+    return await get_llm_scheduler().run(fn, priority, llm_deadline(priority))
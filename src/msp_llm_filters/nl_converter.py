@@ -2,117 +2,166 @@ import re
 from typing import Dict, Any, Optional
 from datetime import datetime
 
+from .conversion_memo import get_conversion_memo
+from .court_index import get_court_index
+from .keyword_prefilter import RuleGroupPrefilter
+
+_MONTHS_GENITIVE = (
+    "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря",
+)
+
+# Секции конвертера и их триггеры: секция что-то выставляет, только если в запросе есть одна из основ
+_PREFILTER = RuleGroupPrefilter({
+    "dates": _MONTHS_GENITIVE + ("-", "/"),
+    "page_size": ("дел",),
+    "sort": ("цен", "по дате"),
+    "inn": ("инн",),
+    "role": ("ответчик", "истец"),
+    "court": ("арбитражн", "ас", "суд", "сип"),
+    "documents": ("документ", "включи"),
+})
+
+
+def prefilter_stats() -> Dict[str, Any]:
+    """Доли пропусков секций convert_nl_to_filters с момента запуска (или reset_stats)."""
+    return _PREFILTER.stats()
+
+
+# Слова, которые в названиях судов пишутся со строчной: «Арбитражный суд Челябинской области»
+_COURT_LOWER_WORDS = frozenset(("области", "края", "округа", "автономного", "автономной"))
+
+
+def _court_name(region: str) -> str:
+    """Название суда по региону из текста (без справочника): «челябинской области» -> «Арбитражный суд Челябинской области»."""
+    words = (w if w in _COURT_LOWER_WORDS else "-".join(p.capitalize() for p in w.split("-")) for w in region.split())
+    return "Арбитражный суд " + " ".join(words)
+
 
 def convert_nl_to_filters(query: str) -> Dict[str, Any]:
     """
     Простой rule-based конвертер NL → filters для локальной отладки.
     Не заменяет LLM, но помогает проверить логику маппинга.
+    Секции без триггеров в запросе пропускаются после одного прохода автомата (_PREFILTER).
     """
     filters: Dict[str, Any] = {}
     page_size = 20  # по умолчанию
     
     query_lower = query.lower()
-    
+    found = _PREFILTER.scan(query_lower)
+
     # Даты (простейшие случаи)
-    date_patterns = [
-        (r"(\d{1,2}) (января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря) (\d{4})", "single_date"),
-        (r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})", "iso_date"),
-    ]
-    
-    for pattern, date_type in date_patterns:
-        match = re.search(pattern, query_lower)
-        if match:
-            if date_type == "single_date":
-                day, month_name, year = match.groups()
-                month_map = {
-                    "января": "01", "февраля": "02", "марта": "03", "апреля": "04",
-                    "мая": "05", "июня": "06", "июля": "07", "августа": "08",
-                    "сентября": "09", "октября": "10", "ноября": "11", "декабря": "12"
-                }
-                month = month_map.get(month_name, "01")
-                date_str = f"{year}-{month}-{day.zfill(2)}"
-                filters["start_date_from"] = date_str
-                filters["start_date_to"] = date_str
-            elif date_type == "iso_date":
-                year, month, day = match.groups()
-                date_str = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-                filters["start_date_from"] = date_str
-                filters["start_date_to"] = date_str
-    
+    if _PREFILTER.should_run("dates", found):
+        date_patterns = [
+            (r"(\d{1,2}) (января|февраля|марта|апреля|мая|июня|июля|августа|сентября|октября|ноября|декабря) (\d{4})", "single_date"),
+            (r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})", "iso_date"),
+        ]
+
+        for pattern, date_type in date_patterns:
+            match = re.search(pattern, query_lower)
+            if match:
+                if date_type == "single_date":
+                    day, month_name, year = match.groups()
+                    month_map = {
+                        "января": "01", "февраля": "02", "марта": "03", "апреля": "04",
+                        "мая": "05", "июня": "06", "июля": "07", "августа": "08",
+                        "сентября": "09", "октября": "10", "ноября": "11", "декабря": "12"
+                    }
+                    month = month_map.get(month_name, "01")
+                    date_str = f"{year}-{month}-{day.zfill(2)}"
+                    filters["start_date_from"] = date_str
+                    filters["start_date_to"] = date_str
+                elif date_type == "iso_date":
+                    year, month, day = match.groups()
+                    date_str = f"{year}-{month.zfill(2)}-{day.zfill(2)}"
+                    filters["start_date_from"] = date_str
+                    filters["start_date_to"] = date_str
+
     # Количество дел (цифрами)
-    count_match = re.search(r"(\d+)\s+дел", query_lower)
-    if count_match:
-        page_size = min(int(count_match.group(1)), 100)
-    else:
-        # Количество дел (словами): один, два, три, четыре, пять, шесть, семь, восемь, девять, десять
-        num_words = {
-            "один": 1, "одна": 1, "одно": 1, "перв": 1,
-            "два": 2, "две": 2, "втор": 2,
-            "три": 3, "треть": 3,
-            "четыре": 4, "четвер": 4,
-            "пять": 5, "пят": 5,
-            "шесть": 6, "шест": 6,
-            "семь": 7, "седь": 7,
-            "восемь": 8, "восьм": 8,
-            "девять": 9, "девят": 9,
-            "десять": 10, "десят": 10,
-            "двадцать": 20
-        }
-        # ищем шаблоны вида "(слово-числительное) (дел|дела|дело)"
-        word_match = re.search(r"\b([а-яё]+)\s+дел\w*", query_lower)
-        if word_match:
-            w = word_match.group(1)
-            # нормализуем до основы (берём первые 5 символов для эвристики суффиксов)
-            value = None
-            if w in num_words:
-                value = num_words[w]
-            else:
-                # попробуем по префиксу
-                for k, v in num_words.items():
-                    if w.startswith(k[:5]):
-                        value = v
-                        break
-            if value:
-                page_size = min(int(value), 100)
-    
-    # Сортировка
-    if "по цене иска" in query_lower or "цен" in query_lower:
-        filters["sort"] = "sum"
-        filters["order"] = "DESC"  # обычно хотят от большего к меньшему
-    elif "по дате" in query_lower:
-        filters["sort"] = "date_start"
-        if "возраст" in query_lower:
-            filters["order"] = "ASC"
+    if _PREFILTER.should_run("page_size", found):
+        count_match = re.search(r"(\d+)\s+дел", query_lower)
+        if count_match:
+            page_size = min(int(count_match.group(1)), 100)
         else:
-            filters["order"] = "DESC"
-    
+            # Количество дел (словами): один, два, три, четыре, пять, шесть, семь, восемь, девять, десять
+            num_words = {
+                "один": 1, "одна": 1, "одно": 1, "перв": 1,
+                "два": 2, "две": 2, "втор": 2,
+                "три": 3, "треть": 3,
+                "четыре": 4, "четвер": 4,
+                "пять": 5, "пят": 5,
+                "шесть": 6, "шест": 6,
+                "семь": 7, "седь": 7,
+                "восемь": 8, "восьм": 8,
+                "девять": 9, "девят": 9,
+                "десять": 10, "десят": 10,
+                "двадцать": 20
+            }
+            # ищем шаблоны вида "(слово-числительное) (дел|дела|дело)"
+            word_match = re.search(r"\b([а-яё]+)\s+дел\w*", query_lower)
+            if word_match:
+                w = word_match.group(1)
+                # нормализуем до основы (берём первые 5 символов для эвристики суффиксов)
+                value = None
+                if w in num_words:
+                    value = num_words[w]
+                else:
+                    # попробуем по префиксу
+                    for k, v in num_words.items():
+                        if w.startswith(k[:5]):
+                            value = v
+                            break
+                if value:
+                    page_size = min(int(value), 100)
+
+    # Сортировка
+    if _PREFILTER.should_run("sort", found):
+        if "по цене иска" in query_lower or "цен" in query_lower:
+            filters["sort"] = "sum"
+            filters["order"] = "DESC"  # обычно хотят от большего к меньшему
+        elif "по дате" in query_lower:
+            filters["sort"] = "date_start"
+            if "возраст" in query_lower:
+                filters["order"] = "ASC"
+            else:
+                filters["order"] = "DESC"
+
     # ИНН
-    inn_match = re.search(r"инн[\s:]*([\d]{10,12})", query_lower)
-    if inn_match:
-        filters["participant"] = inn_match.group(1)
-    
+    if _PREFILTER.should_run("inn", found):
+        inn_match = re.search(r"инн[\s:]*([\d]{10,12})", query_lower)
+        if inn_match:
+            filters["participant"] = inn_match.group(1)
+
     # Роль
-    if "ответчик" in query_lower:
-        filters["role"] = "RESPONDENT"
-    elif "истец" in query_lower:
-        filters["role"] = "PLAINTIFF"
-    
-    # Суд: полное название
-    court_match = re.search(r"арбитражн[а-яё]+\s+суд[а-яё]*\s+([а-яё\s]+област[а-яё]|[а-яё\s]+кра[а-яё]|[а-яё\s]+республик[а-яё])", query_lower)
-    if court_match:
-        region = court_match.group(1).strip()
-        filters["court"] = f"Арбитражный суд {region.title()}"
-    else:
-        # Аббревиатура: "АС Челябинской области" → "Арбитражный суд Челябинской области"
-        ac_match = re.search(r"\bас\s+([а-яё\s]+област[а-яё]|[а-яё\s]+кра[а-яё]|[а-яё\s]+республик[а-яё])\b", query_lower)
-        if ac_match:
-            region = ac_match.group(1).strip()
-            filters["court"] = f"Арбитражный суд {region.title()}"
-    
+    if _PREFILTER.should_run("role", found):
+        if "ответчик" in query_lower:
+            filters["role"] = "RESPONDENT"
+        elif "истец" in query_lower:
+            filters["role"] = "PLAINTIFF"
+
+    # Суд: по справочнику list_courts (снимок MCP-сервера), иначе — полное название/аббревиатура из текста
+    if _PREFILTER.should_run("court", found):
+        index = get_court_index()
+        # anchored: «ас» в префильтре — подстрока («облАСти», «клАСс»), суд ищем только у слова «суд»/АС/ААС/ФАС/СИП
+        court = index.resolve(query_lower, anchored=True) if index is not None else None
+        court_match = re.search(r"арбитражн[а-яё]+\s+суд[а-яё]*\s+([а-яё\s]+област[а-яё]|[а-яё\s]+кра[а-яё]|[а-яё\s]+республик[а-яё])", query_lower)
+        if court is not None:
+            filters["court"] = court.name
+        elif court_match:
+            region = court_match.group(1).strip()
+            filters["court"] = _court_name(region)
+        else:
+            # Аббревиатура: "АС Челябинской области" → "Арбитражный суд Челябинской области"
+            ac_match = re.search(r"\bас\s+([а-яё\s]+област[а-яё]|[а-яё\s]+кра[а-яё]|[а-яё\s]+республик[а-яё])\b", query_lower)
+            if ac_match:
+                region = ac_match.group(1).strip()
+                filters["court"] = _court_name(region)
+
     # Документы
-    if "документ" in query_lower or "включи" in query_lower:
-        filters["need_document"] = True
-    
+    if _PREFILTER.should_run("documents", found):
+        if "документ" in query_lower or "включи" in query_lower:
+            filters["need_document"] = True
+
     return {
         "filters": filters,
         "page": 1,
@@ -120,6 +169,17 @@ def convert_nl_to_filters(query: str) -> Dict[str, Any]:
     }
 
 
+def convert_nl_to_filters_cached(query: str) -> Dict[str, Any]:
+    """convert_nl_to_filters через memo конвертации: нормализованный запрос, результат — копия.
+
+    Версия записи — версия справочника судов: после обновления снимка разбор пересчитывается.
+    Правила работают с query.lower(), поэтому ключ — без учёта регистра.
+    """
+    index = get_court_index()
+    version = index.version if index is not None else ""
+    return get_conversion_memo().convert(query, "courts-rules", convert_nl_to_filters, version, fold_case=True)
+
+
 if __name__ == "__main__":
     # Тестовые примеры
     examples = [
@@ -1,75 +1,308 @@
 import re
-from typing import Dict, Any, List
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+from .classifiers import get_classifier, known_codes
+from .conversion_memo import get_conversion_memo
+from .keyword_prefilter import RuleGroupPrefilter
+from .quantities import KEYWORD_STEMS, Quantity, bounds, quantity_clauses, tokenize_quantities
+from .regions import get_gazetteer
+
+
+# ---- Таблица паттернов ----
+# Все регулярки конвертера в одном месте: имя -> (паттерн, якоря). Компилируются один раз при импорте.
+# Якоря — подстроки, без одной из которых совпадения быть не может: если ни одной нет в запросе,
+# регулярка не запускается. Во время разбора каждая регулярка выполняется не больше одного раза.
+
+_DATE_RANGE = r"с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})"
+
+_PATTERNS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "page_size": (r"(\d+)\s+(компан|контрагент|запис|дел)", ("компан", "контрагент", "запис", "дел")),
+    "search_text": (r"(поиск|содержит|ключев\w* слово)\s*[:\-]?\s*([а-яa-z0-9\s\-\.,]+)$", ("поиск", "содержит", "ключев")),
+    # Код ОКВЭД — не сумма («больше 10 млн») и не закон («44-ФЗ»)
+    "okved_code": (r"\b\d{2}(?:\.\d{1,2}){0,2}\b(?!\s*(?:тыс|млн|млрд|%)|\s*-?\s*фз)", ()),
+    # Вид деятельности словами: «оквэд разработка ПО», «вид деятельности: грузовые перевозки»
+    "okved_phrase": (r"(?:оквэд[а-яё0-9]*|вид[а-яё]*\s+деятельност[а-яё]*)\s*[:\-—]?\s*([а-яёa-z][а-яёa-z\s\-]*?)\s*(?=,|;|$)", ("оквэд", "деятельност")),
+    # География
+    "region_number": (r"\b(\d{2})\b\s*регион", ("регион",)),
+    # Тип контрагента / ОПФ
+    "ip": (r"\bип\b", ("ип",)),
+    "not_ip": (r"\bне\s+ип\b", ("ип",)),
+    "ip_any": (r"\bип\b|индивидуальн[а-яё]*\s+предпринимател", ("ип", "предпринимател")),
+    "not_ul": (r"\bне\s+(?:юр(?:лиц|идическ)[а-яё]*|ооо|ао|зао|oao|ul)\b", ("не",)),
+    "ul_any": (r"юр(лиц|идическ)[а-яё]*|\bооо\b|\bао\b|\bзао\b|\boao\b", ("юр", "ооо", "ао", "oao")),
+    "fl_any": (r"физ(ическ)[а-яё]*\s+лиц", ("лиц",)),
+    "opf_ul": (r"\bул\b|юр(лиц|идическ)", ("ул", "юр")),
+    "opf_not_ul": (r"\bне\s+(?:ул|юр(?:лиц|идическ))\b", ("ул", "юр")),
+    # Флаги
+    "active_only": (r"только действующ|действующие", ("действующ",)),
+    "with_income": (r"с выручко|есть выручка", ("выручк",)),
+    "with_bfo": (r"с бфо", ("бфо",)),
+    "with_phones": (r"только с телефонами|с\s+телефон", ("телефон",)),
+    "with_emails": (r"только с почта|с email|с e-mail", ("почта", "email", "e-mail")),
+    "with_websites": (r"только с сайт|с\s+сайт", ("сайт",)),
+    "it_companies": (r"аккредитованн[а-яё]*\s+ит|ит-компан|ит компании", ("аккредитованн", "ит-компан", "ит компании")),
+    "okved_additional": (r"по\s+доп(олнительным)?\s+оквэд", ("оквэд",)),
+    "okved_exclude_additional": (r"исключать\s+по\s+доп(олнительным)?\s+оквэд", ("исключать",)),
+    "contacts_and": (r"контактн[а-яё]*\s+услови[яе].*\bи\b|одновременно", ("услови", "одновременно")),
+    # Финансы
+    "report_year": (r"за\s+(\d{4})\s*год", ("год",)),
+    # Даты
+    "established": (rf"создан\w*\s*{_DATE_RANGE}", ("создан",)),
+    "terminated": (rf"прекращен\w*\s*{_DATE_RANGE}", ("прекращен",)),
+    # МСП, ювелиры, СРО
+    "innovative": (r"инновационн", ("инновационн",)),
+    "partner": (r"партнер", ("партнер",)),
+    "msp": (r"мсп", ("мсп",)),
+    "social": (r"социальн", ("социальн",)),
+    "enterprise": (r"предприяти", ("предприяти",)),
+    "jewelry": (r"ювелир", ("ювелир",)),
+    "nostroy": (r"нострой", ("нострой",)),
+    "nopriz": (r"ноприз", ("ноприз",)),
+    # Лицензии, поддержка
+    "license": (r"\b\d{5,7}\b(?=.*лиценз)", ("лиценз",)),
+    "support_form": (r"\b\d{2,4}\b(?=.*поддержк)", ("поддержк",)),
+    "specialization": (r"специализирующ[а-яё]*\s*ся\s*на\s*([а-яa-z0-9\-\s]+?)(?:[,.]|$)", ("специализирующ",)),
+    # Росаккредитация
+    "ra_type": (r"(декларац[ия]|сертификат|декларация\s+или\s+сертификат)", ("декларац", "сертификат")),
+    "ra_description": (r"росаккред[а-яё\s,]*:(.*)$", ("росаккред",)),
+    # Вакансии
+    "vacancies": (
+        r"ваканси|работа|найм|поиск\s+сотрудник|\bищут\b|\bищем\b|нанимают|нужн[ыо]|требуютс[я]",
+        ("ваканси", "работа", "найм", "сотрудник", "ищ", "нанимают", "нужн", "требуютс"),
+    ),
+    "vac_active": (r"активн|актуал|открыт", ("активн", "актуал", "открыт")),
+    "vac_text": (r"(?:ваканси[яи]?|работа)\s*(?:по|с)\s*([а-яa-z0-9\-\s]+)", ("ваканси", "работа")),
+    "vac_hiring_text": (
+        r"(?:ищут|ищем|нанимают|нужн[ыо]|требуютс[я])\s+([а-яa-z0-9\-\s]+?)(?:[,.]|\bсо\b|$)",
+        ("ищ", "нанимают", "нужн", "требуютс"),
+    ),
+    "developer": (r"разработчик|программист|software\s*engineer|developer", ("разработчик", "программист", "software", "developer")),
+    "hh": (r"\bhh\b|head\s*hun\w*|хэдхантер", ("hh", "head", "хэдхантер")),
+    "vac_region": (r"в\s+регион[еу]?\s*(\d{2})", ("регион",)),
+    "published": (rf"публикован[а-яё\s]*{_DATE_RANGE}", ("публикован",)),
+    # Лизинг
+    "leases": (r"лизинг|лизингов\w+\s+договор|договор\s+лизинга", ("лизинг",)),
+    "lease_active": (r"активн|действующ", ("активн", "действующ")),
+    "lease_contract_dates": (rf"догов[оа]р[а-яё\s]*{_DATE_RANGE}", ("догов",)),
+    "lease_stop_dates": (rf"прекращен[а-яё\s]*{_DATE_RANGE}", ("прекращен",)),
+    "lessor": (r"лизингодател|арендодател", ("лизингодател", "арендодател")),
+    "lessee": (r"лизингополучател|арендатор", ("лизингополучател", "арендатор")),
+    "classifier_code": (r"\b\d{7}\b", ()),
+    "lease_text": (r"лизинг\w*\s*(?:по|с)\s*([а-яa-z0-9\-\s]+)", ("лизинг",)),
+    # Контракты
+    "contracts": (r"контракт|закупк|госконтракт|тендер|торг[аи]?|госзаказ", ("контракт", "закупк", "тендер", "торг", "госзаказ")),
+    "fz44": (r"44[-\s]?фз|fz44", ("44",)),
+    "fz223": (r"223[-\s]?фз|fz223", ("223",)),
+    "supplier": (r"поставщик|исполнител", ("поставщик", "исполнител")),
+    "customer": (r"заказчик|покупател", ("заказчик", "покупател")),
+    "contract_dates": (rf"(контракт|закупк)[а-яё\s]*{_DATE_RANGE}", ("контракт", "закупк")),
+    "subject": (r"по\s+предмет[ау]\s*([а-яa-z0-9\-\s]+)", ("предмет",)),
+    "okpd2_code": (r"\b\d{2}\.\d{2}\.\d{2}\.\d{3}\b", ()),
+    "contract_region": (r"регион[еу]?\s*(\d{2})", ("регион",)),
+    # Адрес
+    "address": (r"адрес|в\s+городе|в\s+г\.|по\s+городу", ("адрес", "город", "г.")),
+}
+
+# Паттерны, которые применяются к исходному запросу, а не к q.lower(): город берём с регистром
+_ORIGINAL_CASE: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "city": (r"(?i)(?:в|по)\s+(?:г\.|город[а-яё]*)\s*([А-Яа-яё\-\s]+?)(?=,|$)", ("г.", "город")),
+}
+
+# имя -> (скомпилированный паттерн, якоря, по исходному тексту)
+_COMPILED: Dict[str, Tuple["re.Pattern[str]", FrozenSet[str], bool]] = {
+    name: (re.compile(p), frozenset(anchors), False) for name, (p, anchors) in _PATTERNS.items()
+}
+_COMPILED.update(
+    {name: (re.compile(p, re.IGNORECASE), frozenset(anchors), True) for name, (p, anchors) in _ORIGINAL_CASE.items()}
+)
+
+_QUANTITY_STEMS = frozenset(KEYWORD_STEMS)
+
+
+class MatchContext:
+    """Запрос и мемоизированные результаты паттернов из таблицы.
+
+    found — основы (триггеры групп и якоря паттернов), найденные одним проходом автомата.
+    Один и тот же паттерн (например, «NN регион») нужен нескольким правилам —
+    по тексту он проходит один раз за запрос, а без якоря в запросе не проходит вовсе.
+    Так же один раз считаются регионы по словарю субъектов (regions()) и величины —
+    суммы, зарплаты, цены, численность, проценты (quantities()).
+
+    track=True — ещё и запоминать, какие участки текста правила использовали (spans): совпадения
+    паттернов с их якорями, регионы, фразы о величинах, подстроки has(). Нужно для coverage().
+    """
 
-def _to_number(s: str) -> float:
-    s = s.strip().replace(" ", "").replace("\u00A0", "").replace(",", ".")
-    try:
-        return float(s)
-    except Exception:
-        return 0.0
+    __slots__ = ("query", "q", "found", "spans", "_search", "_findall", "_regions", "_quantities")
+
+    def __init__(self, query: str, track: bool = False) -> None:
+        self.query = query
+        self.q = query.lower()
+        self.found = PREFILTER.scan(self.q)
+        self.spans: Optional[List[Tuple[int, int]]] = [] if track else None
+        self._search: Dict[str, Optional["re.Match[str]"]] = {}
+        self._findall: Dict[str, List[Any]] = {}
+        self._regions: Optional[List[str]] = None
+        self._quantities: Optional[List[Quantity]] = None
+
+    def _track(self, name: str, spans: List[Tuple[int, int]]) -> None:
+        # Якорь паттерна с просмотром вперёд («123456 … лицензия») в совпадение не входит
+        if not spans:
+            return
+        self.spans.extend(spans)
+        q = self.q
+        for anchor in _COMPILED[name][1] & self.found:
+            i = q.find(anchor)
+            while i >= 0:
+                self.spans.append((i, i + len(anchor)))
+                i = q.find(anchor, i + 1)
+
+    def _run(self, name: str, method: str) -> Any:
+        rx, anchors, original = _COMPILED[name]
+        if anchors and anchors.isdisjoint(self.found):
+            return None
+        return getattr(rx, method)(self.query if original else self.q)
+
+    def search(self, name: str) -> Optional["re.Match[str]"]:
+        memo = self._search
+        if name in memo:
+            return memo[name]
+        m = memo[name] = self._run(name, "search")
+        if m is not None and self.spans is not None:
+            self._track(name, [m.span()])
+        return m
+
+    def findall(self, name: str) -> List[Any]:
+        memo = self._findall
+        if name in memo:
+            return memo[name]
+        if self.spans is None:
+            found = memo[name] = self._run(name, "findall") or []
+            return found
+        matches = list(self._run(name, "finditer") or ())
+        self._track(name, [m.span() for m in matches])
+        found = memo[name] = [_findall_item(m) for m in matches]
+        return found
+
+    def regions(self) -> List[str]:
+        """Коды субъектов РФ, названных в запросе словами, в порядке упоминания."""
+        if self._regions is None:
+            gazetteer = get_gazetteer()
+            if gazetteer.stems.isdisjoint(self.found):
+                self._regions = []
+            elif self.spans is None:
+                self._regions = gazetteer.codes(self.q)
+            else:
+                spans = gazetteer.spans(self.q)
+                self.spans.extend((start, end) for _, start, end in spans)
+                self._regions = list(dict.fromkeys(code for code, _, _ in spans))
+        return self._regions
+
+    def quantities(self) -> List[Quantity]:
+        """Величины запроса с единицей, сравнением и ключевым словом — один проход на все правила."""
+        if self._quantities is None:
+            found = self.found
+            self._quantities = [] if _QUANTITY_STEMS.isdisjoint(found) else tokenize_quantities(self.q, found)
+        return self._quantities
+
+    def bounds(self, kind: str) -> Tuple[Optional[Quantity], Optional[Quantity]]:
+        lo, hi = bounds(self.quantities(), kind)
+        if (lo or hi) and self.spans is not None:
+            self.spans.extend((start, end) for k, start, end in quantity_clauses(self.q, self.found) if k == kind)
+        return lo, hi
+
+    def has(self, *substrings: str) -> bool:
+        q = self.q
+        for s in substrings:
+            if s in q:
+                if self.spans is not None:
+                    i = q.find(s)
+                    self.spans.append((i, i + len(s)))
+                return True
+        return False
+
+
+def _findall_item(m: "re.Match[str]") -> Any:
+    # То же, что элемент re.findall: всё совпадение, одна группа или кортеж групп
+    groups = m.groups("")
+    if not groups:
+        return m.group(0)
+    return groups[0] if len(groups) == 1 else groups
+
+
+Rule = Callable[[MatchContext, Dict[str, Any]], None]
+
+
+def _flags(table: Sequence[Tuple[str, Any, Tuple[str, ...]]]) -> Rule:
+    """Правило из таблицы флагов: (поле, значение, паттерны) — значение ставится, если совпали все паттерны."""
+
+    def rule(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+        search = ctx.search
+        for key, value, names in table:
+            for name in names:
+                if search(name) is None:
+                    break
+            else:
+                filters[key] = value
+
+    return rule
+
+
+def _date_ranges(table: Sequence[Tuple[str, str, str]]) -> Rule:
+    """Правило из таблицы диапазонов дат: (паттерн, поле «с», поле «по»)."""
+
+    def rule(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+        for name, key_from, key_to in table:
+            m = ctx.search(name)
+            if m:
+                filters[key_from] = m.group(1)
+                filters[key_to] = m.group(2)
 
+    return rule
 
-def _rubles_to_thousands(value_rub: float) -> int:
-    return int(round(value_rub / 1000.0))
 
+def _add_region(filters: Dict[str, Any], code: str) -> None:
+    filters.setdefault("region_codes", [])
+    if code not in filters["region_codes"]:
+        filters["region_codes"].append(code)
 
-def convert_nl_to_batchcards(query: str) -> Dict[str, Any]:
-    """
-    Простой rule-based конвертер NL → тело запроса для batchCardsByFilters.
-    Возвращает структуру {filters, page, page_size}, где filters — это плоский JSON для тела POST.
-    """
-    q = query.lower()
-    filters: Dict[str, Any] = {}
-    page_size = 50  # по умолчанию
 
-    # Количество: "покажи 200 компаний" / "20 контрагентов"
-    m = re.search(r"(\d+)\s+(компан|контрагент|запис|дел)", q)
-    if m:
-        try:
-            page_size = int(m.group(1))
-        except Exception:
-            pass
-
-    # Свободный текст
-    m = re.search(r"(поиск|содержит|ключев\w* слово)\s*[:\-]?\s*([а-яa-z0-9\s\-\.,]+)$", q)
+# ---- Правила ----
+def _rule_search_text(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    m = ctx.search("search_text")
     if m:
         filters["search_text"] = m.group(2).strip()
 
+
+def _rule_okveds(ctx: MatchContext, filters: Dict[str, Any]) -> None:
     # ОКВЭДы: ищем только если явно упоминается ОКВЭД/вид деятельности
-    if "оквэд" in q or "вид деятель" in q or "виды деятель" in q:
-        okveds = re.findall(r"\b\d{2}(?:\.\d{1,2}){0,2}\b", q)
+    # Коды проверяются по классификатору (okved2 из classifiers.py); без кодов — поиск по описанию
+    if ctx.has("оквэд", "вид деятель", "виды деятель"):
+        okved = get_classifier("okved2")
+        okveds = known_codes(okved, ctx.findall("okved_code"))
+        if not okveds and okved is not None:
+            m = ctx.search("okved_phrase")
+            if m:
+                okveds = okved.search(m.group(1), limit=1)
         if okveds:
-            filters["okveds"] = list(dict.fromkeys(okveds))
-
-    # Регионы (по словам) — базовое покрытие для частых случаев
-    # Москва (77) vs Московская область (50); СПб (78)
-    if re.search(r"\bмосковск[а-яё]+\s+област", q):
-        filters.setdefault("region_codes", [])
-        if "50" not in filters["region_codes"]:
-            filters["region_codes"].append("50")
-    elif re.search(r"\bмоскв[ае]\b|\bмск\b", q):
-        filters.setdefault("region_codes", [])
-        if "77" not in filters["region_codes"]:
-            filters["region_codes"].append("77")
-    if re.search(r"\bсанкт[-\s]?петербург\b|\bспб\b", q):
-        filters.setdefault("region_codes", [])
-        if "78" not in filters["region_codes"]:
-            filters["region_codes"].append("78")
-
-    # Регионы (цифрами): "77 регион"
-    region_codes = re.findall(r"\b(\d{2})\b\s*регион", q)
-    if region_codes:
-        filters.setdefault("region_codes", [])
-        for rc in region_codes:
-            if rc not in filters["region_codes"]:
-                filters["region_codes"].append(rc)
-
-    # Тип контрагента (с учётом отрицаний, напр. "не ип")
-    neg_ip = re.search(r"\bне\s+ип\b", q) is not None
-    pos_ip = re.search(r"\bип\b|индивидуальн[а-яё]*\s+предпринимател", q) is not None
-    neg_ul = re.search(r"\bне\s+(?:юр(?:лиц|идическ)[а-яё]*|ооо|ао|зао|oao|ul)\b", q) is not None
-    pos_ul = re.search(r"юр(лиц|идическ)[а-яё]*|\bооо\b|\bао\b|\bзао\b|\boao\b", q) is not None
-    pos_fl = re.search(r"физ(ическ)[а-яё]*\s+лиц", q) is not None
+            filters["okveds"] = okveds
+
+
+def _rule_regions(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Субъекты словами: «в Татарстане», «по Свердловской обл.», «Москва и Московская область»
+    for rc in ctx.regions():
+        _add_region(filters, rc)
+    # Регионы цифрами: "77 регион"
+    for rc in ctx.findall("region_number"):
+        _add_region(filters, rc)
+
+
+def _rule_counterparty(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Тип контрагента с учётом отрицаний ("не ип")
+    neg_ip = ctx.search("not_ip") is not None
+    pos_ip = ctx.search("ip_any") is not None
+    neg_ul = ctx.search("not_ul") is not None
+    pos_ul = ctx.search("ul_any") is not None
+    pos_fl = ctx.search("fl_any") is not None
 
     if pos_ip and not neg_ip and not pos_ul:
         filters["counterparty_type"] = "ip"
@@ -77,361 +310,423 @@ def convert_nl_to_batchcards(query: str) -> Dict[str, Any]:
         filters["counterparty_type"] = "ul"
     elif pos_fl:
         filters["counterparty_type"] = "fl"
-    elif neg_ip and ("компан" in q or pos_ul) and not neg_ul:
+    elif neg_ip and (ctx.has("компан") or pos_ul) and not neg_ul:
         # Явно исключили ИП и упомянули "компании" или UL-маркеры — считаем UL
         filters["counterparty_type"] = "ul"
 
-    # Флаги
-    if "только действующ" in q or "действующие" in q:
-        filters["only_active"] = True
-    if "с выручко" in q or "есть выручка" in q:
-        filters["has_income"] = True
-    if "только с бфо" in q or "с бфо" in q:
-        filters["only_with_bfo"] = True
-    if "только с телефонами" in q or re.search(r"с\s+телефон", q):
-        filters["only_with_phones"] = True
-    if "только с почта" in q or "с email" in q or "с e-mail" in q:
-        filters["only_with_emails"] = True
-    if "только с сайт" in q or re.search(r"с\s+сайт", q):
-        filters["only_with_websites"] = True
-    # Аккредитованные ИТ‑компании
-    if re.search(r"аккредитованн[а-яё]*\s+ит", q) or "ит-компан" in q or "ит компании" in q:
-        filters["only_it_companies"] = True
-
-    # Основные/доп. ОКВЭДы
-    if re.search(r"по\s+доп(олнительным)?\s+оквэд", q):
-        filters["only_main_okveds"] = False
-    if re.search(r"исключать\s+по\s+доп(олнительным)?\s+оквэд", q):
-        filters["exclude_only_main_okveds"] = False
-
-    # Условие И/ИЛИ для контактов
-    if re.search(r"контактн[а-яё]*\s+услови[яе].*\bи\b|одновременно", q):
+
+def _rule_contact_operator(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    if ctx.search("contacts_and"):
         filters["contact_conditions_operator"] = "AND"
-    elif "или" in q:
+    elif ctx.has("или"):
         filters["contact_conditions_operator"] = "OR"
 
-    # Диапазоны выручки (API ждёт тыс. рублей)
-    # Допускаем «составляет/≈/около» между словом «выручка» и сравнением
-    filler = r"(?:[а-яё\s,:()–-]{0,40}?)"
-    # 1) "выручка ... от X до Y"
-    m = re.search(rf"выручк\w*{filler}от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)\s*(тыс|млн|миллион|млрд|миллиард)?(?:\s*(?:руб(?:\.|лей|ля)?|р\.?|₽))?", q)
-    if m:
-        x = _to_number(m.group(1))
-        y = _to_number(m.group(2))
-        unit = (m.group(3) or '').lower()
-        mult = 1.0
-        if unit in ("млн", "миллион", "миллиона", "миллионов"):
-            mult = 1_000_000.0
-        elif unit in ("млрд", "миллиард", "миллиарда", "миллиардов"):
-            mult = 1_000_000_000.0
-        filters["income_from"] = _rubles_to_thousands(x * mult)
-        filters["income_to"] = _rubles_to_thousands(y * mult)
-    else:
-        # 2) "выручка ... больше/свыше/не менее X"
-        m = re.search(rf"выручк\w*{filler}(?:>|больше|свыше|выше|не\s*менее|от)\s*([\d\s.,]+)\s*(тыс|млн|миллион|млрд|миллиард)?(?:\s*(?:руб(?:\.|лей|ля)?|р\.?|₽))?", q)
-        if m:
-            x = _to_number(m.group(1))
-            unit = (m.group(2) or '').lower()
-            mult = 1.0
-            if unit in ("млн", "миллион", "миллиона", "миллионов"):
-                mult = 1_000_000.0
-            elif unit in ("млрд", "миллиард", "миллиарда", "миллиардов"):
-                mult = 1_000_000_000.0
-            filters["income_from"] = _rubles_to_thousands(x * mult)
-        else:
-            # 3) "выручка ... до X"
-            m = re.search(rf"выручк\w*{filler}до\s*([\d\s.,]+)\s*(тыс|млн|миллион|млрд|миллиард)?(?:\s*(?:руб(?:\.|лей|ля)?|р\.?|₽))?", q)
-            if m:
-                x = _to_number(m.group(1))
-                unit = (m.group(2) or '').lower()
-                mult = 1.0
-                if unit in ("млн", "миллион", "миллиона", "миллионов"):
-                    mult = 1_000_000.0
-                elif unit in ("млрд", "миллиард", "миллиарда", "миллиардов"):
-                    mult = 1_000_000_000.0
-                filters["income_to"] = _rubles_to_thousands(x * mult)
-
-    # Fallback: "выручка ... составляет [больше] X" (если ранее не сработало)
-    if "income_from" not in filters and "income_to" not in filters:
-        m = re.search(rf"выручк\w*{filler}(?:составля[ею]т|сост\.)\s*(?:>|больше|свыше|выше|не\s*менее|от)?\s*([\d\s.,]+)\s*(тыс|млн|миллион|млрд|миллиард)?(?:\s*(?:руб(?:\.|лей|ля)?|р\.?|₽))?", q)
-        if m:
-            x = _to_number(m.group(1))
-            unit = (m.group(2) or '').lower()
-            mult = 1.0
-            if unit in ("тыс", "тысяч", "тысяча", "тысячи"):
-                mult = 1_000.0
-            elif unit in ("млн", "миллион", "миллиона", "миллионов"):
-                mult = 1_000_000.0
-            elif unit in ("млрд", "миллиард", "миллиарда", "миллиардов"):
-                mult = 1_000_000_000.0
-            filters["income_from"] = _rubles_to_thousands(x * mult)
-
-    # Диапазоны прибыли (в тыс. руб.)
-    m = re.search(r"прибыл\w*\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)", q)
-    if m:
-        filters["net_income_from"] = _rubles_to_thousands(_to_number(m.group(1)))
-        filters["net_income_to"] = _rubles_to_thousands(_to_number(m.group(2)))
 
-    # Отчётный год для финансов
-    m = re.search(r"за\s+(\d{4})\s*год", q)
-    if m:
-        try:
-            filters["finance_report_year"] = int(m.group(1))
-        except Exception:
-            pass
+def _thousands(qty: Quantity) -> int:
+    return int(round(qty.value / 1000.0))
+
+
+def _rule_income(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Выручка (API ждёт тыс. рублей): «от/больше/до», «составляет X» — нижняя граница
+    lo, hi = ctx.bounds("income")
+    if lo:
+        filters["income_from"] = _thousands(lo)
+    if hi:
+        filters["income_to"] = _thousands(hi)
 
-    # Динамика роста (финансы)
-    m = re.search(r"(стабильн\w*\s+динамик\w*\s+роста|рост)\s*(?:более|>|не\s+менее|от)\s*([\d.,]+)\s*%", q)
+
+def _rule_net_income(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    lo, hi = ctx.bounds("net_income")
+    if lo:
+        filters["net_income_from"] = _thousands(lo)
+    if hi:
+        filters["net_income_to"] = _thousands(hi)
+
+
+def _rule_report_year(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    m = ctx.search("report_year")
     if m:
-        growth = float(m.group(2).replace(',', '.'))
+        filters["finance_report_year"] = int(m.group(1))
+
+
+def _rule_growth(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    lo, _ = ctx.bounds("growth")
+    if lo and lo.op == "from":
         filters["finance_request"] = {
             "metrics": ["INCOME"],
-            "growth_from": growth,
+            "growth_from": lo.value,
             "years_count": 3,
             "year_by_year": True,
         }
 
-    # Даты (YYYY-MM-DD)
-    m = re.search(r"создан\w*\s*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-    if m:
-        filters["establishment_date_from"] = m.group(1)
-        filters["establishment_date_to"] = m.group(2)
-    m = re.search(r"прекращен\w*\s*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-    if m:
-        filters["date_end_from"] = m.group(1)
-        filters["date_end_to"] = m.group(2)
-
-    # ЕГР статусы (базовые маппинги)
-    status_map = {
-        "действующ": "Действует",
-        "ликвидац": "В процессе ликвидации",
-        "банкрот": "В процессе банкротства",
-        "реорганизац": "В процессе реорганизации с последующим прекращением деятельности",
-    }
-    egr: List[str] = []
-    for k, v in status_map.items():
-        if k in q and v not in egr:
-            egr.append(v)
+
+# ЕГР статусы (базовые маппинги)
+_EGR_STATUSES: Tuple[Tuple[str, str], ...] = (
+    ("действующ", "Действует"),
+    ("ликвидац", "В процессе ликвидации"),
+    ("банкрот", "В процессе банкротства"),
+    ("реорганизац", "В процессе реорганизации с последующим прекращением деятельности"),
+)
+
+
+def _rule_egr_statuses(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    egr = [status for stem, status in _EGR_STATUSES if ctx.has(stem)]
     if egr:
         filters["egr_statuses"] = egr
 
-    # ОПФ / типы контрагента по кодам/ярлыкам (учитываем отрицания)
+
+def _rule_opf(ctx: MatchContext, filters: Dict[str, Any]) -> None:
     opf: List[str] = []
-    if (re.search(r"\bип\b", q) and not re.search(r"\bне\s+ип\b", q)):
+    if ctx.search("ip") and not ctx.search("not_ip"):
         opf.append("ip")
-    if (re.search(r"\bул\b|юр(лиц|идическ)", q) and not re.search(r"\bне\s+(?:ул|юр(?:лиц|идическ))\b", q)):
+    if ctx.search("opf_ul") and not ctx.search("opf_not_ul"):
         opf.append("ul")
     if opf:
         filters["opf_codes"] = opf
 
-    # Лицензии, формы поддержки
-    lic = re.findall(r"\b\d{5,7}\b(?=.*лиценз)", q)
+
+def _rule_licenses_and_support(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    lic = ctx.findall("license")
     if lic:
         filters["licenses"] = list(dict.fromkeys(lic))
-    supp = re.findall(r"\b\d{2,4}\b(?=.*поддержк)", q)
+    supp = ctx.findall("support_form")
     if supp:
         filters["support_forms"] = list(dict.fromkeys(supp))
 
-    # Категории МСП (микро/малое/среднее)
-    msp = []
-    if "микро" in q:
-        msp.append("1")
-    if "малое" in q:
-        msp.append("2")
-    if "средн" in q:
-        msp.append("3")
+
+# Категории МСП: (подстрока, код)
+_MSP_CATEGORIES: Tuple[Tuple[str, str], ...] = (("микро", "1"), ("малое", "2"), ("средн", "3"))
+
+
+def _rule_msp_categories(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    msp = [code for stem, code in _MSP_CATEGORIES if ctx.has(stem)]
     if msp:
-        filters["msp_categories"] = list(dict.fromkeys(msp))
+        filters["msp_categories"] = msp
 
-    # Численность сотрудников
-    m = re.search(r"(сотрудник|численност)[а-яё]*\s*от\s*(\d+)\s*до\s*(\d+)", q)
-    if m:
-        filters["ssch_from"] = int(m.group(2))
-        filters["ssch_to"] = int(m.group(3))
-
-    # Спец флаги МСП
-    if "инновационн" in q:
-        filters["only_msp_innovative"] = True
-    if "партнер" in q and "мсп" in q:
-        filters["only_msp_partner"] = True
-    if "социальн" in q and "предприяти" in q:
-        filters["only_msp_social"] = True
-
-    # Ювелирные, СРО
-    if "ювелир" in q:
-        filters["only_jewelry"] = True
-    if "нострой" in q:
-        filters["only_nostroy_members"] = True
-    if "ноприз" in q:
-        filters["only_nopriz_members"] = True
 
+def _rule_headcount(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    lo, hi = ctx.bounds("headcount")
+    if lo:
+        filters["ssch_from"] = int(lo.value)
+    if hi:
+        filters["ssch_to"] = int(hi.value)
+
+
+def _rule_specialization(ctx: MatchContext, filters: Dict[str, Any]) -> None:
     # Общий текстовый поиск по специализации: "специализирующ*ся на <термин>"
-    m = re.search(r"специализирующ[а-яё]*\s*ся\s*на\s*([а-яa-z0-9\-\s]+?)(?:[,.]|$)", q)
+    m = ctx.search("specialization")
     if m:
         filters["search_terms"] = [m.group(1).strip()]
 
-    # Росаккредитация
-    if "росаккред" in q:
-        ra: Dict[str, Any] = {}
-        m = re.search(r"(декларац[ия]|сертификат|декларация\s+или\s+сертификат)", q)
-        if m:
-            t = m.group(1).lower()
-            if "декларац" in t and "сертифик" in q:
-                ra["type"] = "Декларация или сертификат"
-            elif "декларац" in t:
-                ra["type"] = "Декларация"
-            elif "сертифик" in t:
-                ra["type"] = "Сертификат"
-        # Статусы
-        sts: List[str] = []
-        for word, norm in [("прекращ", "Прекращён"), ("возобнов", "Возобновлён"), ("действ", "Действует"), ("недейств", "Недействителен"), ("приостан", "Приостановлен"), ("архив", "Архивный")]:
-            if word in q and norm not in sts:
-                sts.append(norm)
-        if sts:
-            ra["statuses"] = sts
-        # Описание/термины
-        m = re.search(r"росаккред[а-яё\s,]*:(.*)$", q)
-        if m:
-            ra["description"] = m.group(1).strip()
-        if ra:
-            filters["rosaccreditations"] = ra
-
-    # Вакансии (синонимы: работа, найм, поиск сотрудников, ищут/нанимают/нужны/требуются)
-    if re.search(r"ваканси|работа|найм|поиск\s+сотрудник|\bищут\b|\bищем\b|нанимают|нужн[ыо]|требуютс[я]", q):
-        vac: Dict[str, Any] = {"has_vacancies": True}
-        if re.search(r"активн|актуал|открыт", q):
-            vac["only_active"] = True
-        # Зарплата/оклад/зп
-        m = re.search(r"(зарплат[аы]?|оклад|з\/?п|вознаграждени[ея])\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)", q)
-        if m:
-            vac["salary_min"] = int(_to_number(m.group(2)))
-            vac["salary_max"] = int(_to_number(m.group(3)))
-        else:
-            m = re.search(r"(зарплат[аы]?|оклад|з\/?п|вознаграждени[ея])\s*от\s*([\d\s.,]+)", q)
-            if m:
-                vac["salary_min"] = int(_to_number(m.group(2)))
-            m = re.search(r"(зарплат[аы]?|оклад|з\/?п|вознаграждени[ея])\s*до\s*([\d\s.,]+)", q)
-            if m:
-                vac["salary_max"] = int(_to_number(m.group(2)))
-        # Текст/термины из фраз "вакансии по/с ..." или "ищут/нанимают/нужны/требуются ..."
-        m = re.search(r"(?:ваканси[яи]?|работа)\s*(?:по|с)\s*([а-яa-z0-9\-\s]+)", q)
-        if not m:
-            m = re.search(r"(?:ищут|ищем|нанимают|нужн[ыо]|требуютс[я])\s+([а-яa-z0-9\-\s]+?)(?:[,.]|\bсо\b|$)", q)
-        if m:
-            vac["text"] = m.group(1).strip()
-        # Если явно упомянуты разработчик/программист — добавим в текст
-        if re.search(r"разработчик|программист|software\s*engineer|developer", q) and "text" not in vac:
-            vac["text"] = "разработчик"
-        if "только в названи" in q:
-            vac["only_name"] = True
-        # Источник
-        if re.search(r"\bhh\b|head\s*hun\w*|хэдхантер", q):
-            vac["source"] = "HH_VACANCIES"
-        # Регион кода внутри вакансий
-        m = re.search(r"в\s+регион[еу]?\s*(\d{2})", q)
-        if m:
-            vac["region_code"] = m.group(1)
-        # Период публикаций
-        m = re.search(r"публикован[а-яё\s]*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-        if m:
-            vac["publish_date_from"] = m.group(1)
-            vac["publish_date_to"] = m.group(2)
-        filters["vacancies"] = vac
-
-    # Лизинги (синонимы: договор лизинга, лизинговый договор)
-    if re.search(r"лизинг|лизингов\w+\s+договор|договор\s+лизинга", q):
-        le: Dict[str, Any] = {"has_leases": True}
-        if re.search(r"активн|действующ", q):
-            le["only_active"] = True
-        m = re.search(r"догов[оа]р[а-яё\s]*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-        if m:
-            le["contract_date_from"] = m.group(1)
-            le["contract_date_to"] = m.group(2)
-        m = re.search(r"прекращен[а-яё\s]*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-        if m:
-            le["stop_date_from"] = m.group(1)
-            le["stop_date_to"] = m.group(2)
-        # Роль (синонимы)
-        if re.search(r"лизингодател|арендодател", q):
-            le["role"] = "Lessor"
-        if re.search(r"лизингополучател|арендатор", q):
-            le["role"] = "Lessee"
-        # Коды классификатора
-        cc = re.findall(r"\b\d{7}\b", q)
-        if cc:
-            le["classifier_codes"] = list(dict.fromkeys(cc))
-        # Регион коды
-        rcs = re.findall(r"\b(\d{2})\b\s*регион", q)
-        if rcs:
-            le["region_codes"] = list(dict.fromkeys(rcs))
-        # Тексты
-        m = re.search(r"лизинг\w*\s*(?:по|с)\s*([а-яa-z0-9\-\s]+)", q)
-        if m:
-            le["search_text"] = m.group(1).strip()
-        filters["leases"] = le
-
-    # Контракты (синонимы: госзакупки, тендеры, торги, госзаказ)
-    if re.search(r"контракт|закупк|госконтракт|тендер|торг[аи]?|госзаказ", q):
-        co: Dict[str, Any] = {}
-        # Типы ФЗ
-        if re.search(r"44[-\s]?фз|fz44", q):
-            co["contract_type"] = "FZ44"
-        elif re.search(r"223[-\s]?фз|fz223", q):
-            co["contract_type"] = "FZ223"
-        # Роль (синонимы)
-        if re.search(r"поставщик|исполнител", q):
-            co["role"] = "SUPPLIER"
-        if re.search(r"заказчик|покупател", q):
-            co["role"] = "CUSTOMER"
-        # Даты
-        m = re.search(r"(контракт|закупк)[а-яё\s]*с\s*(\d{4}-\d{2}-\d{2})\s*по\s*(\d{4}-\d{2}-\d{2})", q)
-        if m:
-            co["contract_date_from"] = m.group(2)
-            co["contract_date_to"] = m.group(3)
-        # Суммы (с учётом НМЦК/стоимость/цена)
-        m = re.search(r"(нмцк|начальн[а-яё\s]*цен[аы]|стоимост[ьи]|сумм[аы])\s*от\s*([\d\s.,]+)\s*до\s*([\d\s.,]+)(?:\s*(?:руб|руб\.|р\.?|₽))?", q)
-        if m:
-            co["min_price"] = int(_to_number(m.group(2)))
-            co["max_price"] = int(_to_number(m.group(3)))
-        else:
-            m = re.search(r"(нмцк|начальн[а-яё\s]*цен[аы]|стоимост[ьи]|сумм[аы])\s*до\s*([\d\s.,]+)(?:\s*(?:руб|руб\.|р\.?|₽))?", q)
-            if m:
-                co["max_price"] = int(_to_number(m.group(2)))
-            m = re.search(r"(нмцк|начальн[а-яё\s]*цен[аы]|стоимост[ьи]|сумм[аы])\s*от\s*([\d\s.,]+)(?:\s*(?:руб|руб\.|р\.?|₽))?", q)
-            if m:
-                co["min_price"] = int(_to_number(m.group(2)))
-        # Текст/термины
-        m = re.search(r"по\s+предмет[ау]\s*([а-яa-z0-9\-\s]+)", q)
-        if m:
-            co["search_text"] = m.group(1).strip()
-        # ОКПД2 явное упоминание
-        if "окпд2" in q:
-            okpd2 = re.findall(r"\b\d{2}\.\d{2}\.\d{2}\.\d{3}\b", q)
-            if okpd2:
-                co["okpd2_codes"] = okpd2
-        # Регион
-        m = re.search(r"регион[еу]?\s*(\d{2})", q)
-        if m:
-            co["region_code"] = m.group(1)
-        filters["contracts"] = co
-
-    # Запрос адреса (расширено: поддержка "в/по городу <city>")
-    if re.search(r"адрес|в\s+городе|в\s+г\.|по\s+городу", q):
-        ar: Dict[str, Any] = {}
-        af: List[Dict[str, Any]] = []
-        # Ищем город после "в" или "по" (регистронезависимо, берём оригинальный текст)
-        m = re.search(r"(?i)(?:в|по)\s+(?:г\.|город[а-яё]*)\s*([А-Яа-яё\-\s]+?)(?=,|$)", query, flags=re.IGNORECASE)
-        if m:
-            city = m.group(1).strip()
-            af.append({"city": city})
-            ar["search_terms"] = [city]
-        # регион код цифрами
-        m = re.findall(r"\b(\d{2})\b\s*регион", q)
-        for rc in m:
-            af.append({"region_code": rc})
-        if af:
-            ar["address_filters"] = af
-        if ar:
-            filters["address_request"] = ar
+
+_RA_STATUSES: Tuple[Tuple[str, str], ...] = (
+    ("прекращ", "Прекращён"),
+    ("возобнов", "Возобновлён"),
+    ("действ", "Действует"),
+    ("недейств", "Недействителен"),
+    ("приостан", "Приостановлен"),
+    ("архив", "Архивный"),
+)
+
+
+def _rule_rosaccreditation(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    if not ctx.has("росаккред"):
+        return
+    ra: Dict[str, Any] = {}
+    m = ctx.search("ra_type")
+    if m:
+        t = m.group(1)
+        if "декларац" in t and ctx.has("сертифик"):
+            ra["type"] = "Декларация или сертификат"
+        elif "декларац" in t:
+            ra["type"] = "Декларация"
+        elif "сертифик" in t:
+            ra["type"] = "Сертификат"
+    sts = [status for stem, status in _RA_STATUSES if ctx.has(stem)]
+    if sts:
+        ra["statuses"] = sts
+    m = ctx.search("ra_description")
+    if m:
+        ra["description"] = m.group(1).strip()
+    if ra:
+        filters["rosaccreditations"] = ra
+
+
+def _rule_vacancies(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Синонимы: работа, найм, поиск сотрудников, ищут/нанимают/нужны/требуются
+    if not ctx.search("vacancies"):
+        return
+    vac: Dict[str, Any] = {"has_vacancies": True}
+    if ctx.search("vac_active"):
+        vac["only_active"] = True
+    lo, hi = ctx.bounds("salary")
+    if lo:
+        vac["salary_min"] = int(lo.value)
+    if hi:
+        vac["salary_max"] = int(hi.value)
+    # Текст из фраз "вакансии по/с ..." или "ищут/нанимают/нужны/требуются ..."
+    m = ctx.search("vac_text") or ctx.search("vac_hiring_text")
+    if m:
+        vac["text"] = m.group(1).strip()
+    if "text" not in vac and ctx.search("developer"):
+        vac["text"] = "разработчик"
+    if ctx.has("только в названи"):
+        vac["only_name"] = True
+    if ctx.search("hh"):
+        vac["source"] = "HH_VACANCIES"
+    m = ctx.search("vac_region")
+    if m:
+        vac["region_code"] = m.group(1)
+    m = ctx.search("published")
+    if m:
+        vac["publish_date_from"] = m.group(1)
+        vac["publish_date_to"] = m.group(2)
+    filters["vacancies"] = vac
+
+
+_lease_dates = _date_ranges((
+    ("lease_contract_dates", "contract_date_from", "contract_date_to"),
+    ("lease_stop_dates", "stop_date_from", "stop_date_to"),
+))
+
+
+def _rule_leases(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    if not ctx.search("leases"):
+        return
+    le: Dict[str, Any] = {"has_leases": True}
+    if ctx.search("lease_active"):
+        le["only_active"] = True
+    _lease_dates(ctx, le)
+    if ctx.search("lessor"):
+        le["role"] = "Lessor"
+    if ctx.search("lessee"):
+        le["role"] = "Lessee"
+    cc = ctx.findall("classifier_code")
+    if cc:
+        le["classifier_codes"] = list(dict.fromkeys(cc))
+    rcs = ctx.findall("region_number")
+    if rcs:
+        le["region_codes"] = list(dict.fromkeys(rcs))
+    m = ctx.search("lease_text")
+    if m:
+        le["search_text"] = m.group(1).strip()
+    filters["leases"] = le
+
+
+def _rule_contracts(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Синонимы: госзакупки, тендеры, торги, госзаказ
+    if not ctx.search("contracts"):
+        return
+    co: Dict[str, Any] = {}
+    if ctx.search("fz44"):
+        co["contract_type"] = "FZ44"
+    elif ctx.search("fz223"):
+        co["contract_type"] = "FZ223"
+    if ctx.search("supplier"):
+        co["role"] = "SUPPLIER"
+    if ctx.search("customer"):
+        co["role"] = "CUSTOMER"
+    m = ctx.search("contract_dates")
+    if m:
+        co["contract_date_from"] = m.group(2)
+        co["contract_date_to"] = m.group(3)
+    lo, hi = ctx.bounds("price")
+    if lo:
+        co["min_price"] = int(lo.value)
+    if hi:
+        co["max_price"] = int(hi.value)
+    m = ctx.search("subject")
+    if m:
+        co["search_text"] = m.group(1).strip()
+    if ctx.has("окпд2"):
+        okpd2 = known_codes(get_classifier("okpd2"), ctx.findall("okpd2_code"))
+        if okpd2:
+            co["okpd2_codes"] = okpd2
+    m = ctx.search("contract_region")
+    if m:
+        co["region_code"] = m.group(1)
+    filters["contracts"] = co
+
+
+def _rule_address(ctx: MatchContext, filters: Dict[str, Any]) -> None:
+    # Поддержка "в/по городу <city>"; город — из исходного текста
+    if not ctx.search("address"):
+        return
+    ar: Dict[str, Any] = {}
+    af: List[Dict[str, Any]] = []
+    m = ctx.search("city")
+    if m:
+        city = m.group(1).strip()
+        af.append({"city": city})
+        ar["search_terms"] = [city]
+    for rc in dict.fromkeys(ctx.regions() + ctx.findall("region_number")):
+        af.append({"region_code": rc})
+    if af:
+        ar["address_filters"] = af
+    if ar:
+        filters["address_request"] = ar
+
+
+# Группы правил и их триггеры: группа может что-то выставить, только если в запросе есть
+# хотя бы одна из основ (пустой набор — группа запускается всегда)
+GROUPS: Dict[str, Tuple[str, ...]] = {
+    "search_text": ("поиск", "содержит", "ключев"),
+    "okveds": ("оквэд", "вид деятель", "виды деятель"),
+    "regions": tuple(sorted(get_gazetteer().stems)) + ("регион",),
+    "counterparty": ("ип", "предпринимател", "юр", "ооо", "ао", "oao", "лиц"),
+    "flags": (),
+    "contacts_operator": ("услови", "одновременно", "или"),
+    "finance": ("выручк", "прибыл", "год", "рост"),
+    "dates": ("создан", "прекращен"),
+    "egr_statuses": tuple(stem for stem, _ in _EGR_STATUSES),
+    "opf": ("ип", "ул", "юр"),
+    "licenses": ("лиценз", "поддержк"),
+    "msp_categories": tuple(stem for stem, _ in _MSP_CATEGORIES),
+    "headcount": ("сотрудник", "численност"),
+    "msp_flags": ("инновационн", "партнер", "социальн", "ювелир", "нострой", "ноприз"),
+    "specialization": ("специализирующ",),
+    "rosaccreditation": ("росаккред",),
+    "vacancies": _PATTERNS["vacancies"][1],
+    "leases": ("лизинг",),
+    "contracts": _PATTERNS["contracts"][1],
+    "address": _PATTERNS["address"][1],
+}
+
+PREFILTER = RuleGroupPrefilter(
+    GROUPS,
+    extra_keywords=[a for _, anchors in list(_PATTERNS.values()) + list(_ORIGINAL_CASE.values()) for a in anchors]
+    + list(KEYWORD_STEMS),
+)
+
+# Порядок правил = порядок ключей в filters; группа проверяется префильтром один раз
+RULES: Tuple[Tuple[str, Tuple[Rule, ...]], ...] = (
+    ("search_text", (_rule_search_text,)),
+    ("okveds", (_rule_okveds,)),
+    ("regions", (_rule_regions,)),
+    ("counterparty", (_rule_counterparty,)),
+    ("flags", (_flags((
+        ("only_active", True, ("active_only",)),
+        ("has_income", True, ("with_income",)),
+        ("only_with_bfo", True, ("with_bfo",)),
+        ("only_with_phones", True, ("with_phones",)),
+        ("only_with_emails", True, ("with_emails",)),
+        ("only_with_websites", True, ("with_websites",)),
+        ("only_it_companies", True, ("it_companies",)),
+        ("only_main_okveds", False, ("okved_additional",)),
+        ("exclude_only_main_okveds", False, ("okved_exclude_additional",)),
+    )),)),
+    ("contacts_operator", (_rule_contact_operator,)),
+    ("finance", (_rule_income, _rule_net_income, _rule_report_year, _rule_growth)),
+    ("dates", (_date_ranges((
+        ("established", "establishment_date_from", "establishment_date_to"),
+        ("terminated", "date_end_from", "date_end_to"),
+    )),)),
+    ("egr_statuses", (_rule_egr_statuses,)),
+    ("opf", (_rule_opf,)),
+    ("licenses", (_rule_licenses_and_support,)),
+    ("msp_categories", (_rule_msp_categories,)),
+    ("headcount", (_rule_headcount,)),
+    ("msp_flags", (_flags((
+        ("only_msp_innovative", True, ("innovative",)),
+        ("only_msp_partner", True, ("partner", "msp")),
+        ("only_msp_social", True, ("social", "enterprise")),
+        ("only_jewelry", True, ("jewelry",)),
+        ("only_nostroy_members", True, ("nostroy",)),
+        ("only_nopriz_members", True, ("nopriz",)),
+    )),)),
+    ("specialization", (_rule_specialization,)),
+    ("rosaccreditation", (_rule_rosaccreditation,)),
+    ("vacancies", (_rule_vacancies,)),
+    ("leases", (_rule_leases,)),
+    ("contracts", (_rule_contracts,)),
+    ("address", (_rule_address,)),
+)
+
+
+def prefilter_stats() -> Dict[str, Any]:
+    """Доли пропусков групп правил convert_nl_to_batchcards с момента запуска (или reset_stats)."""
+    return PREFILTER.stats()
+
+
+def convert_nl_to_batchcards(query: str) -> Dict[str, Any]:
+    """
+    Простой rule-based конвертер NL → тело запроса для batchCardsByFilters.
+    Возвращает структуру {filters, page, page_size}, где filters — это плоский JSON для тела POST.
+
+    Правила (RULES) выполняются по порядку за один проход; паттерны скомпилированы при импорте.
+    Группы без триггеров в запросе пропускаются (PREFILTER.stats() — доли пропусков).
+    """
+    return _convert(MatchContext(query))
+
+
+def _convert(ctx: MatchContext) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    page_size = 50  # по умолчанию
+
+    # Количество: "покажи 200 компаний" / "20 контрагентов"
+    m = ctx.search("page_size")
+    if m:
+        page_size = int(m.group(1))
+
+    found = ctx.found
+    should_run = PREFILTER.should_run
+    for group, rules in RULES:
+        if should_run(group, found):
+            for rule in rules:
+                rule(ctx, filters)
 
     return {"filters": filters, "page": 1, "page_size": page_size}
+
+
+# ---- Покрытие запроса правилами ----
+# Слово запроса объяснено, если его коснулся хоть один использованный правилами участок текста.
+# Служебные слова и общие «компании/покажи/которые» объяснять не нужно: они не несут фильтров.
+_WORD_RE = re.compile(r"[a-zа-яё0-9]+(?:[-‑./][a-zа-яё0-9]+)*")
+_STOP_WORDS = frozenset((
+    "в", "во", "с", "со", "по", "на", "от", "до", "и", "а", "к", "у", "о", "об", "за", "из", "для",
+    "при", "без", "же", "ли", "их", "это", "как", "так", "что", "где", "чем", "или", "все", "всех",
+    "есть", "еще", "ещё", "только", "мне", "нам", "год", "года", "году", "р", "руб",
+))
+_FILLER_STEMS = (
+    "компан", "организац", "фирм", "контрагент", "запис", "покаж", "найд", "найт", "выве", "выбер",
+    "дай", "спис", "котор", "нужн", "пожалуйст", "хочу", "интерес",
+)
+
+
+class Coverage(NamedTuple):
+    score: float  # доля значимых слов, объяснённых правилами; 1.0 — запрос без значимых слов
+    explained: Tuple[str, ...]
+    unexplained: Tuple[str, ...]
+
+
+def _significant(word: str) -> bool:
+    return word not in _STOP_WORDS and not word.startswith(_FILLER_STEMS)
+
+
+def coverage(ctx: MatchContext) -> Coverage:
+    """Какие значимые слова запроса использовали правила; ctx — MatchContext(track=True) после разбора."""
+    spans = ctx.spans or []
+    explained: List[str] = []
+    unexplained: List[str] = []
+    for m in _WORD_RE.finditer(ctx.q):
+        word = m.group()
+        if not _significant(word):
+            continue
+        start, end = m.span()
+        if any(s < end and start < e for s, e in spans):
+            explained.append(word)
+        else:
+            unexplained.append(word)
+    total = len(explained) + len(unexplained)
+    return Coverage(round(len(explained) / total, 4) if total else 1.0, tuple(explained), tuple(unexplained))
+
+
+def explain_nl_to_batchcards(query: str) -> Tuple[Dict[str, Any], Coverage]:
+    """convert_nl_to_batchcards и покрытие запроса правилами: что правила поняли, а что осталось без разбора."""
+    ctx = MatchContext(query, track=True)
+    return _convert(ctx), coverage(ctx)
+
+
+def convert_nl_to_batchcards_cached(query: str) -> Dict[str, Any]:
+    """convert_nl_to_batchcards через memo конвертации: нормализованный запрос, результат — копия."""
+    return get_conversion_memo().convert(query, "batchcards-rules", convert_nl_to_batchcards)
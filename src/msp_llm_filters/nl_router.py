@@ -0,0 +1,47 @@
+import os
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+
+from .nl_converter_batchcards import Coverage, explain_nl_to_batchcards
+
+# Гибридный разбор batchCards: правила отвечают сразу, если объяснили запрос (coverage), и только
+# запрос с заметной неразобранной частью («…занимающиеся ремонтом обуви») уходит в LLM.
+
+DEFAULT_MIN_COVERAGE = 0.8
+
+LLMParser = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class Route(NamedTuple):
+    result: Dict[str, Any]
+    parser: str  # "rule-based" | "llm"
+    coverage: Coverage
+
+
+def router_enabled() -> bool:
+    """NL_ROUTER=0 — при включённой LLM каждый запрос идёт в неё, как до роутера."""
+    return os.getenv("NL_ROUTER", "1").strip() != "0"
+
+
+def router_min_coverage() -> float:
+    return float(os.getenv("NL_ROUTER_MIN_COVERAGE", str(DEFAULT_MIN_COVERAGE)))
+
+
+def needs_llm(coverage: Coverage, min_coverage: Optional[float] = None) -> bool:
+    """LLM нужна, если правила объяснили меньше min_coverage значимых слов запроса."""
+    threshold = router_min_coverage() if min_coverage is None else min_coverage
+    return coverage.score < threshold
+
+
+async def route_batchcards(query: str, llm: LLMParser, min_coverage: Optional[float] = None) -> Route:
+    """Разбор правилами или, если правила объяснили запрос не целиком, через llm.
+
+    Ошибки llm не перехватываются: вызывающий решает, откатываться ли на правила. Пустой ответ
+    LLM — результат правил.
+    """
+    result, coverage = explain_nl_to_batchcards(query)
+    if not needs_llm(coverage, min_coverage):
+        return Route(result, "rule-based", coverage)
+    parsed = await llm(query)
+    if not parsed:
+        return Route(result, "rule-based", coverage)
+    return Route(parsed, "llm", coverage)
@@ -0,0 +1,357 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple, TypeVar, Union
+
+import httpx
+
+from .http_client import _env_bool, close_http_clients, get_http_client, http_client_lifespan
+from .llm_scheduler import PRIORITY_INTERACTIVE, schedule_llm
+
+OLLAMA_TIMEOUT_SECONDS = 60
+
+OUTPUT_FORMAT_INSTRUCTIONS = (
+    "\n\nВажное требование по формату вывода:\n"
+    "Верни ТОЛЬКО JSON со структурой {\"filters\": object, \"page\": integer, \"page_size\": integer}."
+    " Без пояснений и текста вне JSON. Даты строго YYYY-MM-DD."
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def ollama_base_url() -> str:
+    return os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
+
+
+def ollama_model() -> str:
+    return os.getenv("OLLAMA_MODEL", "qwen2.5:7b-instruct-q4_K_M")
+
+
+def ollama_keep_alive() -> Optional[Union[str, int]]:
+    """Сколько Ollama держит модель в памяти после запроса: «30m», «1h», -1 — всегда; пусто — по умолчанию сервера (5m)."""
+    raw = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip()
+    if not raw:
+        return None
+    # Число без единиц Ollama понимает только как JSON-число секунд
+    return int(raw) if raw.lstrip("-").isdigit() else raw
+
+
+def _chat_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {"temperature": 0.2}
+    # num_ctx задаётся один раз на процесс: другое значение в запросе заставляет Ollama перезагрузить модель
+    num_ctx = os.getenv("OLLAMA_NUM_CTX", "").strip()
+    if num_ctx:
+        options["num_ctx"] = int(num_ctx)
+    return options
+
+
+_prompts: Dict[str, Tuple[Optional[Tuple[int, int]], str]] = {}
+
+
+def load_system_prompt(path: str) -> str:
+    """Системный промпт из файла с требованием к формату вывода.
+
+    Файл читается один раз и перечитывается, только когда меняются его mtime или размер;
+    пока файл тот же, возвращается тот же объект строки — префикс запроса к Ollama
+    совпадает побайтно и модель не пересчитывает его. Нет файла — только требование к формату.
+    """
+    try:
+        st = os.stat(path)
+        key: Optional[Tuple[int, int]] = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = None
+    cached = _prompts.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    base = ""
+    if key is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                base = f.read()
+        except OSError:
+            base = ""
+    text = base + OUTPUT_FORMAT_INSTRUCTIONS
+    _prompts[path] = (key, text)
+    return text
+
+
+def build_chat_payload(system_prompt: str, query: str) -> Dict[str, Any]:
+    """Тело /api/chat. Всё, что от запроса не зависит, идёт первым и не меняется между вызовами:
+    системное сообщение, модель, опции — так Ollama переиспользует KV-кэш системного промпта
+    и считает только сообщение пользователя."""
+    payload: Dict[str, Any] = {
+        "model": ollama_model(),
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": query},
+        ],
+        "options": _chat_options(),
+        "stream": False,
+    }
+    keep_alive = ollama_keep_alive()
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload
+
+
+@functools.lru_cache(maxsize=8)
+def _prompt_digest(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_version(system_prompt: str) -> str:
+    """Версия LLM-конвертации для ключа memo: модель + хэш системного промпта."""
+    return f"{ollama_model()}:{_prompt_digest(system_prompt)}"
+
+
+def parse_chat_response(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Достаёт JSON {filters, page, page_size} из ответа /api/chat (или OpenAI-совместимого)."""
+    content = (
+        data.get("message", {}).get("content")
+        or data.get("choices", [{}])[0].get("message", {}).get("content")
+        or ""
+    )
+    content_str = content.strip()
+    # Если LLM вернула Markdown-блоки с ```, вырежем обрамление
+    if content_str.startswith("```"):
+        parts = content_str.split("```")
+        if len(parts) >= 3:
+            content_str = parts[1].strip()
+    result = json.loads(content_str)
+    if not isinstance(result, dict):
+        raise ValueError("LLM output is not a JSON object")
+    if "filters" not in result:
+        result["filters"] = {}
+    if "page" not in result:
+        result["page"] = 1
+    if "page_size" not in result:
+        result["page_size"] = 20
+    return result
+
+
+class JSONObjectScanner:
+    """Инкрементальный поиск первого JSON-объекта верхнего уровня в тексте, который модель выдаёт по токенам.
+
+    Текст до первой «{» (Markdown-ограда, пояснения) пропускается; объект закончен, как только
+    закрылась его скобка — хвост ответа больше не нужен. По ходу генерации отдаёт частичные
+    filters: после каждого завершённого поля объекта "filters" — все его поля, пришедшие к этому моменту.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.start = -1
+        self.end = -1
+        self.filters: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = ""
+        self._key: Optional[str] = None
+        self._filters_start = -1
+
+    @property
+    def done(self) -> bool:
+        return self.end >= 0
+
+    def _partial_filters(self, text: str) -> bool:
+        try:
+            filters = json.loads(text)
+        except ValueError:
+            return False
+        if not isinstance(filters, dict) or filters == self.filters:
+            return False
+        self.filters = filters
+        return True
+
+    def feed(self, piece: str) -> bool:
+        """Добавить кусок ответа; True — filters пополнились."""
+        if self.done:
+            return False
+        self.text += piece
+        text = self.text
+        updated = False
+        i = self._pos
+        n = len(text)
+        while i < n:
+            c = text[i]
+            if self.start < 0:
+                if c == "{":
+                    self.start = i
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start:i + 1]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._depth == 1:
+                try:
+                    self._key = json.loads(self._last_string)
+                except ValueError:
+                    self._key = None
+            elif c in "{[":
+                self._depth += 1
+                if self._depth == 2 and c == "{" and self._key == "filters" and self._filters_start < 0:
+                    self._filters_start = i
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._filters_start >= 0 and self._key == "filters":
+                    updated |= self._partial_filters(text[self._filters_start:i + 1])
+                    self._key = None
+                elif self._depth == 0:
+                    self.end = i + 1
+                    break
+            elif c == ",":
+                if self._depth == 1:
+                    self._key = None
+                elif self._depth == 2 and self._filters_start >= 0 and self._key == "filters":
+                    updated |= self._partial_filters(text[self._filters_start:i] + "}")
+            i += 1
+        self._pos = i + 1 if self.done else i
+        return updated
+
+    def result(self) -> Dict[str, Any]:
+        """Разобранный объект с полями по умолчанию, как у parse_chat_response."""
+        content = self.text[self.start:self.end] if self.done else self.text
+        return parse_chat_response({"message": {"content": content}})
+
+
+async def chat_async(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Асинхронный вызов /api/chat через общий пул соединений к Ollama.
+
+    Отмена задачи (например, при разрыве соединения с браузером) закрывает запрос к Ollama.
+    """
+    client = get_http_client("ollama")
+    r = await client.post(f"{ollama_base_url()}/api/chat", json=payload, timeout=OLLAMA_TIMEOUT_SECONDS)
+    r.raise_for_status()
+    return r.json()
+
+
+async def chat_json_stream_async(
+    payload: Dict[str, Any],
+    on_filters: Optional[Callable[[Dict[str, Any]], Any]] = None,
+) -> Dict[str, Any]:
+    """/api/chat потоком: разбор по токенам и обрыв генерации, как только пришёл весь JSON-объект.
+
+    Закрытие ответа обрывает соединение, и Ollama прекращает генерацию — хвост после объекта
+    (закрывающая ограда, пояснения) не генерируется. on_filters(filters) вызывается при каждом
+    пополнении частичных filters. Сервер, который отвечает одним JSON без потока, тоже подходит.
+    """
+    payload = dict(payload, stream=True)
+    scanner = JSONObjectScanner()
+    client = get_http_client("ollama")
+    async with client.stream("POST", f"{ollama_base_url()}/api/chat", json=payload, timeout=OLLAMA_TIMEOUT_SECONDS) as r:
+        if r.is_error:
+            await r.aread()
+            r.raise_for_status()
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if data.get("error"):
+                raise ValueError(f"ollama error: {data['error']}")
+            piece = (data.get("message") or {}).get("content") or ""
+            if scanner.feed(piece) and on_filters is not None:
+                on_filters(scanner.filters)
+            if scanner.done or data.get("done"):
+                break
+    return scanner.result()
+
+
+def ollama_stream_enabled() -> bool:
+    """OLLAMA_STREAM=0 — ждать ответ модели целиком (stream: false), без обрыва после JSON."""
+    return _env_bool("OLLAMA_STREAM", "1")
+
+
+async def chat_json_async(
+    payload: Dict[str, Any],
+    on_filters: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> Dict[str, Any]:
+    """JSON {filters, page, page_size} из ответа модели: потоком с обрывом после объекта или, при OLLAMA_STREAM=0, целиком.
+
+    Генерация идёт через очередь llm_scheduler с этим приоритетом; переполненная очередь — LLMOverloaded.
+    """
+
+    async def generate() -> Dict[str, Any]:
+        if ollama_stream_enabled():
+            return await chat_json_stream_async(payload, on_filters)
+        return parse_chat_response(await chat_async(payload))
+
+    return await schedule_llm(generate, priority)
+
+
+def run_sync(fn: Callable[[], Awaitable[T]]) -> T:
+    """Синхронный вызов async-клиента для скриптов и CLI вне event loop.
+
+    Тот же путь, что у веб‑UI: очередь llm_scheduler, поток с обрывом после JSON; пул соединений
+    к Ollama привязан к своему event loop и закрывается по завершении.
+    """
+
+    async def main() -> T:
+        try:
+            return await fn()
+        finally:
+            await close_http_clients()
+
+    return asyncio.run(main())
+
+
+async def warm_up_async(system_prompt: str) -> float:
+    """Загрузить модель и заранее посчитать системный промпт; возвращает время в секундах.
+
+    Запрос — то же тело, что у build_chat_payload, но только с системным сообщением и одним
+    токеном ответа: Ollama поднимает модель (с тем же keep_alive и num_ctx) и оставляет
+    префикс в KV-кэше, так что первый запрос пользователя не платит за холодный старт.
+    """
+    payload = build_chat_payload(system_prompt, "")
+    payload["messages"] = payload["messages"][:1]
+    payload["options"] = dict(payload["options"], num_predict=1)
+    t0 = time.perf_counter()
+    await chat_async(payload)
+    return time.perf_counter() - t0
+
+
+def ollama_lifespan(load_prompt: Callable[[], str]) -> Callable[[Any], Any]:
+    """Lifespan веб‑UI: общий HTTP‑пул плюс фоновый прогрев Ollama на старте.
+
+    Прогрев — только если задан OLLAMA_BASE_URL и не выключен OLLAMA_WARMUP=0; старт
+    приложения его не ждёт, ошибка (Ollama ещё не поднята) только пишется в лог.
+    """
+
+    async def warm_up() -> None:
+        try:
+            elapsed = await warm_up_async(load_prompt())
+            logger.info("ollama warm-up: %s ready in %.2fs", ollama_model(), elapsed)
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("ollama warm-up failed: %s: %s", type(e).__name__, e)
+
+    @asynccontextmanager
+    async def lifespan(app: Any = None) -> AsyncIterator[None]:
+        async with http_client_lifespan(app):
+            task = None
+            if os.getenv("OLLAMA_BASE_URL") and _env_bool("OLLAMA_WARMUP", "1"):
+                task = asyncio.create_task(warm_up())
+            try:
+                yield
+            finally:
+                if task is not None:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+
+    return lifespan
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+from typing import Any, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from .conversion_memo import normalize_query
+
+# Стенд вместо Ollama: отвечает на /api/chat записанными ответами модели, без GPU и сети.
+# Записи — JSONL {"query", "content", "latency_ms"?, "model"?}; их пишет msp-eval-parsers --record.
+# Запуск: OLLAMA_REPLAY_FILE=recordings.jsonl uvicorn msp_llm_filters.ollama_replay:app --port 11434
+
+
+def _key(query: str) -> str:
+    return normalize_query(query).casefold()
+
+
+def load_recordings(path: str) -> Dict[str, Dict[str, Any]]:
+    """Записи по нормализованному запросу; при повторе запроса побеждает последняя строка."""
+    out: Dict[str, Dict[str, Any]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if isinstance(rec, dict) and isinstance(rec.get("query"), str) and isinstance(rec.get("content"), str):
+                out[_key(rec["query"])] = rec
+    return out
+
+
+def _last_user_message(payload: Any) -> Optional[str]:
+    messages = payload.get("messages") if isinstance(payload, dict) else None
+    if not isinstance(messages, list):
+        return None
+    for m in reversed(messages):
+        if isinstance(m, dict) and m.get("role") == "user" and isinstance(m.get("content"), str):
+            return m["content"]
+    return None
+
+
+def create_replay_app(recordings: Dict[str, Dict[str, Any]], latency_ms: Optional[float] = None) -> Starlette:
+    """ASGI-приложение с /api/chat и /api/tags.
+
+    latency_ms=None — выдерживать записанное время ответа (latency_ms записи), число — фиксированная
+    задержка на запрос, 0 — отвечать сразу. Незаписанный запрос — 404: прогон в CI не должен
+    тихо подменять ответы модели.
+    """
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def api_chat(request: Request) -> JSONResponse:
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = None
+        query = _last_user_message(payload)
+        if query is None:
+            return JSONResponse({"error": "messages with a user turn required"}, status_code=400)
+        rec = recordings.get(_key(query))
+        if rec is None:
+            return JSONResponse({"error": f"no recording for query: {query[:200]}"}, status_code=404)
+
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            delay = float(rec.get("latency_ms") or 0.0) if latency_ms is None else latency_ms
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+        finally:
+            stats["in_flight"] -= 1
+        return JSONResponse({
+            "model": rec.get("model") or payload.get("model"),
+            "message": {"role": "assistant", "content": rec["content"]},
+            "done": True,
+        })
+
+    async def api_tags(request: Request) -> JSONResponse:
+        models = sorted({str(r["model"]) for r in recordings.values() if r.get("model")})
+        return JSONResponse({"models": [{"name": m} for m in models], "recordings": len(recordings)})
+
+    app = Starlette(routes=[
+        Route("/api/chat", api_chat, methods=["POST"]),
+        Route("/api/tags", api_tags, methods=["GET"]),
+    ])
+    app.state.stats = stats
+    return app
+
+
+def _app_from_env() -> Starlette:
+    path = os.getenv("OLLAMA_REPLAY_FILE", "")
+    recordings = load_recordings(path) if path else {}
+    raw = os.getenv("OLLAMA_REPLAY_LATENCY_MS", "")
+    return create_replay_app(recordings, float(raw) if raw else None)
+
+
+class _LazyApp:
+    """Записи читаются при первом запросе, а не при импорте модуля."""
+
+    def __init__(self) -> None:
+        self._app: Optional[Starlette] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if self._app is None:
+            self._app = _app_from_env()
+        await self._app(scope, receive, send)
+
+
+app = _LazyApp()
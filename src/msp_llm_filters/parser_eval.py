@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+from .http_client import close_http_clients, set_http_client
+from .llm_client_batchcards import _load_system_prompt
+from .nl_converter_batchcards import convert_nl_to_batchcards
+from .llm_scheduler import PRIORITY_BATCH, schedule_llm
+from .nl_router import route_batchcards
+from .ollama import build_chat_payload, chat_async, ollama_model, parse_chat_response
+
+# A/B-сравнение разборщиков запроса: правила (convert_nl_to_batchcards) против LLM (Ollama)
+# на размеченном корпусе. Качество — точность/полнота по полям фильтров, скорость — p50/p95/p99.
+# Третий вариант — router (nl_router.py): LLM только для запросов, которые правила объяснили не целиком.
+
+DEFAULT_CONCURRENCY = 8
+
+Parser = Callable[[str], Awaitable[Dict[str, Any]]]
+Fact = Tuple[str, str]
+
+
+def _norm_value(value: Any) -> str:
+    if isinstance(value, str):
+        value = " ".join(value.split()).casefold()
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    # JSON-представление различает true и 1, «77» и 77
+    return json.dumps(value, ensure_ascii=False)
+
+
+def filter_facts(filters: Any, prefix: str = "") -> Set[Fact]:
+    """Фильтры как множество фактов (поле, значение).
+
+    Вложенные поля — через точку («vacancies.salary_min»), элемент списка — отдельный факт,
+    так что порядок в списке не важен и лишний регион не перечёркивает верные. Списки объектов —
+    «поле[].ключ». Строки сравниваются без регистра и лишних пробелов; пустые значения не факты.
+    """
+    facts: Set[Fact] = set()
+    if isinstance(filters, dict):
+        for key, value in filters.items():
+            facts |= filter_facts(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(filters, list):
+        for item in filters:
+            facts |= filter_facts(item, f"{prefix}[]" if isinstance(item, dict) else prefix)
+    elif filters is not None and filters != "" and prefix:
+        facts.add((prefix, _norm_value(filters)))
+    return facts
+
+
+def _ratio(num: int, den: int) -> Optional[float]:
+    return round(num / den, 4) if den else None
+
+
+def _prf(tp: int, fp: int, fn: int) -> Dict[str, Any]:
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    f1 = _ratio(2 * tp, 2 * tp + fp + fn)
+    return {"tp": tp, "fp": fp, "fn": fn, "precision": precision, "recall": recall, "f1": f1}
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    """p50/p95/p99 и среднее в миллисекундах (ближайший ранг, как в scripts/bench_common.py)."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pick(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Размеченные запросы [{"query", "filters"}]: JSONL или JSON-список (формат golden-файла тоже подходит).
+
+    Ожидаемые фильтры — поле "filters" или "expected.filters".
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.lstrip()
+    rows = json.loads(text) if stripped.startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+    cases = []
+    for row in rows:
+        expected = row.get("expected") if isinstance(row.get("expected"), dict) else row
+        filters = expected.get("filters")
+        if not isinstance(row.get("query"), str) or not isinstance(filters, dict):
+            raise ValueError(f"{path}: case needs query and filters: {json.dumps(row, ensure_ascii=False)[:200]}")
+        cases.append({"query": row["query"], "filters": filters})
+    return cases
+
+
+async def evaluate(name: str, parse: Parser, cases: List[Dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY) -> Dict[str, Any]:
+    """Прогнать разборщик по корпусу: не больше concurrency вызовов одновременно.
+
+    Ошибка разбора (таймаут, невалидный JSON от модели) — все ожидаемые факты запроса
+    считаются пропущенными. Задержка — время одного вызова, без ожидания в очереди.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(query: str) -> Tuple[float, Optional[Dict[str, Any]], Optional[str]]:
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                result, error = await parse(query), None
+            except Exception as e:  # noqa: BLE001 — ошибка одного запроса идёт в отчёт, прогон продолжается
+                result, error = None, f"{type(e).__name__}: {e}"
+            return time.perf_counter() - t0, result, error
+
+    t0 = time.perf_counter()
+    outcomes = await asyncio.gather(*(one(c["query"]) for c in cases))
+    wall = time.perf_counter() - t0
+
+    fields: Dict[str, List[int]] = {}
+    latencies: List[float] = []
+    failures: List[Dict[str, Any]] = []
+    exact = errors = 0
+    for case, (elapsed, result, error) in zip(cases, outcomes):
+        latencies.append(elapsed)
+        expected = filter_facts(case["filters"])
+        got = filter_facts(result.get("filters") if isinstance(result, dict) else None)
+        for path, _ in expected & got:
+            fields.setdefault(path, [0, 0, 0])[0] += 1
+        for path, _ in got - expected:
+            fields.setdefault(path, [0, 0, 0])[1] += 1
+        for path, _ in expected - got:
+            fields.setdefault(path, [0, 0, 0])[2] += 1
+        errors += error is not None
+        if error is None and expected == got:
+            exact += 1
+            continue
+        failure: Dict[str, Any] = {
+            "query": case["query"],
+            "missing": sorted(f"{p}={v}" for p, v in expected - got),
+            "extra": sorted(f"{p}={v}" for p, v in got - expected),
+        }
+        if error is not None:
+            failure["error"] = error
+        failures.append(failure)
+
+    totals = [sum(c[k] for c in fields.values()) for k in range(3)]
+    return {
+        "parser": name,
+        "cases": len(cases),
+        "errors": errors,
+        "exact_match": _ratio(exact, len(cases)),
+        "micro": _prf(*totals),
+        "latency": latency_summary(latencies),
+        "wall_s": round(wall, 3),
+        "concurrency": concurrency,
+        "fields": {path: _prf(*c) for path, c in sorted(fields.items())},
+        "failures": failures,
+    }
+
+
+async def parse_rules(query: str) -> Dict[str, Any]:
+    return convert_nl_to_batchcards(query)
+
+
+def llm_parser(recordings: Optional[List[Dict[str, Any]]] = None) -> Parser:
+    """Разбор через Ollama /api/chat тем же промптом, что и nl_to_batchcards_via_ollama_async, без memo.
+
+    recordings — список, куда дописываются сырые ответы модели и время ответа (для стенда
+    ollama_replay); ответ пишется до разбора JSON, так что при повторе воспроизводятся и ошибки.
+    Вызовы идут через очередь llm_scheduler с пакетным приоритетом: веб‑UI на той же Ollama — раньше.
+    """
+    system_prompt = _load_system_prompt()
+
+    async def parse(query: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        data = await schedule_llm(lambda: chat_async(build_chat_payload(system_prompt, query)), PRIORITY_BATCH)
+        if recordings is not None:
+            recordings.append({
+                "query": query,
+                "model": data.get("model") or ollama_model(),
+                "content": (data.get("message") or {}).get("content") or "",
+                "latency_ms": round((time.perf_counter() - t0) * 1000, 1),
+            })
+        return parse_chat_response(data)
+
+    return parse
+
+
+def router_parser(llm: Parser, calls: List[str]) -> Parser:
+    """Разбор роутером: в calls попадают запросы, отданные llm. Ошибка LLM — ответ правил, как в веб‑UI."""
+
+    async def counted(query: str) -> Dict[str, Any]:
+        calls.append(query)
+        return await llm(query)
+
+    async def parse(query: str) -> Dict[str, Any]:
+        try:
+            return (await route_batchcards(query, counted)).result
+        except Exception:  # noqa: BLE001
+            return convert_nl_to_batchcards(query)
+
+    return parse
+
+
+async def run_eval(
+    cases: List[Dict[str, Any]],
+    parsers: Iterable[str] = ("rules", "llm"),
+    concurrency: int = DEFAULT_CONCURRENCY,
+    recordings: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """Отчёты по разборщикам в порядке parsers; правила выполняются без параллелизма (они CPU-bound)."""
+    reports = []
+    for name in parsers:
+        if name == "rules":
+            reports.append(await evaluate("rules", parse_rules, cases, concurrency=1))
+        elif name == "llm":
+            reports.append(await evaluate("llm", llm_parser(recordings), cases, concurrency=concurrency))
+        elif name == "router":
+            calls: List[str] = []
+            report = await evaluate("router", router_parser(llm_parser(recordings), calls), cases, concurrency=concurrency)
+            report["llm_calls"] = len(calls)
+            report["llm_share"] = _ratio(len(calls), len(cases))
+            reports.append(report)
+        else:
+            raise ValueError(f"unknown parser: {name}")
+    return reports
+
+
+def main_entry(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(
+        prog="msp-eval-parsers",
+        description="Сравнение разбора запросов правилами и LLM на размеченном корпусе: точность/полнота по полям, p50/p95/p99",
+    )
+    ap.add_argument("corpus", help="JSONL {query, filters} или JSON-список в формате golden-файла")
+    ap.add_argument("--parsers", default="rules,llm", help="через запятую: rules, llm, router")
+    ap.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="одновременных запросов к LLM")
+    ap.add_argument("--replay", default=None, help="JSONL записанных ответов: LLM отвечает стенд ollama_replay, без сети")
+    ap.add_argument("--replay-latency-ms", type=float, default=None, help="задержка стенда (по умолчанию — записанная)")
+    ap.add_argument("--record", default=None, help="дописать сырые ответы LLM в JSONL для --replay")
+    ap.add_argument("-o", "--output", default=None, help="полный отчёт (с ошибками по запросам) в JSON")
+    args = ap.parse_args(argv)
+
+    cases = load_corpus(args.corpus)
+    parsers = [p.strip() for p in args.parsers.split(",") if p.strip()]
+    recordings: Optional[List[Dict[str, Any]]] = [] if args.record else None
+
+    async def run() -> List[Dict[str, Any]]:
+        if args.replay:
+            from .ollama_replay import create_replay_app, load_recordings
+
+            app = create_replay_app(load_recordings(args.replay), args.replay_latency_ms)
+            set_http_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=app)), name="ollama")
+        try:
+            return await run_eval(cases, parsers, concurrency=args.concurrency, recordings=recordings)
+        finally:
+            await close_http_clients()
+
+    reports = asyncio.run(run())
+    for r in reports:
+        print(json.dumps({k: v for k, v in r.items() if k not in ("fields", "failures")}, ensure_ascii=False))
+    if recordings:
+        with open(args.record, "a", encoding="utf-8") as f:
+            for rec in recordings:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        print(f"{len(recordings)} LLM responses recorded to {args.record}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
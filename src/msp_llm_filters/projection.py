@@ -0,0 +1,107 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# Поля, по которым карточку можно опознать в любом пресете
+_IDENTITY = (
+    "main_block.inn",
+    "main_block.ogrn",
+    "main_block.name",
+    "inn",
+    "ogrn",
+    "name",
+)
+
+# Именованные наборы полей карточки batchCards для типичных запросов агента
+PRESETS: Dict[str, Tuple[str, ...]] = {
+    "card": _IDENTITY + (
+        "main_block.full_name",
+        "main_block.status",
+        "main_block.establishment_date",
+        "main_block.activity_kind",
+        "main_block.activity_kind_dsc",
+        "address_block.region",
+        "address_block.region_code",
+        "address_block.value",
+        "msp_block.msp",
+        "msp_block.category",
+        "msp_block.category_name",
+    ),
+    "finance": _IDENTITY + (
+        "finance_plain_block",
+        "income",
+        "net_income",
+    ),
+    "contacts": _IDENTITY + (
+        "contacts_block.emails",
+        "contacts_block.phones",
+        "contacts_block.websites",
+        "managers_block.managers",
+        "manager",
+    ),
+}
+
+_Tree = Dict[str, Any]  # ключ -> поддерево или True (взять значение целиком)
+_MISSING = object()
+
+
+def _compile(paths: Iterable[str]) -> _Tree:
+    tree: _Tree = {}
+    for path in paths:
+        node = tree
+        parts = [p for p in path.strip().split(".") if p]
+        for i, part in enumerate(parts):
+            if node.get(part) is True:
+                # Уже берём родителя целиком — более глубокий путь ничего не меняет
+                break
+            if i == len(parts) - 1:
+                node[part] = True
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _project(value: Any, tree: Union[_Tree, bool]) -> Any:
+    if tree is True:
+        return value
+    if isinstance(value, dict):
+        out = {}
+        for key, sub in tree.items():
+            if key in value:
+                projected = _project(value[key], sub)
+                if projected is not _MISSING:
+                    out[key] = projected
+        return out
+    if isinstance(value, list):
+        # Путь через список применяется к каждому элементу: managers_block.managers.name
+        return [p for p in (_project(v, tree) for v in value) if p is not _MISSING]
+    return _MISSING
+
+
+class Projection:
+    """Проекция карточки на набор путей через точку ("main_block.inn", "contacts_block").
+
+    Применяется к каждому элементу во время потокового разбора ответа, так что
+    отброшенные блоки не доживают ни до кэша, ни до ответа MCP.
+    """
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self.paths: List[str] = sorted({p.strip() for p in paths if p and p.strip()})
+        self._tree = _compile(self.paths)
+
+    def apply(self, item: Any) -> Any:
+        if not isinstance(item, dict):
+            return item
+        return _project(item, self._tree)
+
+
+def resolve_projection(fields: Optional[Union[str, Iterable[str]]] = None, preset: Optional[str] = None) -> Optional[Projection]:
+    """fields (список или строка через запятую) и/или preset -> Projection; без них — None (карточка целиком)."""
+    paths: List[str] = []
+    if preset:
+        if preset not in PRESETS:
+            raise ValueError(f"unknown preset {preset!r}, expected one of: {', '.join(sorted(PRESETS))}")
+        paths.extend(PRESETS[preset])
+    if fields:
+        paths.extend(fields.split(",") if isinstance(fields, str) else fields)
+    if not paths:
+        return None
+    return Projection(paths)
@@ -0,0 +1,189 @@
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Единицы и множители: «тыс/млн/млрд» и полные формы одинаково для всех разделов
+UNIT_MULTIPLIERS: Dict[str, float] = {"тыс": 1_000.0, "млн": 1_000_000.0, "млрд": 1_000_000_000.0}
+
+# Ключевые слова, к которым привязываются величины: основа слова -> раздел
+_KEYWORDS: Dict[str, str] = {
+    "выручк": "income",
+    "прибыл": "net_income",
+    "зарплат": "salary",
+    "оклад": "salary",
+    "з/п": "salary",
+    "зп": "salary",
+    "вознагражден": "salary",
+    "нмцк": "price",
+    "начальн": "price",
+    "стоимост": "price",
+    "сумм": "price",
+    "сотрудник": "headcount",
+    "численност": "headcount",
+    "рост": "growth",
+}
+# Без одной из этих основ в запросе величин нет
+KEYWORD_STEMS: Tuple[str, ...] = tuple(_KEYWORDS)
+
+# Сколько символов может быть между ключевым словом и сравнением/числом: «выручка которых составляет …»
+MAX_GAP = 40
+
+# Основы, которые совпадают с началом посторонних слов: «начальник», «Ростов»/«Ростова»
+_KEYWORD_GUARDS: Dict[str, str] = {
+    "начальн": "(?!ик)",
+    "рост": "(?=(?:а|ом|у)?(?![а-яё]))",  # рост, роста, ростом, росту
+}
+_KEYWORD_ALT = "|".join(re.escape(stem) + _KEYWORD_GUARDS.get(stem, "") for stem in KEYWORD_STEMS)
+_FROM = r"не\s*менее|больше|свыше|выше|более|от|>"
+_TO = r"не\s*более|меньше|менее|до|<"
+_EQ = r"составля[ею]т|сост\.?|около|≈"
+_NUMBER = r"\d+(?:\s\d{3}(?!\d))*(?:[.,]\d+)?"
+_UNIT = r"тыс(?:яч[аи]?)?|млн|миллион(?:а|ов)?|млрд|миллиард(?:а|ов)?"
+_CURRENCY = r"руб(?:лей|ля|\.)?|р\.|р\b|₽"
+
+
+def _operator(n: int) -> str:
+    return rf"(?:(?<![а-яё])(?:(?P<from{n}>{_FROM})|(?P<to{n}>{_TO})|(?P<eq{n}>{_EQ}))(?![а-яё])\s*)"
+
+
+def _amount(n: int) -> str:
+    return (
+        rf"(?P<num{n}>(?<![\d.,]){_NUMBER})(?:\s*(?P<unit{n}>{_UNIT})\.?)?"
+        rf"(?:\s*(?:{_CURRENCY}))?(?:\s*(?P<pct{n}>%))?"
+    )
+
+
+# Одно предложение о величине: ключевое слово (можно с «выручки»: «рост выручки»), до MAX_GAP
+# символов текста без других ключевых слов, [сравнение] число [единица] [валюта] [%] и, для
+# диапазона, второе «сравнение число …».
+# Паттерн применяется только с позиций ключевых слов (re.match), текст между ними не сканируется.
+_CLAUSE_RE = re.compile(
+    rf"(?P<kw>{_KEYWORD_ALT})[а-яё/]*(?:\s+выручк[а-яё]*)?"
+    rf"(?:(?!{_KEYWORD_ALT})[а-яё\s,.:()–-]){{0,{MAX_GAP}}}?"
+    rf"{_operator(1)}?{_amount(1)}"
+    rf"(?:\s*,?\s*{_operator(2)}{_amount(2)})?"
+)
+
+
+class Quantity(NamedTuple):
+    value: float  # с учётом единицы: «2 млн» -> 2_000_000
+    unit: str  # "", "тыс", "млн", "млрд"
+    op: str  # "from" | "to" | "eq" | "" (число без сравнения)
+    kind: str  # раздел ключевого слова: "income", "net_income", "salary", "price", "headcount", "growth"
+    percent: bool
+    start: int
+    end: int
+
+
+# Написание единицы -> каноническое
+_UNIT_KEYS: Dict[str, str] = {
+    "тыс": "тыс", "тысяч": "тыс", "тысяча": "тыс", "тысячи": "тыс",
+    "млн": "млн", "миллион": "млн", "миллиона": "млн", "миллионов": "млн",
+    "млрд": "млрд", "миллиард": "млрд", "миллиарда": "млрд", "миллиардов": "млрд",
+}
+
+
+def _number(raw: str) -> float:
+    if raw.isdigit():
+        return float(raw)
+    return float(raw.replace(" ", "").replace("\u00A0", "").replace(",", "."))
+
+
+# Номера групп паттерна (m.groups() — один кортеж вместо m.group() по именам)
+_G = {name: index - 1 for name, index in _CLAUSE_RE.groupindex.items()}
+_KW, _FROM1, _TO1, _EQ1, _NUM1, _UNIT1, _PCT1, _FROM2, _TO2, _EQ2, _NUM2, _UNIT2, _PCT2 = (
+    _G[name] for name in ("kw", "from1", "to1", "eq1", "num1", "unit1", "pct1", "from2", "to2", "eq2", "num2", "unit2", "pct2")
+)
+
+
+def _append_quantities(m: "re.Match[str]", out: List[Quantity]) -> None:
+    g = m.groups()
+    kind = _KEYWORDS[g[_KW]]
+    growth = kind == "growth"
+    op1 = "from" if g[_FROM1] else "to" if g[_TO1] else "eq" if g[_EQ1] else ""
+    unit1 = _UNIT_KEYS.get(g[_UNIT1], "")
+    num2 = g[_NUM2]
+    if num2 is not None:
+        op2 = "from" if g[_FROM2] else "to" if g[_TO2] else "eq"
+        unit2 = _UNIT_KEYS.get(g[_UNIT2], "")
+        if not unit1 and op1 == "from" and op2 == "to":
+            # «от 1 до 2 млн»: единица второго числа относится к обоим
+            unit1 = unit2
+    # Проценты — только у роста, у остальных разделов — только абсолютные величины
+    if (g[_PCT1] is not None) == growth:
+        value = _number(g[_NUM1]) * UNIT_MULTIPLIERS.get(unit1, 1.0)
+        out.append(Quantity(value, unit1, op1, kind, growth, m.start(_NUM1 + 1), m.end(_NUM1 + 1)))
+    if num2 is not None and (g[_PCT2] is not None) == growth:
+        value = _number(num2) * UNIT_MULTIPLIERS.get(unit2, 1.0)
+        out.append(Quantity(value, unit2, op2, kind, growth, m.start(_NUM2 + 1), m.end(_NUM2 + 1)))
+
+
+def tokenize_quantities(q: str, stems: Optional[Iterable[str]] = None) -> List[Quantity]:
+    """Величины запроса с единицей, сравнением и ключевым словом — один проход по тексту.
+
+    Число привязывается к ближайшему ключевому слову перед ним (не дальше MAX_GAP символов,
+    без другого ключевого слова между ними); «от X до Y» даёт две величины одного раздела.
+    Числа без ключевого слова (даты, коды) не возвращаются. q — запрос в нижнем регистре;
+    stems — уже найденные в запросе основы (например, префильтром), иначе ищутся здесь.
+    """
+    out: List[Quantity] = []
+    for _, found in _clauses(q, stems):
+        out.extend(found)
+    return out
+
+
+def _clauses(q: str, stems: Optional[Iterable[str]]) -> Iterator[Tuple["re.Match[str]", List[Quantity]]]:
+    positions: List[int] = []
+    for stem in KEYWORD_STEMS:
+        if stems is not None and stem not in stems:
+            continue
+        i = q.find(stem)
+        while i >= 0:
+            if not i or not q[i - 1].isalpha():
+                positions.append(i)
+            i = q.find(stem, i + 1)
+    if not positions:
+        return
+    positions.sort()
+    match = _CLAUSE_RE.match
+    end = 0
+    for pos in positions:
+        if pos < end:
+            continue
+        m = match(q, pos)
+        if m is None:
+            continue
+        found: List[Quantity] = []
+        _append_quantities(m, found)
+        # Фраза без величин (у «роста» — число без %) следующую не поглощает
+        if found:
+            yield m, found
+            end = m.end()
+
+
+def quantity_clauses(q: str, stems: Optional[Iterable[str]] = None) -> List[Tuple[str, int, int]]:
+    """Фразы о величинах целиком — (раздел, начало, конец): ключевое слово, сравнение, числа, единицы.
+
+    Те же фразы, что разбирает tokenize_quantities; нужны, чтобы знать, какую часть запроса объяснили величины.
+    """
+    out: List[Tuple[str, int, int]] = []
+    for m, found in _clauses(q, stems):
+        out.append((found[0].kind, m.start(), m.end()))
+    return out
+
+
+def bounds(quantities: List[Quantity], kind: str) -> Tuple[Optional[Quantity], Optional[Quantity]]:
+    """Первая нижняя и первая верхняя граница раздела; «составляет X» — нижняя, если другой нет.
+
+    Числа раздела без сравнения («выручка 2023») границами не считаются.
+    """
+    lo = hi = eq = None
+    for qty in quantities:
+        if qty.kind != kind:
+            continue
+        if qty.op == "from" and lo is None:
+            lo = qty
+        elif qty.op == "to" and hi is None:
+            hi = qty
+        elif qty.op == "eq" and eq is None:
+            eq = qty
+    return lo or eq, hi
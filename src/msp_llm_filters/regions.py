@@ -0,0 +1,203 @@
+import re
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Субъекты РФ: код региона (как в region_codes API) -> (название, варианты записи).
+# Вариант — последовательность основ слов: основа совпадает с началом слова, так что
+# «свердловск обл» покрывает «Свердловская область», «по Свердловской обл.», «в свердловской области».
+# Основа с «$» на конце — только целое слово (аббревиатуры и короткие названия: «мск», «коми»).
+_OBL = "обл"
+_KRAI = "кра"
+
+REGIONS: Dict[str, Tuple[str, Tuple[Tuple[str, ...], ...]]] = {
+    "01": ("Республика Адыгея", (("адыге",),)),
+    "02": ("Республика Башкортостан", (("башкортостан",), ("башкир",))),
+    "03": ("Республика Бурятия", (("бурят",),)),
+    "04": ("Республика Алтай", (("республик", "алтай"), ("горн", "алтай"))),
+    "05": ("Республика Дагестан", (("дагестан",),)),
+    "06": ("Республика Ингушетия", (("ингушети",),)),
+    "07": ("Кабардино-Балкарская Республика", (("кабардино-балкари",), ("кабардино-балкарск",), ("кбр$",))),
+    "08": ("Республика Калмыкия", (("калмыки",),)),
+    "09": ("Карачаево-Черкесская Республика", (("карачаево-черкеси",), ("карачаево-черкесск", "республик"), ("кчр$",))),
+    "10": ("Республика Карелия", (("карели",), ("карельск",))),
+    "11": ("Республика Коми", (("республик", "коми$"), ("коми$",))),
+    "12": ("Республика Марий Эл", (("марий", "эл$"),)),
+    "13": ("Республика Мордовия", (("мордови",),)),
+    "14": ("Республика Саха (Якутия)", (("якути",), ("республик", "саха$"))),
+    "15": ("Республика Северная Осетия — Алания", (("северн", "осети"), ("алани",))),
+    "16": ("Республика Татарстан", (("татарстан",), ("татари",))),
+    "17": ("Республика Тыва", (("тыв",),)),
+    "18": ("Удмуртская Республика", (("удмурт",),)),
+    "19": ("Республика Хакасия", (("хакаси",),)),
+    "20": ("Чеченская Республика", (("чечн",), ("чеченск", "республик"))),
+    "21": ("Чувашская Республика", (("чуваш",),)),
+    "22": ("Алтайский край", (("алтайск", _KRAI),)),
+    "23": ("Краснодарский край", (("краснодарск", _KRAI), ("кубан",))),
+    "24": ("Красноярский край", (("красноярск", _KRAI),)),
+    "25": ("Приморский край", (("приморск", _KRAI), ("приморье",), ("приморья",))),
+    "26": ("Ставропольский край", (("ставропольск", _KRAI), ("ставрополье",), ("ставрополья",))),
+    "27": ("Хабаровский край", (("хабаровск", _KRAI),)),
+    "28": ("Амурская область", (("амурск", _OBL),)),
+    "29": ("Архангельская область", (("архангельск", _OBL),)),
+    "30": ("Астраханская область", (("астраханск", _OBL),)),
+    "31": ("Белгородская область", (("белгородск", _OBL),)),
+    "32": ("Брянская область", (("брянск", _OBL),)),
+    "33": ("Владимирская область", (("владимирск", _OBL),)),
+    "34": ("Волгоградская область", (("волгоградск", _OBL),)),
+    "35": ("Вологодская область", (("вологодск", _OBL),)),
+    "36": ("Воронежская область", (("воронежск", _OBL),)),
+    "37": ("Ивановская область", (("ивановск", _OBL),)),
+    "38": ("Иркутская область", (("иркутск", _OBL),)),
+    "39": ("Калининградская область", (("калининградск", _OBL),)),
+    "40": ("Калужская область", (("калужск", _OBL),)),
+    "41": ("Камчатский край", (("камчатск", _KRAI), ("камчатк",))),
+    "42": ("Кемеровская область — Кузбасс", (("кемеровск", _OBL), ("кузбасс",))),
+    "43": ("Кировская область", (("кировск", _OBL),)),
+    "44": ("Костромская область", (("костромск", _OBL),)),
+    "45": ("Курганская область", (("курганск", _OBL),)),
+    "46": ("Курская область", (("курск", _OBL),)),
+    "47": ("Ленинградская область", (("ленинградск", _OBL), ("ленобласт",))),
+    "48": ("Липецкая область", (("липецк", _OBL),)),
+    "49": ("Магаданская область", (("магаданск", _OBL),)),
+    "50": ("Московская область", (("московск", _OBL), ("подмосковь",))),
+    "51": ("Мурманская область", (("мурманск", _OBL),)),
+    "52": ("Нижегородская область", (("нижегородск", _OBL),)),
+    "53": ("Новгородская область", (("новгородск", _OBL),)),
+    "54": ("Новосибирская область", (("новосибирск", _OBL),)),
+    "55": ("Омская область", (("омск", _OBL),)),
+    "56": ("Оренбургская область", (("оренбургск", _OBL),)),
+    "57": ("Орловская область", (("орловск", _OBL),)),
+    "58": ("Пензенская область", (("пензенск", _OBL),)),
+    "59": ("Пермский край", (("пермск", _KRAI),)),
+    "60": ("Псковская область", (("псковск", _OBL),)),
+    "61": ("Ростовская область", (("ростовск", _OBL),)),
+    "62": ("Рязанская область", (("рязанск", _OBL),)),
+    "63": ("Самарская область", (("самарск", _OBL),)),
+    "64": ("Саратовская область", (("саратовск", _OBL),)),
+    "65": ("Сахалинская область", (("сахалинск", _OBL),)),
+    "66": ("Свердловская область", (("свердловск", _OBL),)),
+    "67": ("Смоленская область", (("смоленск", _OBL),)),
+    "68": ("Тамбовская область", (("тамбовск", _OBL),)),
+    "69": ("Тверская область", (("тверск", _OBL),)),
+    "70": ("Томская область", (("томск", _OBL),)),
+    "71": ("Тульская область", (("тульск", _OBL),)),
+    "72": ("Тюменская область", (("тюменск", _OBL),)),
+    "73": ("Ульяновская область", (("ульяновск", _OBL),)),
+    "74": ("Челябинская область", (("челябинск", _OBL),)),
+    "75": ("Забайкальский край", (("забайкальск", _KRAI), ("забайкалье",), ("забайкалья",))),
+    "76": ("Ярославская область", (("ярославск", _OBL),)),
+    "77": ("Москва", (("москв",), ("мск$",))),
+    "78": ("Санкт-Петербург", (("санкт-петербург",), ("петербург",), ("спб$",), ("питер",))),
+    "79": ("Еврейская автономная область", (("еврейск", "автономн"),)),
+    "83": ("Ненецкий автономный округ", (("ненецк", "автономн"), ("нао$",))),
+    "86": ("Ханты-Мансийский автономный округ — Югра", (("ханты-мансийск", "автономн"), ("хмао",), ("югр",))),
+    "87": ("Чукотский автономный округ", (("чукотск", "автономн"), ("чукотк",))),
+    "89": ("Ямало-Ненецкий автономный округ", (("ямало-ненецк",), ("янао$",))),
+    "90": ("Запорожская область", (("запорожск", _OBL),)),
+    "91": ("Республика Крым", (("крым",),)),
+    "92": ("Севастополь", (("севастопол",),)),
+    "93": ("Донецкая Народная Республика", (("донецк", "народн"), ("днр$",))),
+    "94": ("Луганская Народная Республика", (("луганск", "народн"), ("лнр$",))),
+    "95": ("Херсонская область", (("херсонск", _OBL),)),
+}
+
+_WORD_RE = re.compile(r"[а-яa-z0-9]+(?:-[а-яa-z0-9]+)*")
+
+# Узел пословного трая: (посимвольный трай основ следующего слова, код региона или None).
+# Посимвольный трай: символ -> узел; ключ "" — основа кончилась (дальше любые буквы окончания),
+# ключ "$" — основа должна совпасть со словом целиком. Значение обоих — следующий пословный узел.
+_WordNode = List  # [dict, Optional[str]]
+
+
+def _new_node() -> _WordNode:
+    return [{}, None]
+
+
+class RegionGazetteer:
+    """Распознавание субъектов РФ в запросе по трае основ словоформ.
+
+    Один проход по словам запроса: от каждого слова спускаемся по трае (символы основы,
+    затем следующее слово), берём самое длинное совпадение и продолжаем после него.
+    Регулярных выражений на регион нет: стоимость — O(длина запроса × глубина основы).
+    """
+
+    def __init__(self, regions: Dict[str, Tuple[str, Sequence[Sequence[str]]]] = REGIONS) -> None:
+        self.names: Dict[str, str] = {code: name for code, (name, _) in regions.items()}
+        self._root = _new_node()
+        stems = set()
+        for code, (_, variants) in regions.items():
+            for variant in variants:
+                node = self._root
+                for k, stem in enumerate(variant):
+                    exact = stem.endswith("$")
+                    stem = stem.rstrip("$")
+                    if k == 0:
+                        stems.add(stem)
+                    chars = node[0]
+                    for ch in stem:
+                        chars = chars.setdefault(ch, {})
+                    node = chars.setdefault("$" if exact else "", _new_node())
+                if node[1] not in (None, code):
+                    raise ValueError(f"ambiguous region variant {variant!r}: {node[1]} vs {code}")
+                node[1] = code
+        # Основы первого слова вариантов: без хотя бы одной из них регионов в тексте нет
+        self.stems: FrozenSet[str] = frozenset(stems)
+
+    def _descend(self, node: _WordNode, word: str) -> List[_WordNode]:
+        """Пословные узлы, в которые ведут основы, совпавшие с началом word."""
+        out: List[_WordNode] = []
+        chars = node[0]
+        for ch in word:
+            nxt = chars.get("")
+            if nxt is not None:
+                out.append(nxt)
+            chars = chars.get(ch)
+            if chars is None:
+                return out
+        for key in ("", "$"):
+            nxt = chars.get(key)
+            if nxt is not None:
+                out.append(nxt)
+        return out
+
+    def find(self, text: str) -> List[Tuple[str, int, int]]:
+        """Найденные регионы: (код, индекс первого слова, индекс после последнего) в порядке текста."""
+        words = _WORD_RE.findall(text.lower().replace("ё", "е"))
+        found: List[Tuple[str, int, int]] = []
+        i = 0
+        while i < len(words):
+            best: Optional[Tuple[str, int]] = None
+            frontier = [(self._root, i)]
+            while frontier:
+                node, j = frontier.pop()
+                if j >= len(words):
+                    continue
+                for nxt in self._descend(node, words[j]):
+                    if nxt[1] is not None and (best is None or j + 1 > best[1]):
+                        best = (nxt[1], j + 1)
+                    if nxt[0]:
+                        frontier.append((nxt, j + 1))
+            if best is None:
+                i += 1
+                continue
+            found.append((best[0], i, best[1]))
+            i = best[1]
+        return found
+
+    def spans(self, text: str) -> List[Tuple[str, int, int]]:
+        """Как find, но с позициями символов в text: (код, начало первого слова, конец последнего)."""
+        words = [m.span() for m in _WORD_RE.finditer(text.lower().replace("ё", "е"))]
+        return [(code, words[i][0], words[j - 1][1]) for code, i, j in self.find(text)]
+
+    def codes(self, text: str) -> List[str]:
+        """Коды регионов без повторов в порядке упоминания."""
+        return list(dict.fromkeys(code for code, _, _ in self.find(text)))
+
+
+_gazetteer: Optional[RegionGazetteer] = None
+
+
+def get_gazetteer() -> RegionGazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = RegionGazetteer()
+    return _gazetteer
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_ISO_DATE_RE = re.compile(r"^(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})$")
+_RU_DATE_RE = re.compile(r"^(\d{1,2})\.(\d{1,2})\.(\d{4})$")
+
+
+def _canonical_date(s: str) -> Optional[str]:
+    m = _ISO_DATE_RE.match(s)
+    if m:
+        y, mo, d = m.groups()
+        return f"{y}-{int(mo):02d}-{int(d):02d}"
+    m = _RU_DATE_RE.match(s)
+    if m:
+        d, mo, y = m.groups()
+        return f"{y}-{int(mo):02d}-{int(d):02d}"
+    return None
+
+
+def canonicalize(value: Any) -> Any:
+    """Каноническая форма тела фильтров для ключа кэша.
+
+    Ключи сортируются, None выбрасываются, списки дедуплицируются и сортируются,
+    даты приводятся к YYYY-MM-DD, целые float — к int. Строки-коды ("07") не трогаем.
+    """
+    if isinstance(value, dict):
+        return {str(k): canonicalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0])) if v is not None}
+    if isinstance(value, (list, tuple, set)):
+        items = [canonicalize(v) for v in value if v is not None]
+        uniq = {json.dumps(v, ensure_ascii=False, sort_keys=True): v for v in items}
+        return [uniq[k] for k in sorted(uniq)]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        s = value.strip()
+        return _canonical_date(s) or s
+    return value
+
+
+def request_fingerprint(url: str, body: Dict[str, Any], limit: int, offset: int, **extra: Any) -> str:
+    canonical = {
+        "url": url,
+        "body": canonicalize(body),
+        "limit": int(limit),
+        "offset": int(offset),
+        "extra": canonicalize(extra),
+    }
+    raw = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL кэш сериализованных ответов с ограничением суммарного размера в байтах.
+
+    Храним JSON-строки, а не объекты: размер считается точно, а каждое попадание
+    десериализуется в новый объект, так что вызывающий код может его менять.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypasses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl_seconds > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, data = entry
+        if expires_at <= self._clock():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: str | bytes, ttl_seconds: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        payload = data.encode("utf-8") if isinstance(data, str) else data
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (self._clock() + ttl, payload)
+        self.size_bytes += len(payload)
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, data = self._entries.pop(key)
+        self.size_bytes -= len(data)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "bypasses": self.bypasses,
+        }
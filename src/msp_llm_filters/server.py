@@ -1,8 +1,16 @@
 import asyncio
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
+from .court_index import court_index_for
+from .dictionary_cache import DEFAULT_CACHE_DIR, DictionaryCache
+from .http_client import get_http_client, http_client_lifespan
+from .json_stream import ItemStreamDecoder, stream_items
+from .response_cache import ResponseCache, request_fingerprint
+from .singleflight import SingleFlight
+from .tool_args import int_arg
+
 
 def normalize_date(value: Any) -> Optional[str]:
     if value is None:
@@ -38,6 +46,15 @@ class Settings(BaseModel):
     courts_url: str = Field(default_factory=lambda: os.getenv("COURTS_URL", "http://10.0.61.119:8092/api_ext/v1/dictionary/arbitration/courts"))
     dispute_categories_url: str = Field(default_factory=lambda: os.getenv("DISPUTE_CATEGORIES_URL", "http://10.0.61.119:8092/api_ext/v1/dictionary/arbitration/dispute-categories"))
     document_types_url: str = Field(default_factory=lambda: os.getenv("DOCUMENT_TYPES_URL", "http://10.0.61.119:8092/api_ext/v1/dictionary/arbitration/document-types"))
+    # Кэш справочников: TTL (сутки по умолчанию) и каталог для снимков (пусто — без снимков)
+    dictionary_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("DICTIONARY_TTL_SECONDS", "86400")))
+    dictionary_cache_dir: str = Field(default_factory=lambda: os.getenv("DICTIONARY_CACHE_DIR", DEFAULT_CACHE_DIR))
+    # Кэш ответов поиска (0 — выключен)
+    response_cache_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300")))
+    response_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    # Пакетное получение карточек: параллельность и предел идентификаторов на вызов
+    bulk_concurrency: int = Field(default_factory=lambda: int(os.getenv("BULK_CONCURRENCY", "8")))
+    bulk_max_ids: int = Field(default_factory=lambda: int(os.getenv("BULK_MAX_IDS", "500")))
 
     @property
     def has_api(self) -> bool:
@@ -105,9 +122,99 @@ class CaseDetail(BaseModel):
     documents: Optional[List[Dict[str, Any]]] = None
 
 
+class CaseError(BaseModel):
+    case_id: str
+    error: str
+
+
+class BulkCasesResponse(BaseModel):
+    items: List[CaseDetail]
+    errors: List[CaseError] = Field(default_factory=list)
+
+
+class CaseDocumentsResponse(BaseModel):
+    documents: Dict[str, List[Dict[str, Any]]]
+    errors: List[CaseError] = Field(default_factory=list)
+
+
+_PARTICIPANT_ROLE_KEYS = [
+    "plaintiffs",
+    "respondents",
+    "third_parties",
+    "interested_persons",
+    "creditors",
+    "creditors_current_payments",
+    "debtors",
+    "applicants",
+    "others",
+]
+
+
+def participant_names(it: Dict[str, Any]) -> List[str]:
+    """Имена участников дела по всем ролям."""
+    names: List[str] = []
+    for role_key in _PARTICIPANT_ROLE_KEYS:
+        for p in it.get(role_key) or []:
+            name = p.get("name") or p.get("norm_name")
+            if name:
+                names.append(name)
+    return names
+
+
+def _make_snippet(it: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    if it.get("sum") is not None:
+        parts.append(f"сумма: {it.get('sum')}")
+    if it.get("currency"):
+        parts.append(f"валюта: {it.get('currency')}")
+    if it.get("status") is not None:
+        parts.append(f"статус: {it.get('status')}")
+    if it.get("dispute") is not None:
+        parts.append(f"спор: {it.get('dispute')}")
+    return ", ".join(parts)
+
+
+def case_summary_from_raw(it: Dict[str, Any], need_document: bool) -> Optional[CaseSummary]:
+    """Элемент data[] ответа batch-cases → CaseSummary (None, если у записи нет идентификатора)."""
+    if not (it.get("case_id") or it.get("first_number")):
+        return None
+    # ограничим превью, но оставим возможность посмотреть полностью через documents/деталь
+    participants_short = participant_names(it)[:10]
+    return CaseSummary(
+        id=str(it.get("case_id") or it.get("first_number") or ""),
+        title=str(it.get("first_number") or it.get("case_id") or "Дело"),
+        court=None,  # явного поля нет
+        date=normalize_date(it.get("date_start")),
+        sum=it.get("sum"),
+        currency=it.get("currency"),
+        status=it.get("status"),
+        kad_arbitr_link=it.get("kad_arbitr_link"),
+        last_document_date=normalize_date(it.get("last_document_date")),
+        document_types=it.get("document_types"),
+        participants_short=(participants_short or None),
+        documents=it.get("documents") if need_document else None,
+        snippet=_make_snippet(it),
+    )
+
+
+_response_cache: Optional[ResponseCache] = None
+upstream_flights = SingleFlight()
+
+
+def get_response_cache(settings: Settings) -> ResponseCache:
+    """Кэш ответов на процесс; размер и TTL берутся из настроек при первом обращении."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(settings.response_cache_max_bytes, settings.response_cache_ttl_seconds)
+    return _response_cache
+
+
 # ---- Adapter to external API (placeholder) ----
-async def api_search(settings: Settings, req: SearchRequest) -> SearchResponse:
-    """Адаптер под batch-cases. Если API_BASE_URL не задан, возвращаем мок."""
+async def api_search(settings: Settings, req: SearchRequest, use_cache: bool = True) -> SearchResponse:
+    """Адаптер под batch-cases. Если API_BASE_URL не задан, возвращаем мок.
+
+    Ответы кэшируются по каноническому отпечатку фильтров и limit/offset; use_cache=False — в обход кэша.
+    """
     page_size = min(req.page_size or settings.default_page_size, settings.max_page_size)
 
     if not settings.has_api:
@@ -138,82 +245,52 @@ async def api_search(settings: Settings, req: SearchRequest) -> SearchResponse:
     # Тело запроса — фильтры как есть по документации
     body: Dict[str, Any] = req.filters.model_dump(exclude_none=True)
 
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        r = await client.post(settings.api_base_url, params=params, json=body)
-        r.raise_for_status()
-        data = r.json()
-
-    # Ожидаем структуру по схеме: { data: [...], total, limit, offset }
-    raw_items: List[Dict[str, Any]] = data.get("data", []) or []
-
-    def make_snippet(it: Dict[str, Any]) -> str:
-        parts: List[str] = []
-        if it.get("sum") is not None:
-            parts.append(f"сумма: {it.get('sum')}")
-        if it.get("currency"):
-            parts.append(f"валюта: {it.get('currency')}")
-        if it.get("status") is not None:
-            parts.append(f"статус: {it.get('status')}")
-        if it.get("dispute") is not None:
-            parts.append(f"спор: {it.get('dispute')}")
-        return ", ".join(parts)
-
-    def aggregate_participants_short(it: Dict[str, Any]) -> List[str]:
-        names: List[str] = []
-        for role_key in [
-            "plaintiffs",
-            "respondents",
-            "third_parties",
-            "interested_persons",
-            "creditors",
-            "creditors_current_payments",
-            "debtors",
-            "applicants",
-            "others",
-        ]:
-            for p in it.get(role_key) or []:
-                name = p.get("name") or p.get("norm_name")
-                if name:
-                    names.append(name)
-        # ограничим превью, но оставим возможность посмотреть полностью через documents/деталь
-        return names[:10] if names else []
-
-    items = []
-    for it in raw_items:
-        if not (it.get("case_id") or it.get("first_number")):
-            continue
-        items.append(
-            CaseSummary(
-                id=str(it.get("case_id") or it.get("first_number") or ""),
-                title=str(it.get("first_number") or it.get("case_id") or "Дело"),
-                court=None,  # явного поля нет
-                date=normalize_date(it.get("date_start")),
-                sum=it.get("sum"),
-                currency=it.get("currency"),
-                status=it.get("status"),
-                kad_arbitr_link=it.get("kad_arbitr_link"),
-                last_document_date=normalize_date(it.get("last_document_date")),
-                document_types=it.get("document_types"),
-                participants_short=(aggregate_participants_short(it) or None),
-                documents=it.get("documents") if body.get("need_document") else None,
-                snippet=make_snippet(it),
-            )
+    cache = get_response_cache(settings)
+    cache_key = request_fingerprint(settings.api_base_url, body, limit=limit, offset=offset, page=req.page)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return SearchResponse.model_validate_json(cached)
+    else:
+        cache.bypasses += 1
+
+    async def fetch() -> str:
+        # Ожидаем структуру по схеме: { data: [...], total, limit, offset }.
+        # Тело разбираем потоком: каждое дело сразу сворачивается в CaseSummary, дерево ответа целиком не строится.
+        need_document = bool(body.get("need_document"))
+        decoder = ItemStreamDecoder(keys=("data",), item_hook=lambda it: case_summary_from_raw(it, need_document))
+        items: List[CaseSummary] = await stream_items(
+            get_http_client(),
+            "POST",
+            settings.api_base_url,
+            decoder,
+            params=params,
+            json=body,
+            timeout=settings.request_timeout_seconds,
         )
 
-    total = data.get("total")
-    next_page: Optional[int] = None
-    if isinstance(total, int) and (offset + limit) < total:
-        next_page = req.page + 1
-
-    return SearchResponse(
-        items=items,
-        page=req.page,
-        page_size=page_size,
-        total=total,
-        next_page=next_page,
-    )
+        total = decoder.meta.get("total")
+        next_page: Optional[int] = None
+        if isinstance(total, int) and (offset + limit) < total:
+            next_page = req.page + 1
+
+        res = SearchResponse(
+            items=items,
+            page=req.page,
+            page_size=page_size,
+            total=total,
+            next_page=next_page,
+        )
+        raw = res.model_dump_json()
+        cache.put(cache_key, raw)
+        return raw
+
+    # Одинаковые одновременные запросы идут к upstream один раз; каждый вызывающий получает свою копию
+    raw = await upstream_flights.do(cache_key, fetch)
+    return SearchResponse.model_validate_json(raw)
 
-async def api_get_case(settings: Settings, case_id: str) -> CaseDetail:
+
+async def api_get_case(settings: Settings, case_id: str, use_cache: bool = True) -> CaseDetail:
     # Реализуем через batch-cases с фильтром case_num и limit=1
     if not settings.has_api:
         return CaseDetail(
@@ -232,80 +309,160 @@ async def api_get_case(settings: Settings, case_id: str) -> CaseDetail:
     }
     body = {"case_num": case_id, "need_document": True}
 
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        r = await client.post(settings.api_base_url, params=params, json=body)
-        r.raise_for_status()
-        data = r.json()
-
-    arr = data.get("data") or []
-    if not arr:
-        # Не найдено
-        return CaseDetail(id=case_id, title=str(case_id))
-
-    it = arr[0]
-    # Участники: соберем имена по ролям, если есть
-    participants: List[str] = []
-    for role_key in [
-        "plaintiffs",
-        "respondents",
-        "third_parties",
-        "interested_persons",
-        "creditors",
-        "creditors_current_payments",
-        "debtors",
-        "applicants",
-        "others",
-    ]:
-        for p in it.get(role_key) or []:
-            name = p.get("name") or p.get("norm_name")
-            if name:
-                participants.append(name)
-
-    documents = it.get("documents")
-
-    return CaseDetail(
-        id=str(it.get("case_id") or case_id),
-        title=str(it.get("first_number") or it.get("case_id") or case_id),
-        court=None,
-        date=it.get("date_start"),
-        participants=participants or None,
-        documents=documents,
-    )
+    cache = get_response_cache(settings)
+    cache_key = request_fingerprint(settings.api_base_url, body, limit=1, offset=0)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return CaseDetail.model_validate_json(cached)
+    else:
+        cache.bypasses += 1
+
+    async def fetch() -> str:
+        # limit=1, но с документами одно дело может весить мегабайты — тоже читаем потоком
+        arr = await stream_items(
+            get_http_client(),
+            "POST",
+            settings.api_base_url,
+            ItemStreamDecoder(keys=("data",)),
+            params=params,
+            json=body,
+            timeout=settings.request_timeout_seconds,
+        )
+        if not arr:
+            # Не найдено (не кэшируем: дело может появиться в ближайшее время)
+            return CaseDetail(id=case_id, title=str(case_id)).model_dump_json()
+
+        it = arr[0]
+        participants = participant_names(it)
+
+        documents = it.get("documents")
+
+        raw = CaseDetail(
+            id=str(it.get("case_id") or case_id),
+            title=str(it.get("first_number") or it.get("case_id") or case_id),
+            court=None,
+            date=it.get("date_start"),
+            participants=participants or None,
+            documents=documents,
+        ).model_dump_json()
+        cache.put(cache_key, raw)
+        return raw
+
+    raw = await upstream_flights.do(cache_key, fetch)
+    return CaseDetail.model_validate_json(raw)
+
+
+def _describe_error(e: Exception) -> str:
+    if isinstance(e, httpx.HTTPStatusError):
+        return f"HTTP {e.response.status_code}"
+    return f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+
+
+async def _resolve_cases(
+    settings: Settings,
+    case_ids: List[str],
+    concurrency: Optional[int],
+    use_cache: bool,
+) -> List[Tuple[str, Any]]:
+    """(case_id, CaseDetail | Exception) для уникальных id в исходном порядке."""
+    unique_ids = list(dict.fromkeys(str(cid).strip() for cid in case_ids if str(cid or "").strip()))
+    sem = asyncio.Semaphore(max(1, concurrency or settings.bulk_concurrency))
+
+    async def one(case_id: str) -> CaseDetail:
+        async with sem:
+            return await api_get_case(settings, case_id, use_cache=use_cache)
+
+    results = await asyncio.gather(*(one(cid) for cid in unique_ids), return_exceptions=True)
+    for res in results:
+        if isinstance(res, asyncio.CancelledError):
+            raise res
+    return list(zip(unique_ids, results))
+
+
+async def api_get_cases(
+    settings: Settings,
+    case_ids: List[str],
+    concurrency: Optional[int] = None,
+    use_cache: bool = True,
+) -> BulkCasesResponse:
+    """Карточки нескольких дел: дубликаты схлопываются, запросы идут параллельно (не больше concurrency).
+
+    Ошибка по одному делу не роняет пакет — она попадает в errors, остальные карточки возвращаются.
+    """
+    items: List[CaseDetail] = []
+    errors: List[CaseError] = []
+    for case_id, res in await _resolve_cases(settings, case_ids, concurrency, use_cache):
+        if isinstance(res, Exception):
+            errors.append(CaseError(case_id=case_id, error=_describe_error(res)))
+        else:
+            items.append(res)
+    return BulkCasesResponse(items=items, errors=errors)
+
+
+async def api_get_case_documents(
+    settings: Settings,
+    case_ids: List[str],
+    concurrency: Optional[int] = None,
+) -> CaseDocumentsResponse:
+    """Вторая фаза двухфазного поиска: документы только для выбранных дел (ключ — запрошенный номер)."""
+    documents: Dict[str, List[Dict[str, Any]]] = {}
+    errors: List[CaseError] = []
+    for case_id, res in await _resolve_cases(settings, case_ids, concurrency, use_cache=True):
+        if isinstance(res, Exception):
+            errors.append(CaseError(case_id=case_id, error=_describe_error(res)))
+        else:
+            documents[case_id] = res.documents or []
+    return CaseDocumentsResponse(documents=documents, errors=errors)
 
 
 # ---- Dictionaries ----
 async def api_list_courts(settings: Settings) -> List[Dict[str, Any]]:
     params = {"key": settings.api_key} if settings.api_key else {}
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        r = await client.get(settings.courts_url, params=params)
-        r.raise_for_status()
-        data = r.json()
+    client = get_http_client()
+    r = await client.get(settings.courts_url, params=params, timeout=settings.request_timeout_seconds)
+    r.raise_for_status()
+    data = r.json()
     # Ожидается массив
     return data if isinstance(data, list) else data.get("data") or []
 
 
 async def api_list_dispute_categories(settings: Settings) -> List[Dict[str, Any]]:
     params = {"key": settings.api_key} if settings.api_key else {}
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        r = await client.get(settings.dispute_categories_url, params=params)
-        r.raise_for_status()
-        data = r.json()
+    client = get_http_client()
+    r = await client.get(settings.dispute_categories_url, params=params, timeout=settings.request_timeout_seconds)
+    r.raise_for_status()
+    data = r.json()
     return data if isinstance(data, list) else data.get("data") or []
 
 
 async def api_list_document_types(settings: Settings) -> List[Dict[str, Any]]:
     params = {"key": settings.api_key} if settings.api_key else {}
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        r = await client.get(settings.document_types_url, params=params)
-        r.raise_for_status()
-        data = r.json()
+    client = get_http_client()
+    r = await client.get(settings.document_types_url, params=params, timeout=settings.request_timeout_seconds)
+    r.raise_for_status()
+    data = r.json()
     return data if isinstance(data, list) else data.get("data") or []
 
 
 # ---- MCP server ----
 load_dotenv()
 settings = Settings()
-app = FastMCP("mcp-llm-courts")
+app = FastMCP("mcp-llm-courts", lifespan=http_client_lifespan)
+
+
+def _dictionary_cache(name: str, fetch) -> DictionaryCache:
+    return DictionaryCache(
+        name,
+        lambda: fetch(settings),
+        ttl_seconds=settings.dictionary_ttl_seconds,
+        cache_dir=settings.dictionary_cache_dir,
+    )
+
+
+courts_cache = _dictionary_cache("courts", api_list_courts)
+dispute_categories_cache = _dictionary_cache("dispute_categories", api_list_dispute_categories)
+document_types_cache = _dictionary_cache("document_types", api_list_document_types)
 
 
 @app.tool(name="ping", description="Проверка доступности MCP и связности с внешним API")
@@ -323,8 +480,10 @@ async def ping() -> dict:
         "Поиск дел по фильтрам (с пагинацией). Всегда возвращает развернутые данные: "
         "title(first_number), date_start, sum, currency, status, kad_arbitr_link, "
         "document_types, last_document_date, participants_short, при need_document=true — documents. "
+        "Документы тяжёлые: для списков лучше need_document=false и затем get_case_documents по нужным делам. "
         "LLM: маппируй естественные запросы на фильтры: ‘цена иска’->sum, одна дата -> start_date_from=start_date_to, "
-        "‘пять дел’->page_size=5, ‘Арбитражный суд …’->court, сортировка по сумме -> sort=sum."
+        "‘пять дел’->page_size=5, ‘Арбитражный суд …’->court, сортировка по сумме -> sort=sum. "
+        "Ответы кэшируются на несколько минут; bypass_cache=true — запросить свежие данные."
     ),
 )
 async def search_cases(payload: Dict[str, Any]) -> dict:
@@ -336,7 +495,7 @@ async def search_cases(payload: Dict[str, Any]) -> dict:
     except ValidationError as e:
         return {"error": "validation_error", "details": e.errors()}
 
-    res = await api_search(settings, req)
+    res = await api_search(settings, req, use_cache=not payload.get("bypass_cache"))
     return res.model_dump()
 
 
@@ -353,21 +512,96 @@ async def get_case_by_id(payload: Dict[str, Any]) -> dict:
     return res.model_dump()
 
 
+@app.tool(
+    name="get_cases_by_ids",
+    description=(
+        "Карточки нескольких дел за один вызов. Аргументы: {case_ids: [..], concurrency?}. "
+        "Дубликаты убираются; возвращает items и errors (ошибки по отдельным делам не прерывают пакет)."
+    ),
+)
+async def get_cases_by_ids(payload: Dict[str, Any]) -> dict:
+    case_ids = payload.get("case_ids")
+    if not isinstance(case_ids, list) or not case_ids:
+        return {"error": "validation_error", "details": [{"loc": ["case_ids"], "msg": "non-empty list required"}]}
+    if len(case_ids) > settings.bulk_max_ids:
+        return {"error": "validation_error", "details": [{"loc": ["case_ids"], "msg": f"at most {settings.bulk_max_ids} ids"}]}
+
+    try:
+        concurrency = min(int_arg(payload.get("concurrency"), settings.bulk_concurrency), settings.bulk_concurrency)
+    except ValueError as e:
+        return {"error": "validation_error", "details": [{"loc": ["concurrency"], "msg": str(e)}]}
+    res = await api_get_cases(settings, case_ids, concurrency=concurrency, use_cache=not payload.get("bypass_cache"))
+    return res.model_dump()
+
+
+@app.tool(
+    name="get_case_documents",
+    description=(
+        "Документы выбранных дел (вторая фаза поиска). Аргументы: {case_ids: [..]} — номера дел "
+        "(title из search_cases). Сначала ищи с need_document=false, затем запрашивай документы только нужных дел."
+    ),
+)
+async def get_case_documents(payload: Dict[str, Any]) -> dict:
+    case_ids = payload.get("case_ids")
+    if not isinstance(case_ids, list) or not case_ids:
+        return {"error": "validation_error", "details": [{"loc": ["case_ids"], "msg": "non-empty list required"}]}
+    if len(case_ids) > settings.bulk_max_ids:
+        return {"error": "validation_error", "details": [{"loc": ["case_ids"], "msg": f"at most {settings.bulk_max_ids} ids"}]}
+
+    res = await api_get_case_documents(settings, case_ids)
+    return res.model_dump()
+
+
 @app.tool(
     name="list_courts",
-    description="Справочник: Арбитражные суды. Возвращает список судов для нормализации поля court",
+    description=(
+        "Справочник: Арбитражные суды. Возвращает список судов для нормализации поля court. "
+        "Данные кэшируются (TTL); {refresh: true} — принудительно обновить"
+    ),
 )
 async def list_courts(params: Dict[str, Any] | None = None) -> dict:
-    data = await api_list_courts(settings)
+    if (params or {}).get("refresh"):
+        await courts_cache.refresh()
+    data = await courts_cache.get()
     return {"items": data}
 
 
+RESOLVE_COURT_MAX_LIMIT = 50
+
+
+@app.tool(
+    name="resolve_court",
+    description=(
+        "Нормализация упоминания суда по справочнику list_courts: полные и падежные формы, сокращения "
+        "(АС, ФАС, ААС, СИП, обл.), номера апелляционных судов («9 ААС»), опечатки. Аргументы: {text, limit?}. "
+        "court — однозначный результат (id, name, score) или null; candidates — лучшие варианты"
+    ),
+)
+async def resolve_court(params: Dict[str, Any] | None = None) -> dict:
+    params = params or {}
+    text = params.get("text")
+    if not isinstance(text, str) or not text.strip():
+        return {"error": "validation_error", "details": [{"loc": ["text"], "msg": "non-empty string required"}]}
+    try:
+        limit = min(int_arg(params.get("limit"), 5), RESOLVE_COURT_MAX_LIMIT)
+    except ValueError as e:
+        return {"error": "validation_error", "details": [{"loc": ["limit"], "msg": str(e)}]}
+    index = court_index_for(await courts_cache.get_index())
+    best = index.resolve(text)
+    return {
+        "court": best._asdict() if best is not None else None,
+        "candidates": [m._asdict() for m in index.search(text, limit)],
+    }
+
+
 @app.tool(
     name="list_dispute_categories",
     description="Справочник: Категории арбитражных споров (dispute 0..11)",
 )
 async def list_dispute_categories(params: Dict[str, Any] | None = None) -> dict:
-    data = await api_list_dispute_categories(settings)
+    if (params or {}).get("refresh"):
+        await dispute_categories_cache.refresh()
+    data = await dispute_categories_cache.get()
     return {"items": data}
 
 
@@ -376,10 +610,27 @@ async def list_dispute_categories(params: Dict[str, Any] | None = None) -> dict:
     description="Справочник: Типы документов арбитражных дел (doc_type)",
 )
 async def list_document_types(params: Dict[str, Any] | None = None) -> dict:
-    data = await api_list_document_types(settings)
+    if (params or {}).get("refresh"):
+        await document_types_cache.refresh()
+    data = await document_types_cache.get()
     return {"items": data}
 
 
+@app.tool(
+    name="cache_stats",
+    description="Метрики кэшей: доля попаданий и время обновления справочников, кэш ответов поиска, схлопнутые запросы",
+)
+async def cache_stats(params: Dict[str, Any] | None = None) -> dict:
+    return {
+        "dictionaries": {
+            c.name: c.metrics.as_dict()
+            for c in (courts_cache, dispute_categories_cache, document_types_cache)
+        },
+        "responses": get_response_cache(settings).stats(),
+        "singleflight": upstream_flights.stats(),
+    }
+
+
 async def _run_stdio() -> None:
     async with stdio_server() as (read, write):
         await app.run(read, write)
@@ -1,9 +1,9 @@
 import asyncio
 import os
-from typing import Any, Dict, List, Optional
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
 
 from dotenv import load_dotenv
-import httpx
 from pydantic import BaseModel, Field, ValidationError
 
 try:
@@ -12,6 +12,14 @@ try:
 except ImportError as e:  # pragma: no cover
     raise RuntimeError("mcp package is required. Install with: pip install mcp") from e
 
+from .classifiers import expand_codes
+from .http_client import get_http_client, http_client_lifespan
+from .json_stream import ItemStreamDecoder, stream_items
+from .projection import resolve_projection
+from .response_cache import ResponseCache, request_fingerprint
+from .singleflight import SingleFlight
+from .tool_args import int_arg
+
 
 class Settings(BaseModel):
     api_base_url: str = Field(default_factory=lambda: os.getenv("API_BASE_URL", ""))
@@ -24,6 +32,14 @@ class Settings(BaseModel):
     request_timeout_seconds: int = Field(default_factory=lambda: int(os.getenv("REQUEST_TIMEOUT_SECONDS", "30")))
     default_page_size: int = Field(default_factory=lambda: int(os.getenv("DEFAULT_PAGE_SIZE", "20")))
     max_page_size: int = Field(default_factory=lambda: int(os.getenv("MAX_PAGE_SIZE", "100")))
+    # Кэш ответов поиска (0 — выключен)
+    response_cache_ttl_seconds: int = Field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300")))
+    response_cache_max_bytes: int = Field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    # Выгрузка всех страниц: число параллельных запросов и предел записей для MCP-инструмента
+    export_concurrency: int = Field(default_factory=lambda: int(os.getenv("EXPORT_CONCURRENCY", "4")))
+    export_max_items: int = Field(default_factory=lambda: int(os.getenv("EXPORT_MAX_ITEMS", "10000")))
+    # API принимает только конечные коды ОКВЭД/ОКПД2: «62» раскрывается в «62.01», «62.02.1», …
+    classifier_leaf_codes: bool = Field(default_factory=lambda: os.getenv("CLASSIFIER_LEAF_CODES", "0") == "1")
 
     @property
     def has_api(self) -> bool:
@@ -36,6 +52,9 @@ class BatchCardsRequest(BaseModel):
     filters: Dict[str, Any] = Field(default_factory=dict, description="Тело JSON запроса к batchCardsByFilters")
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=100)
+    # Проекция карточек: пути через точку и/или именованный пресет; без них — карточка целиком
+    fields: Optional[List[str]] = Field(None, description="пример: main_block.inn, contacts_block.phones")
+    preset: Optional[str] = Field(None, description="card | finance | contacts")
 
 
 class SearchResponseGeneric(BaseModel):
@@ -46,8 +65,21 @@ class SearchResponseGeneric(BaseModel):
     next_page: Optional[int] = None
 
 
-async def api_search_batchcards(settings: Settings, req: BatchCardsRequest) -> SearchResponseGeneric:
+_response_cache: Optional[ResponseCache] = None
+upstream_flights = SingleFlight()
+
+
+def get_response_cache(settings: Settings) -> ResponseCache:
+    """Кэш ответов на процесс; размер и TTL берутся из настроек при первом обращении."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(settings.response_cache_max_bytes, settings.response_cache_ttl_seconds)
+    return _response_cache
+
+
+async def api_search_batchcards(settings: Settings, req: BatchCardsRequest, use_cache: bool = True) -> SearchResponseGeneric:
     page_size = min(req.page_size or settings.default_page_size, settings.max_page_size)
+    projection = resolve_projection(req.fields, req.preset)
 
     if not settings.has_api:
         # Мок для локальной отладки без внешнего API
@@ -62,6 +94,8 @@ async def api_search_batchcards(settings: Settings, req: BatchCardsRequest) -> S
             }
             for i in range(page_size)
         ]
+        if projection is not None:
+            items = [projection.apply(it) for it in items]
         return SearchResponseGeneric(items=items, page=req.page, page_size=page_size, total=1000, next_page=req.page + 1)
 
     # If API_BASE_URL already contains a query (e.g., ...?limit=50&offset=0),
@@ -82,6 +116,24 @@ async def api_search_batchcards(settings: Settings, req: BatchCardsRequest) -> S
             params["key"] = settings.api_key
 
     body: Dict[str, Any] = req.filters or {}
+    if settings.classifier_leaf_codes:
+        body = expand_codes(body)
+
+    cache = get_response_cache(settings)
+    cache_key = request_fingerprint(
+        settings.api_base_url,
+        body,
+        limit=limit,
+        offset=offset,
+        page=req.page,
+        fields=projection.paths if projection is not None else None,
+    )
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return SearchResponseGeneric.model_validate_json(cached)
+    else:
+        cache.bypasses += 1
 
     # Build headers similar to provided curl
     headers = {"Accept": "application/json"}
@@ -90,35 +142,119 @@ async def api_search_batchcards(settings: Settings, req: BatchCardsRequest) -> S
     if settings.api_auth_header_name and settings.api_auth_header_value:
         headers[settings.api_auth_header_name] = settings.api_auth_header_value
 
-    async with httpx.AsyncClient(timeout=settings.request_timeout_seconds) as client:
-        if has_query:
-            final_url = settings.api_base_url
-            r = await client.post(final_url, json=body, headers=headers)
-        else:
-            final_url = settings.api_base_url
-            r = await client.post(final_url, params=params, json=body, headers=headers)
-        r.raise_for_status()
-        data = r.json()
-
-    raw_items: List[Dict[str, Any]] = data.get("data") or data.get("items") or []
-    total = data.get("total")
-    if not isinstance(total, int):
-        # Fallbacks: available_count or length of returned page
-        total = data.get("available_count") if isinstance(data.get("available_count"), int) else len(raw_items)
-
-    return SearchResponseGeneric(
-        items=raw_items,
-        page=req.page,
-        page_size=page_size,
-        total=total,
-        next_page=(req.page + 1) if ((offset + limit) < int(total or 0)) else None,
+    async def fetch() -> str:
+        # Карточки с finance/contacts-блоками тяжёлые: разбираем тело потоком, по одной карточке,
+        # и сразу отрезаем поля вне проекции
+        decoder = ItemStreamDecoder(keys=("data", "items"), item_hook=projection.apply if projection is not None else None)
+        raw_items: List[Dict[str, Any]] = await stream_items(
+            get_http_client(),
+            "POST",
+            settings.api_base_url,
+            decoder,
+            params=None if has_query else params,
+            json=body,
+            headers=headers,
+            timeout=settings.request_timeout_seconds,
+        )
+        total = decoder.meta.get("total")
+        if not isinstance(total, int):
+            # Fallbacks: available_count or length of returned page
+            available = decoder.meta.get("available_count")
+            total = available if isinstance(available, int) else len(raw_items)
+
+        res = SearchResponseGeneric(
+            items=raw_items,
+            page=req.page,
+            page_size=page_size,
+            total=total,
+            next_page=(req.page + 1) if ((offset + limit) < int(total or 0)) else None,
+        )
+        raw = res.model_dump_json()
+        cache.put(cache_key, raw)
+        return raw
+
+    # Одинаковые одновременные запросы идут к upstream один раз; каждый вызывающий получает свою копию
+    raw = await upstream_flights.do(cache_key, fetch)
+    return SearchResponseGeneric.model_validate_json(raw)
+
+
+async def iter_all_batchcards(
+    settings: Settings,
+    filters: Dict[str, Any],
+    page_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    preset: Optional[str] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Все записи по фильтрам, по порядку, с параллельной загрузкой страниц.
+
+    Первая страница даёт total/available_count, по нему планируются offset'ы остальных.
+    Одновременно загружается не больше concurrency страниц, и в памяти держится
+    не больше concurrency страниц — независимо от total.
+    """
+    page_size = min(page_size or settings.max_page_size, settings.max_page_size)
+    concurrency = max(1, concurrency or settings.export_concurrency)
+
+    first = await api_search_batchcards(
+        settings, BatchCardsRequest(filters=filters, page=1, page_size=page_size, fields=fields, preset=preset)
     )
+    emitted = 0
+    for it in first.items:
+        if max_items is not None and emitted >= max_items:
+            return
+        yield it
+        emitted += 1
+
+    # URL с зашитыми limit/offset пагинацию не поддерживает
+    if "?" in settings.api_base_url or first.next_page is None:
+        return
+    planned = int(first.total or 0)
+    if max_items is not None:
+        planned = min(planned, max_items)
+    last_page = (planned + page_size - 1) // page_size
+
+    pending: Deque["asyncio.Task[SearchResponseGeneric]"] = deque()
+    next_page = 2
+
+    def schedule() -> None:
+        nonlocal next_page
+        while next_page <= last_page and len(pending) < concurrency:
+            req = BatchCardsRequest(filters=filters, page=next_page, page_size=page_size, fields=fields, preset=preset)
+            pending.append(asyncio.ensure_future(api_search_batchcards(settings, req)))
+            next_page += 1
+
+    try:
+        schedule()
+        while pending:
+            page = await pending.popleft()
+            schedule()
+            if not page.items:
+                break
+            for it in page.items:
+                if max_items is not None and emitted >= max_items:
+                    return
+                yield it
+                emitted += 1
+    finally:
+        # Потребитель прервал итерацию (или ошибка) — не оставляем висящих запросов: отменяем и дожидаемся
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _with_fields_list(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """fields можно передать строкой через запятую — агентам так проще."""
+    fields = payload.get("fields")
+    if isinstance(fields, str):
+        return {**payload, "fields": [f.strip() for f in fields.split(",") if f.strip()]}
+    return payload
 
 
 # ---- MCP server ----
 load_dotenv()
 settings = Settings()
-app = FastMCP("msp-batch-cards")
+app = FastMCP("msp-batch-cards", lifespan=http_client_lifespan)
 
 
 @app.tool(name="ping", description="Проверка доступности MCP и связности с внешним API (batchCardsByFilters)")
@@ -133,21 +269,72 @@ async def ping() -> dict:
 @app.tool(
     name="search_companies",
     description=(
-        "Поиск компаний по естественным фильтрам (плоское тело JSON). Передавай в payload ключ 'filters' — это будет телом POST к /api/v1/batchCardsByFilters."
+        "Поиск компаний по естественным фильтрам (плоское тело JSON). Передавай в payload ключ 'filters' — это будет телом POST к /api/v1/batchCardsByFilters. "
+        "Ответы кэшируются на несколько минут; bypass_cache=true — запросить свежие данные. "
+        "Чтобы не тянуть карточку целиком, передай preset ('card' | 'finance' | 'contacts') и/или "
+        "fields — пути через точку, например ['main_block.inn', 'contacts_block.phones']."
     ),
 )
 async def search_companies(payload: Dict[str, Any]) -> dict:
     try:
-        req = BatchCardsRequest(**payload)
+        req = BatchCardsRequest(**_with_fields_list(payload))
         if req.page_size > settings.max_page_size:
             req.page_size = settings.max_page_size
-    except ValidationError as e:
-        return {"error": "validation_error", "details": e.errors()}
+        resolve_projection(req.fields, req.preset)
+    except (ValidationError, ValueError) as e:
+        details = e.errors() if isinstance(e, ValidationError) else [{"msg": str(e)}]
+        return {"error": "validation_error", "details": details}
 
-    res = await api_search_batchcards(settings, req)
+    res = await api_search_batchcards(settings, req, use_cache=not payload.get("bypass_cache"))
     return res.model_dump()
 
 
+@app.tool(
+    name="search_companies_all",
+    description=(
+        "Выгрузка всех компаний по фильтрам (все страницы, параллельно). Аргументы: "
+        "{filters, page_size?, concurrency?, max_items?, preset?, fields?}. Возвращает items по порядку, fetched и "
+        "truncated=true, если выгрузка упёрлась в max_items."
+    ),
+)
+async def search_companies_all(payload: Dict[str, Any]) -> dict:
+    try:
+        req = BatchCardsRequest(**_with_fields_list(payload))
+        resolve_projection(req.fields, req.preset)
+    except (ValidationError, ValueError) as e:
+        details = e.errors() if isinstance(e, ValidationError) else [{"msg": str(e)}]
+        return {"error": "validation_error", "details": details}
+    limits: Dict[str, int] = {}
+    for name, cap in (("concurrency", settings.export_concurrency), ("max_items", settings.export_max_items)):
+        try:
+            limits[name] = min(int_arg(payload.get(name), cap), cap)
+        except ValueError as e:
+            return {"error": "validation_error", "details": [{"loc": [name], "msg": str(e)}]}
+    concurrency, max_items = limits["concurrency"], limits["max_items"]
+
+    items: List[Dict[str, Any]] = []
+    async for it in iter_all_batchcards(
+        settings,
+        req.filters,
+        page_size=req.page_size if "page_size" in payload else None,
+        concurrency=concurrency,
+        max_items=max_items + 1,
+        fields=req.fields,
+        preset=req.preset,
+    ):
+        items.append(it)
+    truncated = len(items) > max_items
+    return {"items": items[:max_items], "fetched": min(len(items), max_items), "truncated": truncated}
+
+
+@app.tool(name="cache_stats", description="Метрики кэша ответов поиска компаний и схлопнутых запросов")
+async def cache_stats(params: Dict[str, Any] | None = None) -> dict:
+    return {
+        "responses": get_response_cache(settings).stats(),
+        "singleflight": upstream_flights.stats(),
+    }
+
+
 async def _run_stdio() -> None:
     async with stdio_server() as (read, write):
         await app.run(read, write)
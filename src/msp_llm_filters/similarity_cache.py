@@ -0,0 +1,288 @@
+import json
+import os
+import re
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+try:  # numpy — необязательная зависимость: pip install -e .[similarity]
+    import numpy as np
+except ImportError:  # pragma: no cover - без numpy кэш просто выключен
+    np = None
+
+from .nl_converter_batchcards import Coverage, convert_nl_to_batchcards, explain_nl_to_batchcards
+
+# Кэш LLM-разборов по похожести запроса: «ИТ-компании в Москве с выручкой от 2 млн» и
+# «айти компании Москва выручка больше 2 млн» — один разбор. Запрос — вектор TF-IDF символьных
+# n-грамм (хэшированных в DIM измерений), сравнение — косинус с каждым сохранённым запросом.
+# Числа и сущности (регионы, коды, даты, суммы) в найденном разборе пересобираются правилами
+# по новому запросу; если правила не могут подтвердить значение — это промах, а не попадание.
+
+DIM = 2048
+NGRAMS = (2, 3, 4)
+DEFAULT_THRESHOLD = 0.5
+
+_TOKEN_RE = re.compile(r"[a-zа-я]+|\d+")
+_NUMBER_RE = re.compile(r"\d+")
+# Отрицание и исключение меняют смысл запроса, а правила их часто не видят: «не ИТ-компании»
+_NEGATION_WORDS = frozenset(("не", "без", "кроме"))
+_NEGATION_STEMS = ("исключ",)
+
+Rules = Callable[[str], Dict[str, Any]]
+Explain = Callable[[str], Tuple[Dict[str, Any], Coverage]]
+Leaves = Dict[str, Any]
+
+
+def similarity_available() -> bool:
+    return np is not None
+
+
+def query_shape(query: str) -> List[str]:
+    """Слова запроса без регистра; числа заменены на «0» — «от 2 млн» и «от 5 млн» одной формы."""
+    tokens = _TOKEN_RE.findall(query.casefold().replace("ё", "е"))
+    return ["0" if t.isdigit() else t for t in tokens]
+
+
+def _word_keys(query: str) -> Set[str]:
+    # Слово с точностью до окончания: «москве» и «москва», «выручкой» и «выручка» — одно
+    return {w[:4] for w in query_shape(query) if len(w) > 1 and w != "0"}
+
+
+def _negations(query: str) -> List[str]:
+    return [w for w in query_shape(query) if w in _NEGATION_WORDS or w.startswith(_NEGATION_STEMS)]
+
+
+def _ngram_ids(query: str) -> List[int]:
+    ids = []
+    for word in query_shape(query):
+        w = f" {word} "
+        for n in NGRAMS:
+            for i in range(len(w) - n + 1):
+                ids.append(zlib.crc32(w[i:i + n].encode("utf-8")) % DIM)
+    return ids
+
+
+def _leaves(result: Dict[str, Any], prefix: str = "") -> Leaves:
+    """Листья разбора по путям через точку; списки — одно значение («filters.region_codes»)."""
+    out: Leaves = {}
+    for key, value in result.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            out.update(_leaves(value, path))
+        else:
+            out[path] = value
+    return out
+
+
+def _set_path(result: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    node = result
+    for key in parents:
+        node = node.setdefault(key, {})
+    node[last] = value
+
+
+def _strings(value: Any) -> Optional[List[str]]:
+    items = value if isinstance(value, list) else [value]
+    return [str(x) for x in items] if all(isinstance(x, str) for x in items) else None
+
+
+def rebase(
+    cached: Dict[str, Any],
+    cached_rules: Dict[str, Any],
+    new_rules: Dict[str, Any],
+    cached_query: str,
+    new_query: str,
+    unexplained: Sequence[str] = (),
+) -> Optional[Dict[str, Any]]:
+    """Разбор похожего запроса с числами и сущностями нового запроса; None — переиспользовать небезопасно.
+
+    Слоты (всё, кроме флагов true/false) правила должны находить в обоих запросах в одних и тех же
+    полях. Значение из кэша, совпадавшее с правилами, заменяется новым значением правил; значение,
+    которое LLM извлекла иначе, остаётся, только если правила по этому полю ничего нового не нашли.
+    Слот, которого правила не видят, остаётся, если его строки есть в новом запросе дословно, а числа
+    запросов совпадают. Флаг, найденный правилами только в новом запросе, — другой запрос; флаг только
+    в старом допустим, если каждое пропавшее слово заменено новым («айти» вместо «ИТ»), а не просто
+    выброшено («компании» вместо «ИТ-компании»).
+
+    Слова отрицания и исключения («не», «без», «кроме», «исключая») должны совпадать. unexplained —
+    значимые слова нового запроса, которых правила не разобрали: каждое такое слово, которого нет в
+    старом запросе, должно заменять пропавшее старое слово, иначе смысл мог измениться незаметно для правил.
+    """
+    if _negations(cached_query) != _negations(new_query):
+        return None
+    old_words, new_words = _word_keys(cached_query), _word_keys(new_query)
+    if unexplained:
+        novel = _word_keys(" ".join(unexplained)) - old_words
+        if len(novel) > len(old_words - new_words):
+            return None
+    old, new, result_leaves = _leaves(cached_rules), _leaves(new_rules), _leaves(cached)
+    old_slots = {p for p, v in old.items() if not isinstance(v, bool)}
+    new_slots = {p for p, v in new.items() if not isinstance(v, bool)}
+    if old_slots != new_slots:
+        return None
+    if any(isinstance(v, bool) and old.get(p) != v for p, v in new.items()):
+        return None
+    if any(isinstance(v, bool) and p not in new for p, v in old.items()):
+        if len(old_words - new_words) > len(new_words - old_words):
+            return None
+
+    out = json.loads(json.dumps(cached, ensure_ascii=False))
+    text = " ".join(new_query.casefold().replace("ё", "е").split())
+    same_numbers = _NUMBER_RE.findall(cached_query) == _NUMBER_RE.findall(new_query)
+    for path, value in result_leaves.items():
+        if isinstance(value, bool):
+            continue
+        if path in old_slots:
+            if value == old[path]:
+                _set_path(out, path, new[path])
+            elif new[path] != old[path]:
+                return None
+            continue
+        strings = _strings(value)
+        if strings is not None:
+            if not all(" ".join(s.casefold().replace("ё", "е").split()) in text for s in strings):
+                return None
+        elif not same_numbers:
+            return None
+    return out
+
+
+class SimilarityCache:
+    """Кольцевой буфер разборов LLM с матрицей векторов запросов (numpy, float32).
+
+    IDF считается по сохранённым запросам и обновляется при каждой записи, поэтому в матрице
+    хранятся веса TF, а IDF и нормы применяются при поиске: одно умножение матрицы на вектор.
+    explain — разбор правилами с покрытием (explain_nl_to_batchcards): слова нового запроса,
+    которых правила не поняли, проверяются в rebase; без него проверяются только отрицания.
+    """
+
+    def __init__(
+        self, rules: Rules, max_entries: int = 1024, threshold: float = DEFAULT_THRESHOLD, explain: Optional[Explain] = None
+    ) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for SimilarityCache (pip install -e .[similarity])")
+        self.rules = rules
+        self.explain = explain
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._tf = np.zeros((max_entries, DIM), dtype=np.float32)
+        self._df = np.zeros(DIM, dtype=np.float32)
+        self._entries: List[Optional[Tuple[str, str, str, float]]] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self._version = ""
+        self.lookups = 0
+        self.hits = 0
+        self.rejected = 0
+        self.saved_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.llm_calls = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _vector(self, query: str) -> Any:
+        v = np.zeros(DIM, dtype=np.float32)
+        ids = _ngram_ids(query)
+        if ids:
+            np.add.at(v, ids, 1.0)
+            nz = v > 0
+            v[nz] = 1.0 + np.log(v[nz])
+        return v
+
+    def _idf(self) -> Any:
+        return np.log((1.0 + self._size) / (1.0 + self._df)) + 1.0
+
+    def _check_version(self, version: str) -> None:
+        # Новый промпт или модель — старые разборы не годятся
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def nearest(self, query: str) -> Tuple[float, int]:
+        """(косинус, номер записи) ближайшего сохранённого запроса; (0.0, -1), если кэш пуст."""
+        if not self._size:
+            return 0.0, -1
+        q = self._vector(query)
+        idf2 = self._idf() ** 2
+        tf = self._tf[:self._size]
+        dots = tf @ (q * idf2)
+        norms = np.sqrt((tf * tf) @ idf2) * float(np.sqrt((q * q) @ idf2))
+        scores = np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+        i = int(np.argmax(scores))
+        return float(scores[i]), i
+
+    def lookup(self, query: str, version: str = "") -> Optional[Dict[str, Any]]:
+        """Разбор похожего запроса, пересобранный под query, или None."""
+        self._check_version(version)
+        self.lookups += 1
+        score, i = self.nearest(query)
+        if score < self.threshold:
+            return None
+        cached_query, raw, rules_raw, seconds = self._entries[i]
+        if self.explain is not None:
+            new_rules, cov = self.explain(query)
+            unexplained: Sequence[str] = cov.unexplained
+        else:
+            new_rules, unexplained = self.rules(query), ()
+        out = rebase(json.loads(raw), json.loads(rules_raw), new_rules, cached_query, query, unexplained)
+        if out is None:
+            self.rejected += 1
+            return None
+        self.hits += 1
+        self.saved_seconds += seconds
+        return out
+
+    def add(self, query: str, result: Dict[str, Any], seconds: float, version: str = "") -> None:
+        """Сохранить разбор LLM и время, которое он занял."""
+        self._check_version(version)
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+        if self.max_entries <= 0:
+            return
+        slot = self._next
+        if self._entries[slot] is not None:
+            self._df -= self._tf[slot] > 0
+        v = self._vector(query)
+        self._tf[slot] = v
+        self._df += v > 0
+        rules_raw = json.dumps(self.rules(query), ensure_ascii=False)
+        self._entries[slot] = (query, json.dumps(result, ensure_ascii=False), rules_raw, seconds)
+        self._next = (slot + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self) -> None:
+        self._tf[:] = 0
+        self._df[:] = 0
+        self._entries = [None] * self.max_entries
+        self._next = 0
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "rejected": self.rejected,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "llm_calls": self.llm_calls,
+            "llm_seconds": round(self.llm_seconds, 3),
+            "saved_seconds": round(self.saved_seconds, 3),
+        }
+
+
+_cache: Optional[SimilarityCache] = None
+
+
+def get_similarity_cache() -> Optional[SimilarityCache]:
+    """Кэш на процесс для LLM-разбора batchCards; None — нет numpy или NL_SIMILARITY_MAX_ENTRIES=0."""
+    global _cache
+    if _cache is None:
+        max_entries = int(os.getenv("NL_SIMILARITY_MAX_ENTRIES", "1024"))
+        if np is None or max_entries <= 0:
+            return None
+        threshold = float(os.getenv("NL_SIMILARITY_THRESHOLD", str(DEFAULT_THRESHOLD)))
+        _cache = SimilarityCache(convert_nl_to_batchcards, max_entries, threshold, explain_nl_to_batchcards)
+    return _cache
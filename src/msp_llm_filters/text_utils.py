@@ -0,0 +1,18 @@
+from typing import Tuple
+
+# Окончания словоформ, самые длинные первыми: «челябинской/челябинская» -> «челябинск»
+_ENDINGS: Tuple[str, ...] = tuple(sorted((
+    "ого", "его", "ому", "ему", "ыми", "ими", "ами", "ями",
+    "ой", "ей", "ый", "ий", "ым", "им", "ая", "яя", "ое", "ее", "ые", "ие", "ую", "юю", "ых", "их",
+    "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ии", "ия", "ию", "ью",
+    "ы", "и", "а", "я", "е", "у", "ю", "о", "ь", "й",
+), key=len, reverse=True))
+_MIN_STEM = 3
+
+
+def stem(word: str) -> str:
+    """Основа русского слова без окончания словоформы (не короче _MIN_STEM букв)."""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[: -len(ending)].rstrip("ь")
+    return word
@@ -0,0 +1,14 @@
+from typing import Any
+
+
+def int_arg(value: Any, default: int) -> int:
+    """Целый аргумент MCP-инструмента (пустой — default); ValueError, если это не целое число ≥ 1."""
+    if value is None or value == "":
+        return default
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("positive integer required") from None
+    if n < 1:
+        raise ValueError("positive integer required")
+    return n
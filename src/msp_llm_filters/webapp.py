@@ -1,15 +1,18 @@
 from typing import Any, Dict
+import html
 import os
 
 from starlette.applications import Starlette
-from starlette.responses import HTMLResponse, RedirectResponse
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from starlette.requests import Request
 from starlette.routing import Route
 from starlette.staticfiles import StaticFiles
 
-from .nl_converter import convert_nl_to_filters
-from .llm_client import nl_to_filters_via_ollama
-from .server import api_search, Settings, SearchRequest, SearchFilters, normalize_date
+from .nl_converter import convert_nl_to_filters_cached
+from .llm_client import _load_system_prompt, nl_to_filters_via_ollama_cached_async
+from .server import api_get_case_documents, api_search, Settings, SearchRequest, SearchFilters, normalize_date
+from .ollama import ollama_lifespan
+from .webapp_utils import ClientDisconnected, cancel_on_disconnect, llm_stats
 
 
 HTML_INDEX = """
@@ -50,6 +53,56 @@ HTML_INDEX = """
 """
 
 
+# Вторая фаза: документы подгружаются только для раскрытых карточек.
+# Раскрытия, случившиеся подряд, собираются в один POST /documents (не больше DOCS_BATCH дел).
+DOCS_SCRIPT = """
+<script>
+(function () {
+  const DOCS_BATCH = 20;
+  const pending = new Map();
+  let timer = null;
+
+  function esc(s) {
+    return String(s == null ? "" : s).replace(/[&<>"]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+  }
+
+  function render(el, docs, error) {
+    const body = el.querySelector(".docs-body");
+    if (error) { body.textContent = "Ошибка: " + error; return; }
+    if (!docs || !docs.length) { body.textContent = "Документов нет"; return; }
+    body.innerHTML = "<ul>" + docs.map(d =>
+      "<li>" + esc(d.creation_date || "") + " " + esc(d.document_type || "") +
+      (d.instance_name ? " (" + esc(d.instance_name) + ")" : "") +
+      (d.value ? " — " + esc(d.value) : "") + "</li>").join("") + "</ul>";
+  }
+
+  function flush() {
+    timer = null;
+    const batch = new Map([...pending].slice(0, DOCS_BATCH));
+    for (const id of batch.keys()) pending.delete(id);
+    if (pending.size) timer = setTimeout(flush, 0);
+    fetch("/documents", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({case_ids: [...batch.keys()]}),
+    }).then(r => r.json()).then(data => {
+      const errors = Object.fromEntries((data.errors || []).map(e => [e.case_id, e.error]));
+      for (const [id, el] of batch) render(el, (data.documents || {})[id], errors[id]);
+    }).catch(err => { for (const el of batch.values()) render(el, null, err); });
+  }
+
+  document.querySelectorAll("details.docs").forEach(el => el.addEventListener("toggle", () => {
+    if (!el.open || el.dataset.loaded) return;
+    el.dataset.loaded = "1";
+    pending.set(el.dataset.caseId, el);
+    if (pending.size >= DOCS_BATCH) { clearTimeout(timer); flush(); }
+    else if (!timer) timer = setTimeout(flush, 50);
+  }));
+})();
+</script>
+"""
+
+
 def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict[str, Any]) -> str:
     items = res.get("items", [])
     total = res.get("total")
@@ -69,6 +122,7 @@ def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict
             <div><b>Последний документ:</b> {it.get('last_document_date') or '—'}</div>
             <div style=\"grid-column:1/-1\"><b>Участники (кратко):</b> {', '.join(it.get('participants_short') or []) or '—'}</div>
           </div>
+          <details class=\"docs\" data-case-id=\"{html.escape(str(it.get('title') or it.get('id')), quote=True)}\"><summary>Документы</summary><div class=\"docs-body meta\">Загрузка…</div></details>
         </div>
         """)
     items_html = "\n".join(rows) or "<p>Ничего не найдено.</p>"
@@ -102,6 +156,7 @@ def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict
 <p class=\"meta\">Разбор запроса → <code>{parsed}</code></p>
 <p class=\"meta\">Результаты (page={page}, page_size={page_size}, total={total}):</p>
 {items_html}
+{DOCS_SCRIPT}
 </body>
 </html>
 """
@@ -123,13 +178,15 @@ async def search(request: Request) -> HTMLResponse:
     parsed = None
     if use_llm and os.getenv("OLLAMA_BASE_URL"):
         try:
-            parsed = nl_to_filters_via_ollama(q)
+            parsed = await cancel_on_disconnect(request, nl_to_filters_via_ollama_cached_async(q))
+        except ClientDisconnected:
+            return Response(status_code=499)
         except Exception:
             parsed = None
     if not parsed:
-        parsed = convert_nl_to_filters(q)
-    # Всегда длинный ответ: включим документы по умолчанию
-    parsed["filters"]["need_document"] = True
+        parsed = convert_nl_to_filters_cached(q)
+    # Первая фаза — лёгкий список без документов; документы догружаются через /documents
+    parsed["filters"]["need_document"] = False
 
     # page_size ограничим по настройкам
     settings = Settings()
@@ -144,9 +201,25 @@ async def search(request: Request) -> HTMLResponse:
     return HTMLResponse(_render_results_page(settings.api_base_url or "—", q, parsed, res.model_dump()))
 
 
+async def documents(request: Request) -> JSONResponse:
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    case_ids = payload.get("case_ids") if isinstance(payload, dict) else None
+    if not isinstance(case_ids, list) or not case_ids:
+        return JSONResponse({"error": "validation_error", "details": [{"loc": ["case_ids"], "msg": "non-empty list required"}]}, status_code=400)
+
+    settings = Settings()
+    res = await api_get_case_documents(settings, case_ids[: settings.bulk_max_ids])
+    return JSONResponse(res.model_dump())
+
+
 routes = [
     Route("/", index, methods=["GET"]),
     Route("/search", search, methods=["POST"]),
+    Route("/api/llm_stats", llm_stats, methods=["GET"]),
+    Route("/documents", documents, methods=["POST"]),
 ]
 
-app = Starlette(debug=True, routes=routes)
+app = Starlette(debug=True, routes=routes, lifespan=ollama_lifespan(_load_system_prompt))
@@ -1,17 +1,24 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+import asyncio
 import os
 import json
+import time
 
 from starlette.applications import Starlette
-from starlette.responses import HTMLResponse, RedirectResponse
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from starlette.requests import Request
 from starlette.routing import Route
 
 import httpx
 
-from .nl_converter_batchcards import convert_nl_to_batchcards
-from .llm_client_batchcards import nl_to_batchcards_via_ollama
+from .conversion_memo import ConversionMemo
+from .nl_converter_batchcards import Coverage, convert_nl_to_batchcards, convert_nl_to_batchcards_cached
+from .llm_client_batchcards import _load_system_prompt, nl_to_batchcards_via_ollama_cached_async
+from .llm_scheduler import LLMOverloaded
+from .nl_router import route_batchcards, router_enabled
 from .server_batchcards import Settings, BatchCardsRequest, api_search_batchcards
+from .ollama import ollama_lifespan
+from .webapp_utils import ClientDisconnected, cancel_on_disconnect, llm_stats
 
 HTML_INDEX = """
 <!doctype html>
@@ -34,22 +41,121 @@ HTML_INDEX = """
 </head>
 <body>
 <h1>BatchCards — поиск контрагентов по естественному языку</h1>
-<form method="post" action="/search">
+<form method="post" action="/search" id="search-form">
   <div>
-    <input type="text" name="q" placeholder="Например: 200 компаний в регионе 77, выручка от 1 000 до 5 000, только действующие" required>
+    <input type="text" name="q" id="q" autocomplete="off" placeholder="Например: 200 компаний в регионе 77, выручка от 1 000 до 5 000, только действующие" required>
   </div>
   <div>
-    <label><input type="checkbox" name="use_llm"> Использовать локальную LLM (Ollama)</label>
+    <label><input type="checkbox" name="use_llm" id="use-llm"> Использовать локальную LLM (Ollama)</label>
   </div>
   <button type="submit">Искать</button>
 </form>
 <p class="meta">API: <code>{api_url}</code></p>
+<p class="meta">Разбор по мере ввода (rule-based): <span id="live-diff"></span></p>
+<pre id="live-parse" class="meta"></pre>
+<script>
+(function () {
+  const DEBOUNCE_MS = 120;
+  const input = document.getElementById("q");
+  const out = document.getElementById("live-parse");
+  const diffEl = document.getElementById("live-diff");
+  let timer = null, seq = 0, shown = 0, prevQ = "", inflight = null;
+
+  function describe(diff) {
+    const parts = Object.keys(diff.added).map(k => "+" + k)
+      .concat(diff.removed.map(k => "−" + k), Object.keys(diff.changed).map(k => "~" + k));
+    return parts.join(" ");
+  }
+
+  function send() {
+    timer = null;
+    const q = input.value;
+    if (inflight) inflight.abort();
+    inflight = new AbortController();
+    fetch("/api/parse", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({q: q, prev_q: prevQ, seq: ++seq}),
+      signal: inflight.signal,
+    }).then(r => r.json()).then(data => {
+      // Ответы на устаревшие нажатия отбрасываем
+      if (data.seq == null || data.seq < shown) return;
+      shown = data.seq;
+      prevQ = q;
+      out.textContent = JSON.stringify(data.parsed, null, 2);
+      diffEl.textContent = describe(data.diff);
+    }).catch(() => {});
+  }
+
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(send, DEBOUNCE_MS);
+  });
+
+  // С LLM: показываем filters по мере генерации, затем отправляем форму — разбор уже в memo
+  const form = document.getElementById("search-form");
+  const useLlm = document.getElementById("use-llm");
+  form.addEventListener("submit", (e) => {
+    if (!useLlm.checked) return;
+    e.preventDefault();
+    clearTimeout(timer);
+    if (inflight) inflight.abort();
+    diffEl.textContent = "LLM…";
+    fetch("/api/parse_llm", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({q: input.value}),
+    }).then(async r => {
+      const reader = r.body.getReader();
+      const dec = new TextDecoder();
+      let buf = "";
+      for (;;) {
+        const {done, value} = await reader.read();
+        if (done) break;
+        buf += dec.decode(value, {stream: true});
+        let i;
+        while ((i = buf.indexOf("\n")) >= 0) {
+          const ev = JSON.parse(buf.slice(0, i));
+          buf = buf.slice(i + 1);
+          out.textContent = JSON.stringify(ev.parsed || {filters: ev.filters}, null, 2);
+          if (ev.parser) diffEl.textContent = ev.parser;
+        }
+      }
+    }).catch(() => {}).finally(() => form.submit());
+  });
+})();
+</script>
 </body>
 </html>
 """
 
+# Предел длины запроса для разбора по мере ввода
+PARSE_MAX_CHARS = 2000
+# Отдельный memo для префиксов, набираемых по буквам: не вытесняют записи /search
+_live_memo = ConversionMemo(512)
+
+
+def _live_parse(q: str) -> Dict[str, Any]:
+    return _live_memo.convert(q, "batchcards-rules", convert_nl_to_batchcards)
+
 
-def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict[str, Any], parser_used: str, use_llm_checked: bool) -> str:
+def diff_filters(prev: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    """Разница двух разборов по ключам filters: добавленные, удалённые и изменённые."""
+    added = {k: v for k, v in cur.items() if k not in prev}
+    removed = [k for k in prev if k not in cur]
+    changed = {k: {"from": prev[k], "to": v} for k, v in cur.items() if k in prev and prev[k] != v}
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def _render_results_page(
+    api_url: str,
+    q: str,
+    parsed: Dict[str, Any],
+    res: Dict[str, Any],
+    parser_used: str,
+    use_llm_checked: bool,
+    coverage: Optional[Coverage] = None,
+) -> str:
     items = res.get("items", [])
     total = res.get("total")
     page = res.get("page")
@@ -147,6 +253,11 @@ def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict
         </div>
         """)
     items_html = "\n".join(rows) or "<p>Ничего не найдено.</p>"
+    coverage_html = ""
+    if coverage is not None:
+        coverage_html = f" — правила объяснили {coverage.score:.0%} запроса"
+        if coverage.unexplained:
+            coverage_html += f", не разобрано: <code>{' '.join(coverage.unexplained)}</code>"
     return f"""
 <!doctype html>
 <html lang=\"ru\">
@@ -174,7 +285,7 @@ def _render_results_page(api_url: str, q: str, parsed: Dict[str, Any], res: Dict
   <button type=\"submit\">Искать</button>
 </form>
 <p class=\"meta\">API: <code>{api_url}</code></p>
-<p class=\"meta\">Парсер: <b>{parser_used}</b></p>
+<p class=\"meta\">Парсер: <b>{parser_used}</b>{coverage_html}</p>
 <p class=\"meta\">Разбор запроса → <code>{parsed}</code></p>
 <p class=\"meta\">Результаты (page={page}, page_size={page_size}, total={total}):</p>
 {items_html}
@@ -198,16 +309,29 @@ async def search(request: Request) -> HTMLResponse:
 
     parsed = None
     parser_used = "rule-based"
+    coverage = None
+    overloaded = False
     if use_llm and os.getenv("OLLAMA_BASE_URL"):
         try:
-            parsed = nl_to_batchcards_via_ollama(q)
-            if parsed:
-                parser_used = "llm"
+            if router_enabled():
+                # LLM — только если правила объяснили запрос не целиком
+                route = await cancel_on_disconnect(request, route_batchcards(q, nl_to_batchcards_via_ollama_cached_async))
+                parsed, parser_used, coverage = route
+            else:
+                parsed = await cancel_on_disconnect(request, nl_to_batchcards_via_ollama_cached_async(q))
+                if parsed:
+                    parser_used = "llm"
+        except ClientDisconnected:
+            return Response(status_code=499)
+        except LLMOverloaded:
+            # Очередь к Ollama не успеет до срока запроса — сразу правила
+            parsed = None
+            overloaded = True
         except Exception:
             parsed = None
     if not parsed:
-        parsed = convert_nl_to_batchcards(q)
-        parser_used = "rule-based"
+        parsed = convert_nl_to_batchcards_cached(q)
+        parser_used = "rule-based (LLM перегружена)" if overloaded else "rule-based"
 
     settings = Settings()
     page_size = min(int(parsed.get("page_size", settings.default_page_size)), settings.max_page_size)
@@ -219,7 +343,7 @@ async def search(request: Request) -> HTMLResponse:
     )
     try:
         res = await api_search_batchcards(settings, req)
-        return HTMLResponse(_render_results_page(settings.api_base_url or "—", q, parsed, res.model_dump(), parser_used, use_llm))
+        return HTMLResponse(_render_results_page(settings.api_base_url or "—", q, parsed, res.model_dump(), parser_used, use_llm, coverage))
     except httpx.HTTPStatusError as e:
         status = e.response.status_code if e.response is not None else 'HTTPError'
         text = None
@@ -256,9 +380,92 @@ async def search(request: Request) -> HTMLResponse:
         return HTMLResponse(f"<pre>{str(e)}</pre>", status_code=500)
 
 
+async def parse(request: Request) -> JSONResponse:
+    """Разбор по мере ввода: только rule-based (без LLM и без запроса к API) + diff с prev_q.
+
+    Без состояния на сервере: клиент присылает предыдущий текст, его разбор почти всегда
+    уже лежит в memo с прошлого нажатия, так что на нажатие — доли миллисекунды. seq возвращается
+    как есть: клиент по нему отбрасывает ответы на устаревшие нажатия (debounce + abort).
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict) or not isinstance(payload.get("q", ""), str):
+        return JSONResponse({"error": "validation_error", "details": [{"loc": ["q"], "msg": "string required"}]}, status_code=400)
+    q = payload.get("q", "")
+    prev_q = payload.get("prev_q") or ""
+    if len(q) > PARSE_MAX_CHARS or not isinstance(prev_q, str) or len(prev_q) > PARSE_MAX_CHARS:
+        return JSONResponse({"error": "validation_error", "details": [{"loc": ["q"], "msg": f"at most {PARSE_MAX_CHARS} chars"}]}, status_code=400)
+
+    t0 = time.perf_counter()
+    parsed = _live_parse(q)
+    diff = diff_filters(_live_parse(prev_q)["filters"], parsed["filters"])
+    return JSONResponse({
+        "seq": payload.get("seq"),
+        "parsed": parsed,
+        "diff": diff,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 3),
+    })
+
+
+async def parse_llm(request: Request) -> Response:
+    """Разбор через LLM потоком NDJSON: {"filters": …} по мере генерации, последней строкой {"parsed", "parser"}.
+
+    Запрос, который правила объяснили целиком, с роутером сразу получает ответ правил. Закрытая
+    вкладка обрывает поток, а с ним и генерацию в Ollama. Ошибка LLM — ответ правил и поле error.
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    q = payload.get("q") if isinstance(payload, dict) else None
+    if not isinstance(q, str) or not q.strip() or len(q) > PARSE_MAX_CHARS:
+        return JSONResponse({"error": "validation_error", "details": [{"loc": ["q"], "msg": f"non-empty string, at most {PARSE_MAX_CHARS} chars"}]}, status_code=400)
+    events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    def on_filters(filters: Dict[str, Any]) -> None:
+        events.put_nowait({"filters": filters})
+
+    async def llm(query: str) -> Dict[str, Any]:
+        return await nl_to_batchcards_via_ollama_cached_async(query, on_filters)
+
+    async def run() -> None:
+        final: Dict[str, Any]
+        try:
+            if not os.getenv("OLLAMA_BASE_URL"):
+                final = {"parsed": convert_nl_to_batchcards_cached(q), "parser": "rule-based"}
+            elif router_enabled():
+                route = await route_batchcards(q, llm)
+                final = {"parsed": route.result, "parser": route.parser, "coverage": route.coverage.score}
+            else:
+                final = {"parsed": await llm(q), "parser": "llm"}
+        except Exception as e:
+            final = {"parsed": convert_nl_to_batchcards_cached(q), "parser": "rule-based", "error": f"{type(e).__name__}: {e}"}
+        events.put_nowait(final)
+        events.put_nowait(None)
+
+    async def lines():
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 routes = [
     Route("/", index, methods=["GET"]),
     Route("/search", search, methods=["POST"]),
+    Route("/api/llm_stats", llm_stats, methods=["GET"]),
+    Route("/api/parse", parse, methods=["POST"]),
+    Route("/api/parse_llm", parse_llm, methods=["POST"]),
 ]
 
-app = Starlette(debug=True, routes=routes)
\ No newline at end of file
+app = Starlette(debug=True, routes=routes, lifespan=ollama_lifespan(_load_system_prompt))
\ No newline at end of file
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .llm_scheduler import get_llm_scheduler
+
+T = TypeVar("T")
+
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+class ClientDisconnected(Exception):
+    """Клиент закрыл соединение, пока выполнялся долгий вызов (LLM)."""
+
+
+async def cancel_on_disconnect(request: Request, aw: Awaitable[T], poll_interval: float = DISCONNECT_POLL_SECONDS) -> T:
+    """Выполняет aw, периодически проверяя соединение; при разрыве отменяет задачу.
+
+    Так брошенная вкладка не держит слот Ollama до конца генерации.
+    """
+    task = asyncio.ensure_future(aw)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def llm_stats(request: Request) -> JSONResponse:
+    """GET /api/llm_stats: очередь к Ollama — слоты, глубина, отказы, гистограммы ожидания и глубины."""
+    return JSONResponse(get_llm_scheduler().stats())
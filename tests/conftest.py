@@ -0,0 +1,10 @@
+import pytest
+
+from msp_llm_filters.court_index import set_court_index
+
+
+@pytest.fixture(autouse=True)
+def no_dictionary_snapshots(monkeypatch):
+    # Разбор не должен зависеть от снимков справочников на машине разработчика
+    monkeypatch.delenv("DICTIONARY_CACHE_DIR", raising=False)
+    set_court_index(None)
@@ -0,0 +1,47 @@
+import io
+import json
+
+from msp_llm_filters import batch_convert
+from msp_llm_filters.batch_convert import convert_batch, main_entry, read_jsonl_queries
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+
+QUERIES = [
+    "20 компаний в москве",
+    "ИП с выручкой от 10 млн",
+    "компании с лизингом",
+    "действующие ООО в 77 регионе",
+    "вакансии программиста",
+]
+
+
+def test_pool_preserves_order_and_passes_fields():
+    records = [{"id": i, "query": q} for i, q in enumerate(QUERIES * 7)]
+    out = convert_batch(records, workers=2, chunksize=3)
+    assert [r["id"] for r in out] == list(range(len(records)))
+    assert all(r["result"] == convert_nl_to_batchcards(r["query"]) for r in out)
+    assert convert_batch(QUERIES, workers=1) == [{"query": q, "result": convert_nl_to_batchcards(q)} for q in QUERIES]
+
+
+def test_failed_query_reported_not_raised(monkeypatch):
+    def convert(q):
+        if q == "плохой":
+            raise ValueError("boom")
+        return convert_nl_to_batchcards(q)
+
+    monkeypatch.setattr(batch_convert, "convert_nl_to_batchcards", convert)
+    out = convert_batch(["плохой", 42], workers=1)
+    assert out[0] == {"query": "плохой", "error": "ValueError: boom"}
+    assert out[1]["query"] == "42" and "result" in out[1]
+
+
+def test_cli_jsonl_to_ndjson(tmp_path, capsys):
+    src = tmp_path / "queries.jsonl"
+    src.write_text('{"id": "a", "query": "20 компаний в москве"}\n"компании с лизингом"\n\nпросто текст\n', encoding="utf-8")
+    dst = tmp_path / "out.ndjson"
+    main_entry([str(src), "-o", str(dst), "--workers", "2", "--chunksize", "1"])
+    lines = [json.loads(line) for line in dst.read_text(encoding="utf-8").splitlines()]
+    assert [r["query"] for r in lines] == ["20 компаний в москве", "компании с лизингом", "просто текст"]
+    assert lines[0]["id"] == "a"
+    assert lines[0]["result"]["page_size"] == 20
+    assert "3 queries converted" in capsys.readouterr().err
+    assert list(read_jsonl_queries(io.StringIO('"x"\n'))) == ["x"]
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from msp_llm_filters import server
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.singleflight import SingleFlight
+
+
+def _upstream(state):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        case_num = json.loads(request.content)["case_num"]
+        state["calls"].append(case_num)
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            state["active"] -= 1
+        if case_num.startswith("BAD"):
+            return httpx.Response(500, json={"error": "boom"})
+        return httpx.Response(200, json={"data": [{"case_id": case_num, "first_number": case_num, "documents": [{"id": 1}]}]})
+
+    return handler
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(server, "_response_cache", None)
+    monkeypatch.setattr(server, "upstream_flights", SingleFlight())
+    return {"calls": [], "active": 0, "max_active": 0}
+
+
+@pytest.mark.asyncio
+async def test_bulk_dedup_partial_errors_and_concurrency(upstream):
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_upstream(upstream))))
+    settings = server.Settings(api_base_url="http://upstream.test/batch-cases")
+    ids = [f"A40-{i}/2024" for i in range(30)] + ["A40-1/2024", " A40-2/2024 ", "BAD-1", ""]
+    try:
+        res = await server.api_get_cases(settings, ids, concurrency=4)
+        # Повторный пакет берётся из кэша
+        again = await server.api_get_cases(settings, ids[:10], concurrency=4)
+    finally:
+        await close_http_clients()
+
+    assert [c.id for c in res.items] == [f"A40-{i}/2024" for i in range(30)]
+    assert [e.model_dump() for e in res.errors] == [{"case_id": "BAD-1", "error": "HTTP 500"}]
+    assert len(upstream["calls"]) == 31
+    assert upstream["max_active"] <= 4
+    assert len(again.items) == 10 and len(upstream["calls"]) == 31
+
+
+@pytest.mark.asyncio
+async def test_tool_validates_payload(monkeypatch):
+    monkeypatch.setattr(server, "settings", server.Settings(api_base_url="", bulk_max_ids=3))
+    assert (await server.get_cases_by_ids({"case_ids": []}))["error"] == "validation_error"
+    assert (await server.get_cases_by_ids({"case_ids": ["1", "2", "3", "4"]}))["error"] == "validation_error"
+    for bad in ("много", "2.5", [4], 0):
+        res = await server.get_cases_by_ids({"case_ids": ["1"], "concurrency": bad})
+        assert res["error"] == "validation_error" and res["details"][0]["loc"] == ["concurrency"]
+    res = await server.get_cases_by_ids({"case_ids": ["1", "1", "2"]})
+    assert [c["id"] for c in res["items"]] == ["1", "2"] and res["errors"] == []
@@ -0,0 +1,137 @@
+import json
+import tracemalloc
+
+import httpx
+import pytest
+
+from msp_llm_filters import server_batchcards
+from msp_llm_filters.classifiers import (
+    DATA_PATH,
+    SOURCES,
+    build_classifier_file,
+    expand_codes,
+    get_classifier,
+    known_codes,
+    normalize_code,
+    open_classifiers,
+)
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+from msp_llm_filters.server_batchcards import BatchCardsRequest, Settings, api_search_batchcards
+
+TSV = """# тест
+#!complete
+62\tРазработка компьютерного программного обеспечения, консультационные услуги\t*
+62.0\tРазработка компьютерного программного обеспечения, консультационные услуги
+62.01\tРазработка компьютерного программного обеспечения
+62.02\tДеятельность консультативная в области компьютерных технологий
+62.02.1\tДеятельность по планированию компьютерных систем
+62.09\tДеятельность прочая
+47\tТорговля розничная
+47.91\tТорговля розничная по информационно-коммуникационной сети Интернет
+"""
+
+
+@pytest.fixture
+def okved(tmp_path):
+    src = tmp_path / "okved2.tsv"
+    src.write_text(TSV, encoding="utf-8")
+    path = str(tmp_path / "classifiers.bin")
+    build_classifier_file({"okved2": str(src)}, path)
+    return open_classifiers(path)["okved2"]
+
+
+def test_lookup_and_titles(okved):
+    assert len(okved) == 8
+    assert "62.01" in okved and "62,01" in okved and "62.05" not in okved
+    assert okved.title("47.91").startswith("Торговля розничная по")
+    assert okved.title("10") is None
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        ("62.01", True),
+        ("62.05", False),  # поддерево 62 полное
+        ("62.02.7", False),
+        ("47.11", None),  # поддерево 47 неполное — неизвестно
+        ("44", False),  # верхний уровень полный
+        ("6201", False),
+        ("", False),
+    ],
+)
+def test_check(okved, code, expected):
+    assert okved.check(code) is expected
+
+
+def test_expand_to_leaves_only_for_complete_subtrees(okved):
+    assert okved.descendants("62.0") == ["62.01", "62.02", "62.02.1", "62.09"]
+    assert okved.expand("62") == ["62.01", "62.02.1", "62.09"]
+    assert okved.expand("62.01") == ["62.01"]
+    assert okved.expand("47") == ["47"]
+
+
+def test_search_by_description(okved):
+    assert okved.search("разработка ПО", limit=1) == ["62.01"]
+    assert okved.search("розничная торговля через интернет", limit=1) == ["47.91"]
+    assert okved.search("сварочные работы") == []
+
+
+def test_known_codes():
+    okved = get_classifier("okved2")
+    assert known_codes(okved, ["62.01", "62,01", "44", "47.11", "62.99"]) == ["62.01", "47.11"]
+    assert known_codes(None, ["44", "44"]) == ["44"]
+    assert normalize_code(" 62.01. ") == "62.01" and normalize_code("62-01") is None
+
+
+def test_bundled_index_matches_sources(tmp_path):
+    # Файл индекса в пакете собран из текущих TSV: python scripts/build_classifier_index.py
+    path = str(tmp_path / "classifiers.bin")
+    build_classifier_file(SOURCES, path)
+    with open(path, "rb") as a, open(DATA_PATH, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_open_is_lazy_and_small():
+    tracemalloc.start()
+    try:
+        sections = open_classifiers()
+        assert sections["okved2"].check("62.01") is True
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Коды и наименования остаются в отображённом файле, в куче — только объекты разделов
+    assert peak < 64 * 1024
+
+
+def test_converter_validates_and_maps_descriptions():
+    f = convert_nl_to_batchcards("нужны сварщики, контракты 44-фз, оквэд 62.01, выручка больше 10 млн")["filters"]
+    assert f["okveds"] == ["62.01"]
+    assert convert_nl_to_batchcards("оквэд разработка ПО")["filters"]["okveds"] == ["62.01"]
+    assert convert_nl_to_batchcards("оквэд 62.77, 47")["filters"]["okveds"] == ["47"]
+
+
+def test_expand_codes_in_request_body():
+    body = {"okveds": ["62.02", "47"], "contracts": {"okpd2_codes": ["41.20.40.000"]}}
+    out = expand_codes(body)
+    assert out["okveds"] == ["62.02.1", "62.02.2", "62.02.3", "62.02.4", "62.02.9", "47"]
+    assert out["contracts"]["okpd2_codes"] == ["41.20.40.000"]
+    assert body["okveds"] == ["62.02", "47"]  # исходное тело не меняется
+
+
+@pytest.mark.asyncio
+async def test_api_sends_leaf_codes_when_enabled(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    sent = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={"data": [], "available_count": 0})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        settings = Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters", classifier_leaf_codes=True)
+        await api_search_batchcards(settings, BatchCardsRequest(filters={"okveds": ["62.03.1"]}))
+        assert sent[0]["okveds"] == ["62.03.11", "62.03.12", "62.03.13", "62.03.19"]
+    finally:
+        await close_http_clients()
@@ -0,0 +1,93 @@
+import json
+
+import httpx
+import pytest
+
+from msp_llm_filters import conversion_memo, similarity_cache
+from msp_llm_filters.conversion_memo import ConversionMemo, memo_key, normalize_query
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.llm_client_batchcards import nl_to_batchcards_via_ollama_cached_async
+from msp_llm_filters.nl_converter import convert_nl_to_filters, convert_nl_to_filters_cached
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards, convert_nl_to_batchcards_cached
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(conversion_memo, "_memo", None)
+    monkeypatch.setattr(similarity_cache, "_cache", None)
+
+
+def test_normalize_query_folds_trivial_differences():
+    assert normalize_query("  Компании  в г. Москва ,, с выручкой!!  ") == "Компании в г. Москва, с выручкой"
+    assert normalize_query("ИП Ёлкин?") == "ИП Елкин"
+    assert normalize_query("дела от 2024-03-05.") == "дела от 2024-03-05."
+    assert normalize_query("компании в г.") == "компании в г."
+    assert memo_key("Дела  ОТВЕТЧИКА", "courts-rules", fold_case=True) == memo_key("дела ответчика", "courts-rules", fold_case=True)
+    assert memo_key("в городе Омск", "batchcards-rules") != memo_key("в городе омск", "batchcards-rules")
+    assert memo_key("дела", "courts-rules", "v1") != memo_key("дела", "courts-rules", "v2")
+
+
+def test_lru_bound_and_copies():
+    memo = ConversionMemo(max_entries=2)
+    calls = []
+
+    def fn(q):
+        calls.append(q)
+        return {"filters": {"q": q}}
+
+    first = memo.convert("Один", "p", fn, fold_case=True)
+    first["filters"]["q"] = "испорчено"
+    assert memo.convert("один!", "p", fn, fold_case=True) == {"filters": {"q": "Один"}}
+    memo.convert("два", "p", fn)
+    memo.convert("три", "p", fn)
+    memo.convert("один", "p", fn, fold_case=True)
+    assert calls == ["Один", "два", "три", "один"]
+    assert memo.stats()["evictions"] == 2
+    assert len(memo) == 2
+
+    off = ConversionMemo(max_entries=0)
+    off.convert("один", "p", fn)
+    assert len(off) == 0
+
+
+def test_converter_gets_original_text():
+    # Хвостовой захват видит запрос как написан — как и без memo
+    q = "росаккредитация:  испытательная лаборатория!"
+    assert convert_nl_to_batchcards_cached(q) == convert_nl_to_batchcards(q)
+    assert convert_nl_to_batchcards_cached(q)["filters"]["rosaccreditations"]["description"] == "испытательная лаборатория!"
+
+
+def test_rule_based_cached_matches_direct_and_is_mutable():
+    q = "Дела, где ответчик ИНН 7707083893, документы включи"
+    res = convert_nl_to_filters_cached(q)
+    assert res == convert_nl_to_filters(q)
+    res["filters"]["need_document"] = False
+    assert convert_nl_to_filters_cached("дела,  где ОТВЕТЧИК инн 7707083893, документы включи")["filters"]["need_document"] is True
+    assert convert_nl_to_batchcards_cached("20 компаний в Москве") == convert_nl_to_batchcards_cached("20 компаний в Москве.")
+    assert conversion_memo.get_conversion_memo().stats()["hits"] == 2
+    # Город берётся как написан: другой регистр — другая запись, а не чужой результат
+    assert convert_nl_to_batchcards_cached("в городе омск")["filters"]["address_request"]["search_terms"] == ["омск"]
+    assert convert_nl_to_batchcards_cached("в городе Омск")["filters"]["address_request"]["search_terms"] == ["Омск"]
+
+
+@pytest.mark.asyncio
+async def test_llm_memo_keyed_by_prompt_and_model(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        content = json.dumps({"filters": {"region_codes": ["77"]}, "page": 1, "page_size": 10})
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)), name="ollama")
+    try:
+        await nl_to_batchcards_via_ollama_cached_async("Компании в Москве")
+        await nl_to_batchcards_via_ollama_cached_async("компании  в москве?")
+        monkeypatch.setenv("OLLAMA_MODEL", "other-model")
+        await nl_to_batchcards_via_ollama_cached_async("компании в москве")
+    finally:
+        await close_http_clients()
+    assert len(calls) == 2
+    assert calls[0]["messages"][1]["content"] == "Компании в Москве"
+    assert calls[1]["model"] == "other-model"
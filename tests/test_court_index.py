@@ -0,0 +1,144 @@
+import json
+import os
+
+import pytest
+
+from msp_llm_filters import court_index, server
+from msp_llm_filters.court_index import CourtIndex, get_court_index, set_court_index
+from msp_llm_filters.dictionary_cache import DictionaryCache, save_snapshot
+from msp_llm_filters.nl_converter import convert_nl_to_filters, convert_nl_to_filters_cached
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "data", "courts_snapshot.json")
+
+with open(SNAPSHOT_PATH, encoding="utf-8") as f:
+    COURTS = json.load(f)["items"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return CourtIndex(COURTS)
+
+
+@pytest.fixture
+def injected(index):
+    set_court_index(index)
+    yield index
+    set_court_index(None)
+
+
+@pytest.mark.parametrize(
+    "text, name",
+    [
+        ("в Арбитражном суде Челябинской области", "Арбитражный суд Челябинской области"),
+        ("АС Челяб. обл.", "Арбитражный суд Челябинской области"),
+        ("арбитражный суд челябенской области", "Арбитражный суд Челябинской области"),  # опечатка
+        ("АС Москвы", "Арбитражный суд города Москвы"),
+        ("АС Московской обл.", "Арбитражный суд Московской области"),
+        ("ФАС Московского округа", "Арбитражный суд Московского округа"),
+        ("АС СПб", "Арбитражный суд города Санкт-Петербурга и Ленинградской области"),
+        ("9 ААС", "Девятый арбитражный апелляционный суд"),
+        ("девятого арбитражного апелляционного суда", "Девятый арбитражный апелляционный суд"),
+        ("21 ААС", "Двадцать первый арбитражный апелляционный суд"),
+        ("19 арбитражный апелляционный суд", "Девятнадцатый арбитражный апелляционный суд"),
+        ("СИП", "Суд по интеллектуальным правам"),
+        ("АС ХМАО", "Арбитражный суд Ханты-Мансийского автономного округа — Югры"),
+    ],
+)
+def test_resolve(index, text, name):
+    assert index.resolve(text).name == name
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "арбитражный суд",  # только общие слова
+        "арбитражный апелляционный суд",  # 21 равный кандидат
+        "АС Москвы и Московской области",  # два суда
+        "в суде",
+        "поставка оборудования",
+    ],
+)
+def test_unresolved(index, text):
+    assert index.resolve(text) is None
+
+
+def test_search_ranks_candidates(index):
+    matches = index.search("арбитражный апелляционный суд", limit=3)
+    assert len(matches) == 3 and matches[0].score == matches[1].score
+    assert all("апелляционный" in m.name for m in matches)
+    assert index.search("АС Челябинской области", limit=1)[0].id == next(
+        c["id"] for c in COURTS if c["name"] == "Арбитражный суд Челябинской области"
+    )
+
+
+def test_long_query_uses_words_around_court(index):
+    # «пяти дел» не тянет к «Пятому арбитражному апелляционному суду»
+    q = "покажи цены иска пяти дел от 20 марта 2024 года зарегистрированных в арбитражном суде челябинской области"
+    assert index.resolve(q).name == "Арбитражный суд Челябинской области"
+
+
+def test_converter_uses_index(injected):
+    assert convert_nl_to_filters("дела в АС Свердловской обл")["filters"]["court"] == "Арбитражный суд Свердловской области"
+    assert convert_nl_to_filters("дела 9 ААС")["filters"]["court"] == "Девятый арбитражный апелляционный суд"
+    assert "court" not in convert_nl_to_filters("дела, где ответчик ИНН 7707083893")["filters"]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "Дела, где ответчик ООО Ромашка из Челябинской области, включи документы",
+        "дела ответчик Татарстан нефть класс",
+    ],
+)
+def test_converter_needs_court_word(injected, query):
+    # «ас» внутри «области»/«класс» и регион без слова «суд» — не упоминание суда
+    assert "court" not in convert_nl_to_filters(query)["filters"]
+    assert injected.resolve(query, anchored=True) is None
+
+
+def test_converter_falls_back_without_index():
+    # Снимок читается только из явно заданного DICTIONARY_CACHE_DIR (в тестах он сброшен, см. conftest)
+    assert get_court_index() is None
+    assert convert_nl_to_filters("в АС Челябинской области")["filters"]["court"] == "Арбитражный суд Челябинской области"
+
+
+def test_index_loads_from_snapshot_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.setenv("DICTIONARY_CACHE_DIR", str(tmp_path))
+    assert get_court_index() is None
+
+    save_snapshot(str(tmp_path), "courts", COURTS[:10], 1.0)
+    first = get_court_index()
+    assert len(first) == 10 and get_court_index() is first
+
+    save_snapshot(str(tmp_path), "courts", COURTS, 2.0)
+    path = os.path.join(str(tmp_path), "dictionary_courts.json")
+    os.utime(path, (os.stat(path).st_atime, os.stat(path).st_mtime + 10))
+    second = get_court_index()
+    assert second is not first and len(second) == len(COURTS)
+    # Версия справочника входит в ключ memo: новый снимок — новый разбор
+    assert convert_nl_to_filters_cached("в АС Челябинской области")["filters"]["court"] == "Арбитражный суд Челябинской области"
+    assert second.version != first.version
+
+
+@pytest.mark.asyncio
+async def test_resolve_court_tool(tmp_path, monkeypatch):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return COURTS
+
+    monkeypatch.setattr(server, "courts_cache", DictionaryCache("courts", fetch, ttl_seconds=60, cache_dir=str(tmp_path)))
+    res = await server.resolve_court({"text": "ФАС Уральского округа", "limit": 2})
+    assert res["court"]["name"] == "Арбитражный суд Уральского округа"
+    assert len(res["candidates"]) == 2
+    again = await server.resolve_court({"text": "арбитражный суд"})
+    assert again["court"] is None and again["candidates"]
+    assert len(calls) == 1
+    # Индекс строится один раз на загруженный справочник
+    assert court_index.court_index_for(server.courts_cache.index) is court_index.court_index_for(server.courts_cache.index)
+    assert (await server.resolve_court({"text": " "}))["error"] == "validation_error"
+    for bad in ("пять", {"n": 5}, -1):
+        res = await server.resolve_court({"text": "АС Москвы", "limit": bad})
+        assert res["error"] == "validation_error" and res["details"][0]["loc"] == ["limit"]
+    assert len((await server.resolve_court({"text": "арбитражный суд", "limit": "1000"}))["candidates"]) == 50
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from msp_llm_filters.dictionary_cache import DictionaryCache, normalize_name, snapshot_path
+
+COURTS = [
+    {"id": 1, "name": "Арбитражный суд города Москвы"},
+    {"id": 2, "name": "Арбитражный суд Челябинской области"},
+]
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _fetcher(calls, items=COURTS):
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return list(items)
+
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_hit_after_first_load_and_indexes(tmp_path):
+    calls = []
+    cache = DictionaryCache("courts", _fetcher(calls), ttl_seconds=60, cache_dir=str(tmp_path))
+
+    assert await cache.get() == COURTS
+    assert await cache.get() == COURTS
+    assert len(calls) == 1
+    assert cache.metrics.misses == 1 and cache.metrics.hits == 1
+    assert cache.metrics.as_dict()["hit_rate"] == 0.5
+    assert cache.metrics.last_refresh_seconds is not None
+
+    index = cache.index
+    assert index.get_by_id("2")["name"] == "Арбитражный суд Челябинской области"
+    assert index.get_by_name("арбитражный  суд челябинской области.")["id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate(tmp_path):
+    calls = []
+    clock = _Clock()
+    cache = DictionaryCache("courts", _fetcher(calls), ttl_seconds=60, cache_dir=str(tmp_path), clock=clock)
+    await cache.get()
+
+    clock.now += 120
+    # Устаревшие данные отдаются сразу, обновление идёт в фоне
+    assert await cache.get() == COURTS
+    assert cache.metrics.stale_hits == 1
+    await asyncio.sleep(0.01)
+    assert len(calls) == 2
+    assert cache.index.fetched_at == clock.now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(tmp_path):
+    calls = []
+    cache = DictionaryCache("courts", _fetcher(calls), ttl_seconds=60, cache_dir=str(tmp_path))
+    results = await asyncio.gather(*(cache.get() for _ in range(20)))
+    assert all(r == COURTS for r in results)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_cold_start_from_disk_snapshot(tmp_path):
+    calls = []
+    clock = _Clock()
+    warm = DictionaryCache("courts", _fetcher(calls), ttl_seconds=60, cache_dir=str(tmp_path), clock=clock)
+    await warm.get()
+    with open(snapshot_path(str(tmp_path), "courts"), encoding="utf-8") as f:
+        assert json.load(f)["items"] == COURTS
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    cold = DictionaryCache("courts", broken, ttl_seconds=60, cache_dir=str(tmp_path), clock=clock)
+    assert await cold.get() == COURTS
+    assert cold.metrics.snapshot_loads == 1 and cold.metrics.hits == 1
+
+
+def test_normalize_name():
+    assert normalize_name("  Арбитражный суд г. Москвы  ") == "арбитражный суд г москвы"
+    assert normalize_name("Прекращён") == "прекращен"
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from msp_llm_filters import server_batchcards
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.server_batchcards import Settings, iter_all_batchcards
+
+TOTAL = 237
+
+
+def _paged_upstream(state):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        limit = int(request.url.params["limit"])
+        offset = int(request.url.params["offset"])
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        state["offsets"].append(offset)
+        try:
+            # Страницы отвечают в случайном порядке
+            await asyncio.sleep(random.uniform(0, 0.02))
+        finally:
+            state["active"] -= 1
+        items = [{"n": i} for i in range(offset, min(offset + limit, TOTAL))]
+        return httpx.Response(200, json={"data": items, "available_count": TOTAL, "filters": json.loads(request.content)})
+
+    return handler
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    return {"active": 0, "max_active": 0, "offsets": []}
+
+
+def _install(state):
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_paged_upstream(state))))
+
+
+@pytest.mark.asyncio
+async def test_all_pages_in_order_with_bounded_concurrency(upstream):
+    settings = Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+    _install(upstream)
+    try:
+        got = [it["n"] async for it in iter_all_batchcards(settings, {"region_codes": ["77"]}, page_size=20, concurrency=3)]
+    finally:
+        await close_http_clients()
+    assert got == list(range(TOTAL))
+    assert upstream["max_active"] <= 3
+    assert sorted(upstream["offsets"]) == list(range(0, TOTAL, 20))
+
+
+@pytest.mark.asyncio
+async def test_max_items_and_early_stop(upstream):
+    settings = Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+    _install(upstream)
+    try:
+        got = [it["n"] async for it in iter_all_batchcards(settings, {}, page_size=10, concurrency=2, max_items=35)]
+        assert got == list(range(35))
+        # Запрошены только страницы, нужные для 35 записей
+        assert sorted(upstream["offsets"]) == [0, 10, 20, 30]
+
+        agen = iter_all_batchcards(settings, {"x": 1}, page_size=10, concurrency=4)
+        assert [(await agen.__anext__())["n"] for _ in range(11)] == list(range(11))
+        await agen.aclose()
+        # Запросы остальных страниц отменены и завершены к возврату из aclose
+        assert upstream["active"] == 0
+    finally:
+        await close_http_clients()
+
+
+@pytest.mark.asyncio
+async def test_mcp_tool_reports_truncation(upstream, monkeypatch):
+    monkeypatch.setattr(server_batchcards, "settings", Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters"))
+    _install(upstream)
+    try:
+        res = await server_batchcards.search_companies_all({"filters": {}, "page_size": 50, "max_items": 120})
+    finally:
+        await close_http_clients()
+    assert res["fetched"] == 120 and res["truncated"] is True
+    assert [it["n"] for it in res["items"]] == list(range(120))
+
+
+@pytest.mark.asyncio
+async def test_mcp_tool_caps_concurrency(upstream, monkeypatch):
+    monkeypatch.setattr(
+        server_batchcards, "settings", Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters", export_concurrency=2)
+    )
+    _install(upstream)
+    try:
+        res = await server_batchcards.search_companies_all({"filters": {}, "page_size": 10, "concurrency": 1000})
+    finally:
+        await close_http_clients()
+    assert res["fetched"] == TOTAL and upstream["max_active"] <= 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("arg, value", [("max_items", -5), ("max_items", 0), ("concurrency", 0), ("concurrency", "много")])
+async def test_mcp_tool_rejects_bad_limits(upstream, monkeypatch, arg, value):
+    monkeypatch.setattr(server_batchcards, "settings", Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters"))
+    res = await server_batchcards.search_companies_all({"filters": {}, arg: value})
+    assert res["error"] == "validation_error" and res["details"][0]["loc"] == [arg]
+    assert upstream["offsets"] == []
@@ -0,0 +1,48 @@
+import httpx
+import pytest
+
+from msp_llm_filters import http_client
+from msp_llm_filters.http_client import close_http_clients, get_http_client, http_client_lifespan, set_http_client
+from msp_llm_filters.server_batchcards import BatchCardsRequest, Settings, api_search_batchcards
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_and_closed():
+    c1 = get_http_client()
+    c2 = get_http_client()
+    assert c1 is c2
+    assert get_http_client("ollama") is not c1
+
+    await close_http_clients()
+    assert c1.is_closed
+    assert get_http_client() is not c1
+    await close_http_clients()
+
+
+@pytest.mark.asyncio
+async def test_lifespan_closes_pool():
+    async with http_client_lifespan():
+        client = get_http_client()
+        assert not client.is_closed
+    assert client.is_closed
+    assert http_client._clients == {}
+
+
+@pytest.mark.asyncio
+async def test_batchcards_uses_shared_client():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={"data": [{"inn": "1"}], "total": 1})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        settings = Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+        for page in (1, 2, 3):
+            res = await api_search_batchcards(settings, BatchCardsRequest(filters={"region_codes": ["77"]}, page=page))
+            assert res.items == [{"inn": "1"}]
+    finally:
+        await close_http_clients()
+    assert len(seen) == 3
+    assert seen[0].url.params["limit"] == "20"
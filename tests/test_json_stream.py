@@ -0,0 +1,111 @@
+import json
+import random
+
+import httpx
+import pytest
+
+from msp_llm_filters import server, server_batchcards
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.json_stream import IncompleteJSON, ItemStreamDecoder, iter_json_items
+from msp_llm_filters.singleflight import SingleFlight
+
+PAYLOAD = {
+    "limit": 3,
+    "data": [
+        {"case_id": "a", "text": 'кавычки " и \\ слэш, скобки ]}{[', "nested": [[1, 2], {"x": []}]},
+        {"case_id": "б", "sum": 1.5e3, "flag": True, "none": None},
+        "строка",
+        42,
+    ],
+    "offset": 0,
+    "meta": {"ignored": [1, 2, 3]},
+    "total": 120,
+}
+
+
+def _chunks(raw: bytes, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_items_match_full_parse_for_any_chunking(size):
+    raw = json.dumps(PAYLOAD, ensure_ascii=False, indent=1).encode("utf-8")
+    decoder = ItemStreamDecoder()
+    items = list(iter_json_items(_chunks(raw, size), decoder))
+    assert items == PAYLOAD["data"]
+    assert decoder.array_key == "data"
+    assert decoder.meta == {"limit": 3, "offset": 0, "total": 120}
+
+
+def test_random_chunking_with_multibyte_boundaries():
+    rng = random.Random(7)
+    payload = {"items": [{"name": "ООО «Ёлка» " * rng.randint(1, 50), "n": i} for i in range(50)], "available_count": 50}
+    raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    cuts = sorted(rng.sample(range(1, len(raw)), 200))
+    chunks = [raw[a:b] for a, b in zip([0] + cuts, cuts + [len(raw)])]
+    decoder = ItemStreamDecoder()
+    assert list(iter_json_items(chunks, decoder)) == payload["items"]
+    assert decoder.meta == {"available_count": 50}
+
+
+def test_item_hook_maps_and_filters():
+    raw = json.dumps({"data": [{"id": 1}, {"id": 2}, {"id": 3}]}).encode()
+    decoder = ItemStreamDecoder(item_hook=lambda it: it["id"] * 10 if it["id"] != 2 else None)
+    assert list(iter_json_items([raw], decoder)) == [10, 30]
+    assert decoder.items_decoded == 3
+
+
+def test_empty_and_missing_array():
+    assert list(iter_json_items([b'{"data": [], "total": 0}'], ItemStreamDecoder())) == []
+    decoder = ItemStreamDecoder()
+    assert list(iter_json_items([b'{"data": null, "total": 0}'], decoder)) == []
+    assert decoder.meta == {"data": None, "total": 0}
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(IncompleteJSON):
+        list(iter_json_items([b'{"data": [{"id": 1}, {"id"'], ItemStreamDecoder()))
+
+
+@pytest.mark.asyncio
+async def test_api_search_streams_body(monkeypatch):
+    monkeypatch.setattr(server, "_response_cache", None)
+    monkeypatch.setattr(server, "upstream_flights", SingleFlight())
+    body = {
+        "data": [{"case_id": f"id-{i}", "first_number": f"А40-{i}/2024", "documents": [{"value": "x" * 1000}]} for i in range(30)],
+        "total": 90,
+    }
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        return httpx.Response(200, stream=httpx.ByteStream(raw))
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        settings = server.Settings(api_base_url="http://upstream.test/cases", api_key="k")
+        req = server.SearchRequest(filters=server.SearchFilters(need_document=True), page_size=30)
+        res = await server.api_search(settings, req)
+    finally:
+        await close_http_clients()
+    assert [it.id for it in res.items] == [f"id-{i}" for i in range(30)]
+    assert res.items[0].documents == [{"value": "x" * 1000}]
+    assert res.total == 90
+    assert res.next_page == 2
+
+
+@pytest.mark.asyncio
+async def test_batchcards_error_status_is_raised(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    monkeypatch.setattr(server_batchcards, "upstream_flights", SingleFlight())
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, text="upstream down")
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    try:
+        settings = server_batchcards.Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+        with pytest.raises(httpx.HTTPStatusError) as exc:
+            await server_batchcards.api_search_batchcards(settings, server_batchcards.BatchCardsRequest(filters={}))
+    finally:
+        await close_http_clients()
+    assert exc.value.response.text == "upstream down"
@@ -0,0 +1,48 @@
+import random
+
+from msp_llm_filters import nl_converter, nl_converter_batchcards
+from msp_llm_filters.keyword_prefilter import KeywordAutomaton, RuleGroupPrefilter
+
+
+def test_automaton_finds_overlapping_matches():
+    ac = KeywordAutomaton(["он", "онт", "контракт", "тракт", "ракета", "a"])
+    assert ac.find("госконтракт") == {"он", "онт", "контракт", "тракт"}
+    assert ac.find("") == frozenset()
+    assert ac.find("ничего") == frozenset()
+
+
+def test_automaton_matches_naive_substring_search():
+    rng = random.Random(7)
+    alphabet = "абвгд "
+    keywords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(40)]
+    ac = KeywordAutomaton(keywords)
+    for _ in range(500):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        assert ac.find(text) == {k for k in keywords if k in text}
+
+
+def test_groups_gated_and_counted():
+    pf = RuleGroupPrefilter({"leases": ["лизинг"], "always": []}, extra_keywords=["адрес"])
+    found = pf.scan("компании с лизингом по адресу")
+    assert found == {"лизинг", "адрес"}
+    assert pf.should_run("leases", found)
+    assert pf.should_run("always", frozenset())
+    assert not pf.should_run("leases", pf.scan("ооо ромашка"))
+    stats = pf.stats()
+    assert stats["queries"] == 2
+    assert stats["groups"]["leases"] == {"runs": 1, "skips": 1, "skip_rate": 0.5}
+    pf.reset_stats()
+    assert pf.stats()["groups"]["leases"]["runs"] == 0
+
+
+def test_converters_report_skip_rates():
+    nl_converter_batchcards.PREFILTER.reset_stats()
+    out = nl_converter_batchcards.convert_nl_to_batchcards("компании с выручкой от 10 млн")
+    assert "income_from" in out["filters"]
+    stats = nl_converter_batchcards.prefilter_stats()
+    assert stats["groups"]["finance"]["runs"] == 1
+    assert stats["groups"]["leases"]["skips"] == 1
+
+    before = nl_converter.prefilter_stats()["groups"]["court"]["skips"]
+    assert nl_converter.convert_nl_to_filters("дела, где ответчик ИНН 7707083893")["filters"]["role"] == "RESPONDENT"
+    assert nl_converter.prefilter_stats()["groups"]["court"]["skips"] == before + 1
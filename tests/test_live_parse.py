@@ -0,0 +1,34 @@
+import httpx
+import pytest
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+from msp_llm_filters.webapp_batchcards import app, diff_filters
+
+
+def test_diff_filters():
+    assert diff_filters({"a": 1, "b": [1], "c": True}, {"a": 1, "b": [2], "d": "x"}) == {
+        "added": {"d": "x"},
+        "removed": ["c"],
+        "changed": {"b": {"from": [1], "to": [2]}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_parse_endpoint_returns_rule_parse_and_diff(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.invalid")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://web.test") as web:
+        first = (await web.post("/api/parse", json={"q": "20 компаний в москве", "seq": 1})).json()
+        second = (await web.post("/api/parse", json={"q": "20 компаний в москве с лизингом", "prev_q": "20 компаний в москве", "seq": 2})).json()
+        bad = await web.post("/api/parse", json={"q": 5})
+        too_long = await web.post("/api/parse", json={"q": "а" * 5000})
+
+    assert first["seq"] == 1
+    assert first["parsed"] == convert_nl_to_batchcards("20 компаний в москве")
+    assert first["diff"]["added"] == first["parsed"]["filters"]
+    assert second["seq"] == 2
+    assert second["diff"]["removed"] == []
+    assert set(second["diff"]["added"]) == set(second["parsed"]["filters"]) - set(first["parsed"]["filters"])
+    assert second["diff"]["added"]
+    assert second["elapsed_ms"] < 10
+    assert bad.status_code == 400 and too_long.status_code == 400
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import pytest
+
+from msp_llm_filters import conversion_memo, similarity_cache
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.llm_client_batchcards import PROMPTS_PATH, nl_to_batchcards_via_ollama_async
+from msp_llm_filters.ollama import (
+    OUTPUT_FORMAT_INSTRUCTIONS,
+    JSONObjectScanner,
+    build_chat_payload,
+    chat_json_stream_async,
+    load_system_prompt,
+    ollama_lifespan,
+)
+from msp_llm_filters.webapp_batchcards import app
+from msp_llm_filters.webapp_utils import ClientDisconnected, cancel_on_disconnect
+
+LLM_DELAY = 0.6
+
+
+def _slow_ollama(calls):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        await asyncio.sleep(LLM_DELAY)
+        content = json.dumps({"filters": {"region_codes": ["77"]}, "page": 1, "page_size": 10})
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": content}})
+
+    return handler
+
+
+@pytest.fixture
+def ollama_calls(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    monkeypatch.delenv("API_BASE_URL", raising=False)
+    monkeypatch.setattr(conversion_memo, "_memo", None)
+    monkeypatch.setattr(similarity_cache, "_cache", None)
+    return []
+
+
+@pytest.mark.asyncio
+async def test_async_client_parses_llm_json(ollama_calls):
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_slow_ollama(ollama_calls))), name="ollama")
+    try:
+        res = await nl_to_batchcards_via_ollama_async("компании в москве")
+    finally:
+        await close_http_clients()
+    assert res == {"filters": {"region_codes": ["77"]}, "page": 1, "page_size": 10}
+    assert ollama_calls[0]["messages"][1]["content"] == "компании в москве"
+
+
+@pytest.mark.asyncio
+async def test_rule_based_requests_served_while_llm_in_flight(ollama_calls):
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_slow_ollama(ollama_calls))), name="ollama")
+    transport = httpx.ASGITransport(app=app)
+    rule_latencies = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://web.test") as web:
+            async def llm_request():
+                # Правилам не хватает «ремонт обуви» — роутер отдаёт запрос LLM
+                r = await web.post("/search", data={"q": "компании в москве, занимающиеся ремонтом обуви", "use_llm": "on"})
+                assert r.status_code == 200
+                assert "<b>llm</b>" in r.text
+
+            async def rule_request():
+                await asyncio.sleep(0.05)
+                t0 = time.perf_counter()
+                r = await web.post("/search", data={"q": "20 компаний в москве"})
+                rule_latencies.append(time.perf_counter() - t0)
+                assert r.status_code == 200
+                assert "<b>rule-based</b>" in r.text
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*[llm_request() for _ in range(3)], *[rule_request() for _ in range(5)])
+            wall = time.perf_counter() - t0
+    finally:
+        await close_http_clients()
+
+    assert len(ollama_calls) == 3
+    # Правило-ориентированные запросы не ждут LLM, а три LLM-вызова идут параллельно
+    assert max(rule_latencies) < LLM_DELAY / 2
+    assert wall < LLM_DELAY * 2
+
+
+class _FakeRequest:
+    def __init__(self, disconnect_after: float) -> None:
+        self._deadline = time.perf_counter() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return time.perf_counter() >= self._deadline
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect_cancels_llm_call():
+    cancelled = asyncio.Event()
+
+    async def long_call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(_FakeRequest(0.05), long_call(), poll_interval=0.01)
+    await asyncio.sleep(0)
+    assert cancelled.is_set()
+
+
+def test_system_prompt_cached_until_file_changes(tmp_path):
+    path = tmp_path / "prompt.md"
+    path.write_text("Ты конвертер.", encoding="utf-8")
+    first = load_system_prompt(str(path))
+    assert first.startswith("Ты конвертер.") and first.endswith(OUTPUT_FORMAT_INSTRUCTIONS)
+    # Пока файл не менялся — тот же объект строки, без чтения с диска
+    assert load_system_prompt(str(path)) is first
+
+    path.write_text("Ты другой конвертер.", encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_system_prompt(str(path)).startswith("Ты другой конвертер.")
+    assert load_system_prompt(str(tmp_path / "missing.md")) == OUTPUT_FORMAT_INSTRUCTIONS
+
+
+def test_chat_payload_keeps_prefix_stable(monkeypatch):
+    monkeypatch.delenv("OLLAMA_KEEP_ALIVE", raising=False)
+    monkeypatch.delenv("OLLAMA_NUM_CTX", raising=False)
+    prompt = load_system_prompt(PROMPTS_PATH)
+    a = build_chat_payload(prompt, "компании в москве")
+    b = build_chat_payload(load_system_prompt(PROMPTS_PATH), "ип в спб")
+    # Всё до сообщения пользователя совпадает побайтно
+    assert json.dumps(a["messages"][0]) == json.dumps(b["messages"][0])
+    assert a["options"] == b["options"] and a["keep_alive"] == "30m"
+
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "-1")
+    monkeypatch.setenv("OLLAMA_NUM_CTX", "8192")
+    c = build_chat_payload(prompt, "x")
+    assert c["keep_alive"] == -1 and c["options"]["num_ctx"] == 8192
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "")
+    assert "keep_alive" not in build_chat_payload(prompt, "x")
+
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_up_model(ollama_calls, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        ollama_calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "{"}})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)), name="ollama")
+    lifespan = ollama_lifespan(lambda: "системный промпт")
+    async with lifespan(None):
+        for _ in range(50):
+            if ollama_calls:
+                break
+            await asyncio.sleep(0.01)
+    [warm] = ollama_calls
+    assert warm["messages"] == [{"role": "system", "content": "системный промпт"}]
+    assert warm["options"]["num_predict"] == 1 and warm["keep_alive"] == "30m"
+
+    monkeypatch.setenv("OLLAMA_WARMUP", "0")
+    async with lifespan(None):
+        await asyncio.sleep(0.05)
+    assert len(ollama_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_does_not_block_startup(ollama_calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("ollama is down")
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)), name="ollama")
+    async with ollama_lifespan(lambda: "p")(None):
+        await asyncio.sleep(0.05)
+
+
+ANSWER = '{"filters": {"region_codes": ["77", "50"], "search_terms": ["ремонт {обуви} \\"люкс\\""], "only_active": true}, "page": 1, "page_size": 20}'
+TRAILER = "\n```\nПояснение: регион 77 — Москва, 50 — Московская область."
+
+
+def _tokens(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_scanner_stops_at_object_end_and_reports_partial_filters():
+    scanner = JSONObjectScanner()
+    partial = []
+    for piece in _tokens("Вот JSON:\n```json\n" + ANSWER + TRAILER):
+        if scanner.feed(piece):
+            partial.append(dict(scanner.filters))
+        if scanner.done:
+            break
+    assert scanner.result() == json.loads(ANSWER)
+    # Поле за полем: скобки и кавычки внутри строк не сбивают разбор
+    assert [list(f) for f in partial] == [
+        ["region_codes"],
+        ["region_codes", "search_terms"],
+        ["region_codes", "search_terms", "only_active"],
+    ]
+
+
+def _streaming_ollama(pieces, sent):
+    async def body():
+        for piece in pieces:
+            sent.append(piece)
+            yield (json.dumps({"message": {"role": "assistant", "content": piece}, "done": False}) + "\n").encode()
+            await asyncio.sleep(0)
+        yield (json.dumps({"message": {"role": "assistant", "content": ""}, "done": True}) + "\n").encode()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=body())
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_once_json_complete(ollama_calls):
+    sent = []
+    pieces = _tokens(ANSWER + TRAILER)
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_streaming_ollama(pieces, sent))), name="ollama")
+    seen = []
+    try:
+        res = await chat_json_stream_async(build_chat_payload("p", "q"), seen.append)
+    finally:
+        await close_http_clients()
+    assert res == json.loads(ANSWER)
+    assert seen[-1] == res["filters"]
+    # Хвост после объекта не читается: генерация обрывается на закрывающей скобке
+    assert len(sent) < len(pieces) and "".join(sent).startswith(ANSWER)
+
+
+@pytest.mark.asyncio
+async def test_parse_llm_endpoint_streams_partial_filters(ollama_calls, monkeypatch):
+    monkeypatch.setenv("NL_ROUTER", "0")
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_streaming_ollama(_tokens(ANSWER), []))), name="ollama")
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://web.test") as web:
+            r = await web.post("/api/parse_llm", json={"q": "компании в москве и области, ремонт обуви"})
+            bad = await web.post("/api/parse_llm", json={"q": ""})
+    finally:
+        await close_http_clients()
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert [list(e) for e in events[:-1]] == [["filters"]] * 3
+    assert events[-1] == {"parsed": json.loads(ANSWER), "parser": "llm"}
+    assert bad.status_code == 400
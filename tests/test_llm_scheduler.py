@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from msp_llm_filters import conversion_memo, llm_scheduler, ollama, similarity_cache
+from msp_llm_filters.llm_client import nl_to_filters_via_ollama
+from msp_llm_filters.llm_client_batchcards import nl_to_batchcards_via_ollama
+from msp_llm_filters.llm_scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMOverloaded, LLMScheduler
+from msp_llm_filters.webapp_batchcards import app
+
+
+async def _hold(scheduler, started, release, priority=PRIORITY_INTERACTIVE, deadline=None, name=""):
+    async def work():
+        started.append(name)
+        await release.wait()
+        return name
+
+    return await scheduler.run(work, priority, deadline)
+
+
+async def _until(cond):
+    for _ in range(100):
+        if cond():
+            return
+        await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    scheduler = LLMScheduler(max_concurrency=2)
+    running = peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    await asyncio.gather(*(scheduler.run(work) for _ in range(10)))
+    stats = scheduler.stats()
+    assert peak == 2 and stats["completed"] == 10 and stats["running"] == 0 and stats["queued"] == 0
+    assert stats["max_queued"] == 8 and stats["wait_ms"]["count"] == 10
+
+
+@pytest.mark.asyncio
+async def test_interactive_before_batch():
+    scheduler = LLMScheduler(max_concurrency=1)
+    started, release = [], asyncio.Event()
+    first = asyncio.ensure_future(_hold(scheduler, started, release, name="first"))
+    await _until(lambda: started)
+    batch = asyncio.ensure_future(_hold(scheduler, started, release, PRIORITY_BATCH, name="batch"))
+    await _until(lambda: scheduler.queued == 1)
+    ui = asyncio.ensure_future(_hold(scheduler, started, release, PRIORITY_INTERACTIVE, name="ui"))
+    await _until(lambda: scheduler.queued == 2)
+    release.set()
+    await asyncio.gather(first, batch, ui)
+    assert started == ["first", "ui", "batch"]
+
+
+@pytest.mark.asyncio
+async def test_rejects_fast_when_estimated_wait_exceeds_deadline():
+    scheduler = LLMScheduler(max_concurrency=1, service_s=1.0)
+    started, release = [], asyncio.Event()
+    holders = [asyncio.ensure_future(_hold(scheduler, started, release)) for _ in range(2)]
+    await _until(lambda: scheduler.queued == 1)
+    # Впереди один запрос в очереди и занятый слот: ждать ~2 с при сроке 0,5 с
+    t0 = time.perf_counter()
+    with pytest.raises(LLMOverloaded):
+        await scheduler.run(lambda: asyncio.sleep(0), deadline=0.5)
+    assert time.perf_counter() - t0 < 0.05
+    # Пакетный без срока встаёт в очередь
+    batch = asyncio.ensure_future(_hold(scheduler, started, release, PRIORITY_BATCH))
+    await _until(lambda: scheduler.queued == 2)
+    release.set()
+    await asyncio.gather(*holders, batch)
+    stats = scheduler.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_expires_in_queue_and_cancel_frees_place():
+    scheduler = LLMScheduler(max_concurrency=1, service_s=0.01)
+    started, release = [], asyncio.Event()
+    holder = asyncio.ensure_future(_hold(scheduler, started, release))
+    await _until(lambda: started)
+    with pytest.raises(LLMOverloaded):
+        await scheduler.run(lambda: asyncio.sleep(0), deadline=0.02)
+    cancelled = asyncio.ensure_future(_hold(scheduler, started, release, name="cancelled"))
+    await _until(lambda: scheduler.queued == 1)
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert scheduler.queued == 0
+    release.set()
+    await holder
+    assert "cancelled" not in started
+    assert scheduler.stats()["expired"] == 1 and scheduler.running == 0
+    # Слот свободен: следующий запрос — без ожидания
+    assert await scheduler.run(lambda: asyncio.sleep(0, result="ok"), deadline=0.001) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_web_falls_back_to_rules_when_queue_is_full(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    monkeypatch.delenv("API_BASE_URL", raising=False)
+    monkeypatch.setenv("LLM_DEADLINE_INTERACTIVE_S", "1")
+    monkeypatch.setattr(conversion_memo, "_memo", None)
+    monkeypatch.setattr(similarity_cache, "_cache", None)
+    scheduler = LLMScheduler(max_concurrency=1, service_s=30.0)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", scheduler)
+    started, release = [], asyncio.Event()
+    # Слот занят долгой генерацией пакетного прогона
+    holder = asyncio.ensure_future(_hold(scheduler, started, release, PRIORITY_BATCH))
+    await _until(lambda: started)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://web.test") as web:
+            t0 = time.perf_counter()
+            r = await web.post("/search", data={"q": "компании в москве, занимающиеся ремонтом обуви", "use_llm": "on"})
+            elapsed = time.perf_counter() - t0
+            stats = (await web.get("/api/llm_stats")).json()
+    finally:
+        release.set()
+        await holder
+    assert r.status_code == 200 and "rule-based (LLM перегружена)" in r.text
+    assert elapsed < 0.5
+    assert stats["rejected"] == 1 and stats["running"] == 1
+    assert sum(stats["queue_depth"]["buckets"].values()) == stats["queue_depth"]["count"] == 2
+
+
+def test_sync_clients_go_through_scheduler(monkeypatch):
+    scheduler = LLMScheduler(max_concurrency=1)
+    monkeypatch.setattr(llm_scheduler, "_scheduler", scheduler)
+    seen = []
+
+    async def fake_stream(payload, on_filters=None):
+        seen.append(scheduler.running)
+        return {"filters": {"region_codes": ["77"]}, "page": 1, "page_size": 50}
+
+    monkeypatch.setattr(ollama, "chat_json_stream_async", fake_stream)
+    assert nl_to_batchcards_via_ollama("ип в москве")["filters"] == {"region_codes": ["77"]}
+    assert nl_to_filters_via_ollama("дела в АС Москвы", priority=PRIORITY_BATCH)["page"] == 1
+    # Генерация шла в слоте планировщика
+    assert seen == [1, 1] and scheduler.stats()["completed"] == 2
@@ -0,0 +1,18 @@
+import json
+import os
+
+import pytest
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), "data", "batchcards_golden.json")
+
+with open(GOLDEN_PATH, encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.mark.parametrize("case", GOLDEN, ids=[str(i) for i in range(len(GOLDEN))])
+def test_matches_golden_output(case):
+    # Сравниваем сериализацию: важен и порядок ключей в filters
+    got = convert_nl_to_batchcards(case["query"])
+    assert json.dumps(got, ensure_ascii=False) == json.dumps(case["expected"], ensure_ascii=False)
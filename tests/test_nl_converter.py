@@ -25,10 +25,12 @@ def test_convert_inn():
 
 
 def test_convert_court():
+    # Без снимка справочника судов — название из текста (с индексом — см. test_court_index)
     query = "в Арбитражном суде Челябинской области"
     result = convert_nl_to_filters(query)
     
-    assert result["filters"]["court"] == "Арбитражный суд Челябинской Области"
+    assert result["filters"]["court"] == "Арбитражный суд Челябинской области"
+    assert convert_nl_to_filters("АС Краснодарского края")["filters"]["court"] == "Арбитражный суд Краснодарского края"
 
 
 def test_convert_sort_sum():
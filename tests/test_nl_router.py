@@ -0,0 +1,80 @@
+import json
+import os
+
+import httpx
+import pytest
+
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards, explain_nl_to_batchcards
+from msp_llm_filters.nl_router import route_batchcards
+from msp_llm_filters.ollama_replay import create_replay_app, load_recordings
+from msp_llm_filters.parser_eval import load_corpus, run_eval
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def test_fully_explained_query():
+    result, cov = explain_nl_to_batchcards("покажи 200 компаний в Московской области с выручкой от 10 млн до 50 млн руб")
+    assert result == convert_nl_to_batchcards("покажи 200 компаний в Московской области с выручкой от 10 млн до 50 млн руб")
+    assert cov.score == 1.0 and cov.unexplained == ()
+    # Служебные слова и «компаний/покажи» не считаются
+    assert "компаний" not in cov.explained and "московской" in cov.explained and "200" in cov.explained
+
+
+@pytest.mark.parametrize(
+    "query, unexplained",
+    [
+        ("компании в Москве, занимающиеся ремонтом обуви", ("занимающиеся", "ремонтом", "обуви")),
+        # Номер лицензии после слова: паттерн license ждёт номер перед ним
+        ("ооо, лицензия 123456", ("лицензия", "123456")),
+        ("компании в Татарстане с сайтом и телефоном", ("телефоном",)),
+    ],
+)
+def test_unexplained_words(query, unexplained):
+    _, cov = explain_nl_to_batchcards(query)
+    assert cov.unexplained == unexplained and cov.score < 1.0
+
+
+def test_tracking_does_not_change_result():
+    with open(os.path.join(DATA, "batchcards_golden.json"), encoding="utf-8") as f:
+        queries = [c["query"] for c in json.load(f)]
+    for q in queries:
+        assert explain_nl_to_batchcards(q)[0] == convert_nl_to_batchcards(q), q
+
+
+@pytest.mark.asyncio
+async def test_route_calls_llm_only_for_unexplained():
+    calls = []
+
+    async def llm(query):
+        calls.append(query)
+        return {"filters": {"region_codes": ["77"], "search_terms": ["ремонт обуви"]}, "page": 1, "page_size": 50}
+
+    rules = await route_batchcards("ИП в Москве с сайтом", llm)
+    assert rules.parser == "rule-based" and rules.result == convert_nl_to_batchcards("ИП в Москве с сайтом")
+    hybrid = await route_batchcards("компании в Москве, занимающиеся ремонтом обуви", llm)
+    assert hybrid.parser == "llm" and hybrid.result["filters"]["search_terms"] == ["ремонт обуви"]
+    assert calls == ["компании в Москве, занимающиеся ремонтом обуви"]
+    # Порог 0 — правила всегда
+    assert (await route_batchcards("просто текст", llm, min_coverage=0.0)).parser == "rule-based"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_router_on_labeled_corpus(monkeypatch, tmp_path):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    cases = load_corpus(os.path.join(DATA, "parser_eval_corpus.jsonl"))
+    # LLM-стенд отвечает разметкой: видно, сколько запросов роутер ей отдаёт и что это даёт качеству
+    path = tmp_path / "recordings.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for c in cases:
+            content = json.dumps({"filters": c["filters"]}, ensure_ascii=False)
+            f.write(json.dumps({"query": c["query"], "content": content}, ensure_ascii=False) + "\n")
+    app = create_replay_app(load_recordings(str(path)), 0)
+    set_http_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=app)), name="ollama")
+    try:
+        rules, router = await run_eval(cases, ["rules", "router"])
+    finally:
+        await close_http_clients()
+    assert 0 < router["llm_calls"] == app.state.stats["requests"] < len(cases) / 2
+    assert router["micro"]["f1"] > rules["micro"]["f1"]
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+
+import httpx
+import pytest
+
+from msp_llm_filters import llm_scheduler, parser_eval
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.ollama_replay import create_replay_app, load_recordings
+from msp_llm_filters.parser_eval import evaluate, filter_facts, load_corpus, run_eval
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "parser_eval_corpus.jsonl")
+
+
+def _write_recordings(path, cases, **extra):
+    with open(path, "w", encoding="utf-8") as f:
+        for c in cases:
+            content = json.dumps({"filters": c["filters"], "page": 1, "page_size": 20}, ensure_ascii=False)
+            f.write(json.dumps({"query": c["query"], "content": content, **extra}, ensure_ascii=False) + "\n")
+
+
+@pytest.fixture
+def replay(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    # Одновременность здесь ограничивает сам прогон (--concurrency), а не очередь к Ollama
+    monkeypatch.setattr(llm_scheduler, "_scheduler", llm_scheduler.LLMScheduler(max_concurrency=64))
+
+    def install(recordings, latency_ms=0.0):
+        app = create_replay_app(recordings, latency_ms)
+        set_http_client(httpx.AsyncClient(transport=httpx.ASGITransport(app=app)), name="ollama")
+        return app
+
+    return install
+
+
+def test_filter_facts():
+    facts = filter_facts({
+        "region_codes": ["77", "50"],
+        "income_from": 2000.0,
+        "vacancies": {"text": " Разработчиков ", "has_vacancies": True},
+        "address_request": {"address_filters": [{"city": "Казань"}]},
+        "search_text": "",
+    })
+    assert facts == {
+        ("region_codes", '"77"'),
+        ("region_codes", '"50"'),
+        ("income_from", "2000"),
+        ("vacancies.text", '"разработчиков"'),
+        ("vacancies.has_vacancies", "true"),
+        ("address_request.address_filters[].city", '"казань"'),
+    }
+    # true и 1, «77» и 77 — разные значения
+    assert filter_facts({"a": True}) != filter_facts({"a": 1})
+    assert filter_facts({"a": "77"}) != filter_facts({"a": 77})
+
+
+@pytest.mark.asyncio
+async def test_field_level_precision_recall():
+    cases = [
+        {"query": "a", "filters": {"region_codes": ["77", "50"], "income_from": 10}},
+        {"query": "b", "filters": {"region_codes": ["16"]}},
+        {"query": "c", "filters": {"ssch_from": 5}},
+    ]
+    answers = {
+        "a": {"filters": {"region_codes": ["50", "77"], "income_from": 10000}},
+        "b": {"filters": {"region_codes": ["16"], "only_active": True}},
+    }
+
+    async def parse(query):
+        if query == "c":
+            raise ValueError("bad json")
+        return answers[query]
+
+    report = await evaluate("stub", parse, cases)
+    assert report["cases"] == 3 and report["errors"] == 1
+    assert report["exact_match"] == 0.0
+    assert report["fields"]["region_codes"] == {"tp": 3, "fp": 0, "fn": 0, "precision": 1.0, "recall": 1.0, "f1": 1.0}
+    assert report["fields"]["income_from"]["precision"] == 0.0 and report["fields"]["income_from"]["fn"] == 1
+    assert report["fields"]["only_active"]["recall"] is None
+    assert report["fields"]["ssch_from"]["fn"] == 1
+    assert report["micro"]["tp"] == 3 and report["micro"]["fp"] == 2 and report["micro"]["fn"] == 2
+    assert report["failures"][2]["error"] == "ValueError: bad json"
+    assert report["latency"]["n"] == 3 and report["latency"]["p99_ms"] >= report["latency"]["p50_ms"]
+
+
+@pytest.mark.asyncio
+async def test_rules_on_labeled_corpus():
+    cases = load_corpus(CORPUS_PATH)
+    [report] = await run_eval(cases, ["rules"])
+    assert report["cases"] == len(cases) >= 30 and report["errors"] == 0
+    # Порог ниже текущего уровня: тест ловит регрессии правил, а не фиксирует их точное качество
+    assert report["micro"]["precision"] >= 0.9 and report["micro"]["recall"] >= 0.9
+
+
+def test_golden_file_is_a_corpus():
+    path = os.path.join(os.path.dirname(__file__), "data", "batchcards_golden.json")
+    cases = load_corpus(path)
+    assert cases and all(isinstance(c["filters"], dict) for c in cases)
+
+
+@pytest.mark.asyncio
+async def test_llm_replayed_offline_with_bounded_concurrency(tmp_path, replay):
+    cases = [{"query": f"компании в регионе {i:02d}", "filters": {"region_codes": [f"{i:02d}"]}} for i in range(1, 61)]
+    path = str(tmp_path / "recordings.jsonl")
+    _write_recordings(path, cases, latency_ms=20)
+    app = replay(load_recordings(path), latency_ms=None)
+    try:
+        t0 = time.perf_counter()
+        [report] = await run_eval(cases, ["llm"], concurrency=10)
+        wall = time.perf_counter() - t0
+    finally:
+        await close_http_clients()
+    assert report["errors"] == 0 and report["exact_match"] == 1.0
+    assert app.state.stats["requests"] == 60
+    assert app.state.stats["max_in_flight"] == 10
+    # 60 запросов по 20 мс последовательно — 1,2 с; по 10 одновременно — около 0,12 с
+    assert wall < 0.8
+    assert report["latency"]["p50_ms"] >= 20
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path, replay, monkeypatch):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        query = json.loads(request.content)["messages"][-1]["content"]
+        calls.append(query)
+        filters = {"region_codes": ["77"]} if "москв" in query else {}
+        content = json.dumps({"filters": filters}) if filters else "не JSON"
+        return httpx.Response(200, json={"model": "m1", "message": {"role": "assistant", "content": content}})
+
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    cases = [{"query": "компании в москве", "filters": {"region_codes": ["77"]}}, {"query": "что-то", "filters": {}}]
+    recorded = []
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)), name="ollama")
+    try:
+        [live] = await run_eval(cases, ["llm"], recordings=recorded)
+    finally:
+        await close_http_clients()
+    assert len(calls) == 2 and {r["model"] for r in recorded} == {"m1"}
+
+    path = tmp_path / "recordings.jsonl"
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recorded), encoding="utf-8")
+    replay(load_recordings(str(path)))
+    try:
+        [again] = await run_eval(cases, ["llm"])
+        # Незаписанный запрос — ошибка, а не выдуманный ответ
+        [missing] = await run_eval([{"query": "новый запрос", "filters": {}}], ["llm"])
+    finally:
+        await close_http_clients()
+    assert len(calls) == 2
+    assert again["micro"] == live["micro"] and live["micro"]["tp"] == 1
+    assert again["errors"] == live["errors"] == 1
+    assert "404" in missing["failures"][0]["error"]
+
+
+def test_cli_replay(tmp_path, capsys):
+    cases = load_corpus(CORPUS_PATH)[:5]
+    rec_path = str(tmp_path / "recordings.jsonl")
+    _write_recordings(rec_path, cases)
+    out = str(tmp_path / "report.json")
+    parser_eval.main_entry([CORPUS_PATH, "--replay", rec_path, "--replay-latency-ms", "0", "-o", out])
+    lines = [json.loads(x) for x in capsys.readouterr().out.splitlines()]
+    assert [r["parser"] for r in lines] == ["rules", "llm"]
+    llm = lines[1]
+    # Записаны только 5 запросов корпуса: остальные — ошибки 404
+    assert llm["errors"] == llm["cases"] - 5
+    with open(out, encoding="utf-8") as f:
+        report = json.load(f)
+    assert "fields" in report[0] and "failures" in report[1]
@@ -0,0 +1,81 @@
+import httpx
+import pytest
+
+from msp_llm_filters import server_batchcards
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.projection import PRESETS, Projection, resolve_projection
+from msp_llm_filters.singleflight import SingleFlight
+
+CARD = {
+    "main_block": {"inn": "7707083893", "name": "ООО Ромашка", "status": {"status_egr": "Действующее"}, "okopf": "12300"},
+    "address_block": {"region_code": "77", "value": "Москва", "fias": {"id": "x"}},
+    "contacts_block": {"phones": [{"value": "+7 495 000-00-00", "src": "egr"}], "emails": []},
+    "managers_block": {"managers": [{"name": "Иванов И.И.", "position": "директор", "inn": "1"}]},
+    "finance_plain_block": {"fin_data": [{"code": "2110", "sum_by_year_map": {"2023": 1000}}]},
+}
+
+
+def test_dotted_paths_and_lists():
+    p = Projection(["main_block.inn", "managers_block.managers.name", "address_block", "main_block.nope"])
+    assert p.apply(CARD) == {
+        "main_block": {"inn": "7707083893"},
+        "managers_block": {"managers": [{"name": "Иванов И.И."}]},
+        "address_block": CARD["address_block"],
+    }
+
+
+def test_parent_path_wins_over_child():
+    assert Projection(["main_block", "main_block.inn"]).apply(CARD) == {"main_block": CARD["main_block"]}
+    assert Projection(["main_block.inn", "main_block"]).apply(CARD) == {"main_block": CARD["main_block"]}
+
+
+def test_path_through_scalar_is_dropped():
+    assert Projection(["main_block.inn.x"]).apply(CARD) == {"main_block": {}}
+
+
+def test_presets_and_fields_combine():
+    p = resolve_projection(["finance_plain_block"], "contacts")
+    out = p.apply(CARD)
+    assert set(out) == {"main_block", "contacts_block", "managers_block", "finance_plain_block"}
+    assert out["main_block"] == {"inn": "7707083893", "name": "ООО Ромашка"}
+    assert resolve_projection("main_block.inn, main_block.name").paths == ["main_block.inn", "main_block.name"]
+    assert resolve_projection() is None
+    assert set(PRESETS) == {"card", "finance", "contacts"}
+    with pytest.raises(ValueError):
+        resolve_projection(preset="everything")
+
+
+@pytest.mark.asyncio
+async def test_projection_applied_and_part_of_cache_key(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    monkeypatch.setattr(server_batchcards, "upstream_flights", SingleFlight())
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"data": [CARD, CARD], "total": 2})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    settings = server_batchcards.Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+    try:
+        req = server_batchcards.BatchCardsRequest(filters={"region_codes": ["77"]}, preset="card")
+        res = await server_batchcards.api_search_batchcards(settings, req)
+        again = await server_batchcards.api_search_batchcards(settings, req)
+        full = await server_batchcards.api_search_batchcards(
+            settings, server_batchcards.BatchCardsRequest(filters={"region_codes": ["77"]})
+        )
+    finally:
+        await close_http_clients()
+    assert res.items[0] == {
+        "main_block": {"inn": "7707083893", "name": "ООО Ромашка", "status": {"status_egr": "Действующее"}},
+        "address_block": {"region_code": "77", "value": "Москва"},
+    }
+    assert again.items == res.items
+    assert full.items[0] == CARD
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_tool_rejects_unknown_preset():
+    res = await server_batchcards.search_companies({"filters": {}, "preset": "all"})
+    assert res["error"] == "validation_error"
@@ -0,0 +1,64 @@
+import pytest
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+from msp_llm_filters.quantities import bounds, tokenize_quantities
+
+
+def _short(q):
+    return [(x.kind, x.op, x.value, x.unit) for x in tokenize_quantities(q)]
+
+
+@pytest.mark.parametrize(
+    "q, expected",
+    [
+        ("выручка от 1 до 2 млн", [("income", "from", 1e6, "млн"), ("income", "to", 2e6, "млн")]),
+        ("выручка от 10 млн до 50 млн руб", [("income", "from", 1e7, "млн"), ("income", "to", 5e7, "млн")]),
+        ("выручка которых составляет больше 2 млн р", [("income", "from", 2e6, "млн")]),
+        ("выручка сост. 7 тысяч", [("income", "eq", 7000.0, "тыс")]),
+        ("выручка не менее 1 500 000", [("income", "from", 1.5e6, "")]),
+        ("выручка свыше 1,5 млрд", [("income", "from", 1.5e9, "млрд")]),
+        ("зарплата от 40 тыс до 80 тыс", [("salary", "from", 4e4, "тыс"), ("salary", "to", 8e4, "тыс")]),
+        ("нмцк до 3 млн руб", [("price", "to", 3e6, "млн")]),
+        ("численность сотрудников не более 50", [("headcount", "to", 50.0, "")]),
+        ("рост выручки более 10%", [("growth", "from", 10.0, "")]),
+        ("стабильной динамикой роста более 5,5 %", [("growth", "from", 5.5, "")]),
+    ],
+)
+def test_tokenize(q, expected):
+    assert _short(q) == expected
+
+
+@pytest.mark.parametrize(
+    "q",
+    [
+        "создана с 2020-01-01 по 2021-01-01, оквэд 62.01",  # числа без ключевого слова
+        "ростовская область, 12 компаний",  # «рост» без процента
+        "прирост выручки",  # основа внутри слова, чисел нет
+        "начальник отдела от 5 лет",  # «начальник» — не «начальная цена»
+        "выручка за 2023 год",  # число без сравнения
+    ],
+)
+def test_no_bounds(q):
+    assert all(bounds(tokenize_quantities(q), kind) == (None, None) for kind in ("income", "growth", "price"))
+
+
+def test_keyword_does_not_reach_past_another_keyword():
+    # «сотрудников» не забирает зарплату: между ними другое ключевое слово
+    assert _short("поиск сотрудников, зарплата от 50 тыс") == [("salary", "from", 5e4, "тыс")]
+
+
+def test_bounds_prefers_explicit_comparison():
+    qs = tokenize_quantities("выручка составляет 3 млн, выручка от 1 млн, выручка до 500 тыс")
+    lo, hi = bounds(qs, "income")
+    assert (lo.value, hi.value) == (1e6, 5e5)
+    lo, _ = bounds(tokenize_quantities("выручка составляет 3 млн"), "income")
+    assert lo.value == 3e6
+
+
+def test_units_are_consistent_across_sections():
+    f = convert_nl_to_batchcards("выручка до 500 тыс, прибыль от 1 до 5 млн, вакансии, зарплата от 40 тыс")["filters"]
+    assert f["income_to"] == 500
+    assert (f["net_income_from"], f["net_income_to"]) == (1000, 5000)
+    assert f["vacancies"]["salary_min"] == 40000
+    co = convert_nl_to_batchcards("госзакупки, нмцк от 1,5 млн до 3 млн руб")["filters"]["contracts"]
+    assert (co["min_price"], co["max_price"]) == (1500000, 3000000)
@@ -0,0 +1,45 @@
+import pytest
+
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards
+from msp_llm_filters.regions import REGIONS, RegionGazetteer, get_gazetteer
+
+
+@pytest.mark.parametrize("code", sorted(REGIONS))
+def test_canonical_name_resolves_to_own_code(code):
+    assert get_gazetteer().codes(REGIONS[code][0]) == [code]
+
+
+@pytest.mark.parametrize(
+    "text, codes",
+    [
+        ("компании в Татарстане", ["16"]),
+        ("по Свердловской обл.", ["66"]),
+        ("в свердловской области и в Краснодарском крае", ["66", "23"]),
+        ("в москве, москвы, МСК", ["77"]),
+        ("Москва и Московская область", ["77", "50"]),
+        ("в Санкт Петербурге и Ленобласти", ["78", "47"]),
+        ("в республике Алтай и Алтайском крае", ["04", "22"]),
+        ("в ХМАО и ЯНАО", ["86", "89"]),
+        ("в городе Омск", []),
+        ("комиссия по курсу", []),
+        ("компании в Коми", ["11"]),
+        ("из Коми и республики Коми", ["11"]),
+        ("томская область, омская обл", ["70", "55"]),
+    ],
+)
+def test_inflected_forms(text, codes):
+    assert get_gazetteer().codes(text) == codes
+
+
+def test_longest_variant_wins_and_ambiguity_rejected():
+    g = RegionGazetteer({"01": ("A", (("сев",),)), "02": ("B", (("сев", "кра"),))})
+    assert g.codes("сев край") == ["02"]
+    assert g.codes("север") == ["01"]
+    with pytest.raises(ValueError):
+        RegionGazetteer({"01": ("A", (("сев",),)), "02": ("B", (("сев",),))})
+
+
+def test_converter_fills_region_codes_and_address_filters():
+    out = convert_nl_to_batchcards("по адресу в г. Казань, Республика Татарстан")["filters"]
+    assert out["region_codes"] == ["16"]
+    assert out["address_request"]["address_filters"] == [{"city": "Казань"}, {"region_code": "16"}]
@@ -0,0 +1,82 @@
+import httpx
+import pytest
+
+from msp_llm_filters import server_batchcards
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.response_cache import ResponseCache, canonicalize, request_fingerprint
+from msp_llm_filters.server_batchcards import BatchCardsRequest, Settings, api_search_batchcards
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_equivalent_bodies_share_fingerprint():
+    a = {
+        "region_codes": ["78", "77", "77"],
+        "income_from": 2000.0,
+        "establishment_date_from": "2020-1-5",
+        "vacancies": {"text": "разработчик", "has_vacancies": True},
+        "search_text": None,
+    }
+    b = {
+        "vacancies": {"has_vacancies": True, "text": " разработчик "},
+        "establishment_date_from": "05.01.2020",
+        "income_from": 2000,
+        "region_codes": ["77", "78"],
+    }
+    assert canonicalize(a) == canonicalize(b)
+    assert request_fingerprint("u", a, limit=20, offset=0) == request_fingerprint("u", b, limit=20, offset=0)
+    assert request_fingerprint("u", a, limit=20, offset=0) != request_fingerprint("u", a, limit=20, offset=20)
+    # Коды с ведущим нулём не превращаются в числа
+    assert canonicalize({"region_codes": ["07"]}) == {"region_codes": ["07"]}
+
+
+def test_lru_eviction_by_bytes_and_ttl():
+    clock = _Clock()
+    cache = ResponseCache(max_bytes=10, ttl_seconds=60, clock=clock)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # a становится самым свежим
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.size_bytes == 8 and cache.evictions == 1
+
+    cache.put("short", b"ss", ttl_seconds=1)
+    clock.now += 2
+    assert cache.get("short") is None
+    assert cache.get("a") == b"aaaa"
+    clock.now += 60
+    assert cache.get("a") is None
+    assert cache.expirations == 2
+
+
+@pytest.mark.asyncio
+async def test_batchcards_cache_hit_and_bypass(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"data": [{"inn": str(len(calls))}], "total": 1})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    settings = Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+    try:
+        r1 = await api_search_batchcards(settings, BatchCardsRequest(filters={"region_codes": ["77", "78"], "income_from": 10}))
+        r1.items[0]["inn"] = "mutated"
+        r2 = await api_search_batchcards(settings, BatchCardsRequest(filters={"income_from": 10.0, "region_codes": ["78", "77"]}))
+        r3 = await api_search_batchcards(settings, BatchCardsRequest(filters={"region_codes": ["77", "78"], "income_from": 10}), use_cache=False)
+    finally:
+        await close_http_clients()
+
+    assert len(calls) == 2
+    assert r2.items == [{"inn": "1"}]
+    assert r3.items == [{"inn": "2"}]
+    stats = server_batchcards.get_response_cache(settings).stats()
+    assert stats["hits"] == 1 and stats["bypasses"] == 1
@@ -0,0 +1,119 @@
+import json
+
+import httpx
+import pytest
+
+from msp_llm_filters import conversion_memo, similarity_cache
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.llm_client_batchcards import nl_to_batchcards_via_ollama_cached_async
+from msp_llm_filters.nl_converter_batchcards import convert_nl_to_batchcards, explain_nl_to_batchcards
+from msp_llm_filters.similarity_cache import SimilarityCache, get_similarity_cache, query_shape
+
+pytest.importorskip("numpy")
+
+IT_MOSCOW = "ИТ-компании в Москве с выручкой от 2 млн"
+# Как ответила бы LLM: флаг ИТ и регион, выручка в тысячах
+IT_MOSCOW_LLM = {
+    "filters": {"region_codes": ["77"], "only_it_companies": True, "has_income": True, "income_from": 2000},
+    "page": 1,
+    "page_size": 50,
+}
+
+
+@pytest.fixture
+def cache():
+    c = SimilarityCache(convert_nl_to_batchcards, max_entries=16, explain=explain_nl_to_batchcards)
+    c.add(IT_MOSCOW, IT_MOSCOW_LLM, 2.5)
+    return c
+
+
+def test_query_shape_masks_numbers():
+    assert query_shape("Выручка от 2 млн, 77 регион") == ["выручка", "от", "0", "млн", "0", "регион"]
+
+
+def test_paraphrase_hits_and_keeps_llm_flags(cache):
+    res = cache.lookup("айти компании Москва выручка больше 2 млн")
+    assert res == IT_MOSCOW_LLM
+    assert cache.stats()["hits"] == 1 and cache.stats()["saved_seconds"] == 2.5
+
+
+def test_numbers_and_regions_come_from_new_query(cache):
+    res = cache.lookup("ИТ компании в Татарстане с выручкой от 5 млн")
+    assert res["filters"] == {"region_codes": ["16"], "only_it_companies": True, "has_income": True, "income_from": 5000}
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "компании в Москве с выручкой от 2 млн",  # пропал «ИТ» — другой запрос
+        "ИТ-компании с выручкой от 2 млн",  # правила не видят региона — не подставляем старый
+        "ИТ-компании в Москве с выручкой от 2 млн с сайтом",  # новый флаг
+        "поставщики 44-фз в Москве",  # непохожий запрос
+        "не ИТ-компании в Москве с выручкой от 2 млн",  # отрицание: правила его не видят
+        "ИТ-компании в Москве кроме выручки от 2 млн",
+        "иностранные ИТ-компании в Москве с выручкой от 2 млн",  # слово, которого правила не поняли
+    ],
+)
+def test_unsafe_or_dissimilar_is_a_miss(cache, query):
+    assert cache.lookup(query) is None
+    assert cache.stats()["hits"] == 0
+
+
+def test_negation_checked_without_explain():
+    c = SimilarityCache(convert_nl_to_batchcards, max_entries=4)
+    c.add(IT_MOSCOW, IT_MOSCOW_LLM, 2.5)
+    assert c.lookup("не ИТ-компании в Москве с выручкой от 2 млн") is None
+    assert c.lookup("ИТ компании в Москве с выручкой от 2 млн") == IT_MOSCOW_LLM
+
+
+def test_llm_only_slots_need_same_text(cache):
+    cache.add(
+        "компании в Москве, специализирующиеся на прокате машин",
+        {"filters": {"region_codes": ["77"], "search_terms": ["прокат автомобилей"]}, "page": 1, "page_size": 50},
+        1.0,
+    )
+    # Строки, которых нет в новом запросе, не переносим
+    assert cache.lookup("компании в Москве, специализирующиеся на прокате лодок") is None
+
+
+def test_version_change_and_ring_buffer():
+    c = SimilarityCache(convert_nl_to_batchcards, max_entries=2)
+    c.add("ип в москве", {"filters": {"region_codes": ["77"], "counterparty_type": "ip"}}, 1.0, version="v1")
+    assert c.lookup("ИП в Москве", version="v1") is not None
+    assert c.lookup("ИП в Москве", version="v2") is None and len(c) == 0
+
+    for q in ("ип в москве", "ип в спб", "ооо в казани"):
+        c.add(q, {"filters": {}}, 1.0, version="v2")
+    assert len(c) == 2
+    # Частоты n-грамм согласованы с тем, что осталось в буфере
+    assert (c._df == (c._tf > 0).sum(axis=0)).all()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_skips_call_for_paraphrase(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.test")
+    monkeypatch.setattr(conversion_memo, "_memo", None)
+    monkeypatch.setattr(similarity_cache, "_cache", None)
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content))
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": json.dumps(IT_MOSCOW_LLM)}})
+
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)), name="ollama")
+    try:
+        first = await nl_to_batchcards_via_ollama_cached_async(IT_MOSCOW)
+        second = await nl_to_batchcards_via_ollama_cached_async("ИТ компании в Татарстане с выручкой от 5 млн")
+    finally:
+        await close_http_clients()
+    assert len(calls) == 1
+    assert first["filters"]["region_codes"] == ["77"]
+    assert second["filters"]["region_codes"] == ["16"] and second["filters"]["income_from"] == 5000
+    stats = get_similarity_cache().stats()
+    assert stats["hits"] == 1 and stats["llm_calls"] == 1 and stats["saved_seconds"] > 0
+
+
+def test_disabled_by_env(monkeypatch):
+    monkeypatch.setattr(similarity_cache, "_cache", None)
+    monkeypatch.setenv("NL_SIMILARITY_MAX_ENTRIES", "0")
+    assert get_similarity_cache() is None
@@ -0,0 +1,132 @@
+import asyncio
+
+import httpx
+import pytest
+
+from msp_llm_filters import server, server_batchcards
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.singleflight import SingleFlight
+
+N = 500
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_future():
+    sf = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    results = await asyncio.gather(*(sf.do("k", fetch) for _ in range(N)))
+    assert results == ["ok"] * N
+    assert len(calls) == 1
+    assert sf.stats() == {"calls": N, "upstream_requests": 1, "coalesced": N - 1, "errors": 0, "in_flight": 0}
+
+    # После завершения ключ освобождается: следующий вызов идёт в upstream заново
+    assert await sf.do("k", fetch) == "ok"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_error_propagates_to_every_waiter():
+    sf = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(sf.do("k", fail) for _ in range(50)), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert sf.errors == 1 and sf.coalesced == 49
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_others():
+    sf = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 42
+
+    first = asyncio.ensure_future(sf.do("k", fetch))
+    second = asyncio.ensure_future(sf.do("k", fetch))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    assert await second == 42
+
+
+@pytest.mark.asyncio
+async def test_last_cancelled_waiter_cancels_the_request():
+    sf = SingleFlight()
+    state = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            state.append("closed")
+
+    waiters = [asyncio.ensure_future(sf.do("k", fetch)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    waiters[0].cancel()
+    await asyncio.sleep(0.01)
+    assert state == [] and sf.in_flight == 1
+    waiters[1].cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    assert state == ["closed"] and sf.in_flight == 0
+
+
+def _slow_upstream(calls, status=200):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        if status != 200:
+            return httpx.Response(status, json={"error": "boom"})
+        return httpx.Response(200, json={"data": [{"case_id": "A40-1/2024", "first_number": "А40-1/2024"}], "total": 1})
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_stress_api_search_and_get_case(monkeypatch):
+    monkeypatch.setattr(server, "upstream_flights", SingleFlight())
+    monkeypatch.setattr(server, "_response_cache", None)
+    calls = []
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_slow_upstream(calls))))
+    settings = server.Settings(api_base_url="http://upstream.test/batch-cases", response_cache_max_bytes=0)
+    try:
+        req = server.SearchRequest(filters=server.SearchFilters(participant="7707083893"), page_size=5)
+        searches = await asyncio.gather(*(server.api_search(settings, req) for _ in range(N)))
+        cases = await asyncio.gather(*(server.api_get_case(settings, "A40-1/2024") for _ in range(N)))
+    finally:
+        await close_http_clients()
+
+    assert len(calls) == 2
+    assert all(r.items[0].id == "A40-1/2024" for r in searches)
+    assert all(c.title == "А40-1/2024" for c in cases)
+    # Каждый вызывающий получает собственный объект
+    assert searches[0] is not searches[1] and searches[0].items[0] is not searches[1].items[0]
+    assert server.upstream_flights.coalesced == 2 * (N - 1)
+
+
+@pytest.mark.asyncio
+async def test_batchcards_errors_reach_all_waiters(monkeypatch):
+    monkeypatch.setattr(server_batchcards, "upstream_flights", SingleFlight())
+    monkeypatch.setattr(server_batchcards, "_response_cache", None)
+    calls = []
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_slow_upstream(calls, status=503))))
+    settings = server_batchcards.Settings(api_base_url="http://upstream.test/api/v1/batchCardsByFilters")
+    req = server_batchcards.BatchCardsRequest(filters={"region_codes": ["77"]})
+    try:
+        results = await asyncio.gather(
+            *(server_batchcards.api_search_batchcards(settings, req) for _ in range(N)), return_exceptions=True
+        )
+    finally:
+        await close_http_clients()
+
+    assert len(calls) == 1
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+    assert server_batchcards.upstream_flights.stats()["errors"] == 1
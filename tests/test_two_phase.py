@@ -0,0 +1,53 @@
+import json
+
+import httpx
+import pytest
+
+from msp_llm_filters import server
+from msp_llm_filters.http_client import close_http_clients, set_http_client
+from msp_llm_filters.singleflight import SingleFlight
+from msp_llm_filters.webapp import app
+
+
+def _upstream(bodies):
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        if "case_num" in body:
+            docs = [{"document_type": "Решение", "value": f"текст {body['case_num']}"}]
+            return httpx.Response(200, json={"data": [{"case_id": "id-" + body["case_num"], "first_number": body["case_num"], "documents": docs}]})
+        case = {"case_id": "id-А40-1/2024", "first_number": "А40-1/2024", "documents": [{"value": "x" * 1000}]}
+        return httpx.Response(200, json={"data": [case], "total": 1})
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_listing_without_documents_then_lazy_documents(monkeypatch):
+    monkeypatch.setenv("API_BASE_URL", "http://upstream.test/batch-cases")
+    monkeypatch.setattr(server, "_response_cache", None)
+    monkeypatch.setattr(server, "upstream_flights", SingleFlight())
+    bodies = []
+    set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(_upstream(bodies))))
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://web.test") as web:
+            page = await web.post("/search", data={"q": "покажи 5 дел, документы включи"})
+            assert page.status_code == 200
+            assert 'data-case-id="А40-1/2024"' in page.text
+            assert "x" * 1000 not in page.text
+            assert bodies[0]["need_document"] is False
+
+            docs = await web.post("/documents", json={"case_ids": ["А40-1/2024", "А40-2/2024", "А40-1/2024"]})
+            bad = await web.post("/documents", json={"case_ids": []})
+    finally:
+        await close_http_clients()
+
+    assert docs.json() == {
+        "documents": {
+            "А40-1/2024": [{"document_type": "Решение", "value": "текст А40-1/2024"}],
+            "А40-2/2024": [{"document_type": "Решение", "value": "текст А40-2/2024"}],
+        },
+        "errors": [],
+    }
+    assert [b.get("case_num") for b in bodies[1:]] == ["А40-1/2024", "А40-2/2024"]
+    assert bad.status_code == 400